@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for nic_crawler_analysis.parse.html.filter_text
+
+Compares the translate based TextFilter with the regular expression that
+filter_text used before, on texts of several MB in several scripts.
+
+Run from the root of the repository (or with the package installed):
+
+    PYTHONPATH=. python benchmarks/bench_filter_text.py
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+import argparse
+import timeit
+
+from nic_crawler_analysis.parse import html as nca_html
+
+from bench_parse_html import get_page
+
+FILTER_RE = re.compile(
+    '[\n \[\]"\'.,:!?/+\-–\\\\*#()%&=_§€$@<>;|'
+    '©0123456789»«®…”“•�°←→„▶\x96\xa0\t]+'
+)
+
+
+# Samples of the texts, repeated to the size of the benchmark. The text of
+# the generated page is ASCII, the German one can be encoded as latin-1 and
+# the other ones can not (they are filtered with the regular expression).
+TEXT_SAMPLES = [
+    ("page (ASCII)", None),
+    ("German (latin-1)",
+     "Hier finden Sie die neuesten Nachrichten für Österreich: 12 Termine "
+     "(Änderungen vorbehalten) - mehr dazu unter www.example.at.\n"),
+    ("German with quotes",
+     "Der „Verein“ lädt ein – Eintritt 5 € … weitere Infos • hier.\n"),
+    ("Russian",
+     "Русский язык — один из восточнославянских языков, 12 «слов».\n"),
+]
+
+
+def get_text(sample, size):
+    """Return a text of about size characters made of sample"""
+    if sample is None:
+        sample = nca_html.parse_html(get_page(200)).body.get_text()
+    return sample * max(size // len(sample), 1)
+
+
+def bench_regex(text):
+    return FILTER_RE.sub(' ', text).strip()
+
+
+def bench_filter_text(text):
+    return nca_html.filter_text(text)
+
+
+BENCHMARKS = [
+    ("regex", bench_regex),
+    ("filter_text", bench_filter_text),
+]
+
+
+def run(sizes, repeat):
+    print("%-44s %10s %12s %10s" % ("benchmark", "size [MB]", "time [ms]",
+                                    "MB/s"))
+    for _size in sizes:
+        for _text_name, _sample in TEXT_SAMPLES:
+            _text = get_text(_sample, int(_size * 1e6))
+            assert bench_regex(_text) == bench_filter_text(_text)
+            for _name, _func in BENCHMARKS:
+                _time = min(timeit.repeat(
+                    lambda: _func(_text), number=1, repeat=repeat
+                ))
+                print("%-44s %10.1f %12.2f %10.1f" % (
+                    "%s, %s" % (_name, _text_name), len(_text) / 1e6,
+                    1000.0 * _time, len(_text) / 1e6 / _time
+                ))
+
+
+def get_argparser():
+    argparser = argparse.ArgumentParser(
+        description="Benchmark the filtering of extracted text"
+    )
+    argparser.add_argument(
+        '-s',
+        '--size',
+        type=float,
+        action='append',
+        help="size of the text in million characters (repeatable, "
+             "default: 1, 4 and 16)"
+    )
+    argparser.add_argument(
+        '-r',
+        '--repeat',
+        type=int,
+        default=3,
+        help="number of runs, the fastest run is reported"
+    )
+    return argparser
+
+
+if __name__ == '__main__':
+    pars = get_argparser().parse_args()
+    run(pars.size or [1, 4, 16], pars.repeat)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for nic_crawler_analysis.analysis.lang_detect
+
+Run from the root of the repository (or with the package installed):
+
+    PYTHONPATH=. python benchmarks/bench_lang_detect.py
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import timeit
+
+import nic_crawler_analysis.analysis.lang_detect as nca_lang
+from nic_crawler_analysis.parse.html import parse_html, extract_text_from_html
+from nic_crawler_analysis.analysis.lang_cache import LanguageCache
+
+SAMPLE_TEXTS = [
+    "Ein Beispieltext mit dem wir uns anschauen, ob beim Ausführen von "
+    "unseren Funktionen das richtige herauskommt.",
+    "An example text to test for english language detection. If everything "
+    "goes well we should get the result english when we're done.",
+    "Un texte d'exemple pour tester la détection de la langue française sur "
+    "des pages web.",
+    "Un testo di esempio per verificare il riconoscimento della lingua "
+    "italiana nelle pagine web.",
+]
+
+# Texts in several scripts for the benchmarks of the script prefilter
+SCRIPT_SAMPLE_TEXTS = SAMPLE_TEXTS + [
+    "Η ελληνική γλώσσα είναι μία από τις ινδοευρωπαϊκές γλώσσες.",
+    "Русский язык — один из восточнославянских языков.",
+    "日本語は、主に日本国内や日本人同士の間で使用されている言語である。",
+    "한국어는 대한민국과 조선민주주의인민공화국의 공용어이다.",
+]
+
+# Texts in scripts written without spaces between words
+UNSPACED_SAMPLE_TEXTS = [
+    "日本語は、主に日本国内や日本人同士の間で使用されている言語である。",
+    "中华人民共和国是位于东亚的社会主义国家，首都为北京。",
+    "ภาษาไทยเป็นภาษาที่มีระดับเสียงของคำแน่นอนหรือวรรณยุกต์",
+]
+
+# Languages of SAMPLE_TEXTS plus a few neighbours
+CANDIDATE_LANGS = ["de", "en", "fr", "it", "nl", "cs", "hu", "sl"]
+
+# The texts are repeated this many times to form a large page (a few MB with
+# the default number of texts)
+LARGE_PAGE_REPEAT = 200
+
+# Characters per chunk when a large page is streamed
+CHUNK_LENGTH = 65536
+
+
+def get_block_texts(n_texts):
+    """Return n_texts short texts that resemble the blocks of a page"""
+    return [SAMPLE_TEXTS[_i % len(SAMPLE_TEXTS)] for _i in range(n_texts)]
+
+
+def get_script_texts(n_texts):
+    """Return n_texts short texts in several scripts"""
+    return [
+        SCRIPT_SAMPLE_TEXTS[_i % len(SCRIPT_SAMPLE_TEXTS)]
+        for _i in range(n_texts)
+    ]
+
+
+def get_unspaced_page(n_texts):
+    """Return a page of n_texts sentences written without spaces"""
+    return ''.join(
+        UNSPACED_SAMPLE_TEXTS[_i * len(UNSPACED_SAMPLE_TEXTS) // n_texts]
+        for _i in range(n_texts)
+    )
+
+
+def bench_per_call(texts):
+    return [nca_lang.detect_languages(_text) for _text in texts]
+
+
+def bench_batch(texts):
+    return nca_lang.detect_languages_batch(texts)
+
+
+def bench_batch_numpy(texts):
+    return nca_lang.detect_languages_batch(texts, engine="numpy")
+
+
+def bench_batch_adaptive_trials(texts):
+    return nca_lang.detect_languages_batch(texts, adaptive_trials=True)
+
+
+def bench_batch_candidates(texts):
+    return nca_lang.detect_languages_batch(
+        texts, candidate_langs=CANDIDATE_LANGS
+    )
+
+
+def bench_batch_scripts(texts):
+    return nca_lang.detect_languages_batch(get_script_texts(len(texts)))
+
+
+def bench_batch_script_prefilter(texts):
+    return nca_lang.detect_languages_batch(
+        get_script_texts(len(texts)), script_prefilter=True
+    )
+
+
+def bench_per_call_cached(texts):
+    cache = LanguageCache()
+    return [nca_lang.detect_languages(_text, cache=cache) for _text in texts]
+
+
+def bench_blocks(texts):
+    return nca_lang.detect_language_blocks(' '.join(texts))
+
+
+def bench_blocks_incremental(texts):
+    return nca_lang.detect_language_blocks(
+        ' '.join(texts), engine="incremental"
+    )
+
+
+def bench_blocks_numpy(texts):
+    return nca_lang.detect_language_blocks(' '.join(texts), engine="numpy")
+
+
+def bench_blocks_fast(texts):
+    return nca_lang.detect_language_blocks(' '.join(texts), config="fast")
+
+
+def bench_blocks_accurate(texts):
+    return nca_lang.detect_language_blocks(' '.join(texts), config="accurate")
+
+
+def bench_blocks_unspaced(texts):
+    return nca_lang.detect_language_blocks(get_unspaced_page(len(texts)))
+
+
+def get_site_html(texts, lang="de"):
+    """Return a site in German with the given language in its <html> tag"""
+    return '<html lang="%s"><body>%s</body></html>' % (
+        lang, ' '.join(SAMPLE_TEXTS[0] for _ in texts)
+    )
+
+
+def bench_site_full(texts):
+    text = extract_text_from_html(parse_html(get_site_html(texts)))
+    return (nca_lang.detect_languages(text),
+            nca_lang.detect_language_blocks(text))
+
+
+def bench_site_language(texts):
+    return nca_lang.detect_site_language("[]", get_site_html(texts))
+
+
+def bench_site_language_escalated(texts):
+    return nca_lang.detect_site_language("[]", get_site_html(texts, "en"))
+
+
+def get_large_page(texts):
+    return ' '.join(texts * LARGE_PAGE_REPEAT)
+
+
+def bench_blocks_large_page(texts):
+    return nca_lang.detect_language_blocks(get_large_page(texts))
+
+
+def bench_blocks_large_page_streaming(texts):
+    return nca_lang.detect_language_blocks(
+        get_large_page(texts), streaming=True
+    )
+
+
+def bench_blocks_large_page_chunks(texts):
+    page = get_large_page(texts)
+    return nca_lang.detect_language_blocks(
+        (page[_i:_i + CHUNK_LENGTH]
+         for _i in range(0, len(page), CHUNK_LENGTH)),
+        streaming=True
+    )
+
+
+BENCHMARKS = [
+    ("detect_languages (per call)", bench_per_call),
+    ("detect_languages_batch", bench_batch),
+    ("detect_languages_batch (8 candidates)", bench_batch_candidates),
+    ("detect_languages_batch (scripts)", bench_batch_scripts),
+    ("detect_languages_batch (scripts, prefilter)",
+     bench_batch_script_prefilter),
+    ("detect_languages (cached)", bench_per_call_cached),
+    ("detect_languages_batch (numpy)", bench_batch_numpy),
+    ("detect_languages_batch (adaptive trials)", bench_batch_adaptive_trials),
+    ("detect_language_blocks", bench_blocks),
+    ("detect_language_blocks (incremental)", bench_blocks_incremental),
+    ("detect_language_blocks (numpy)", bench_blocks_numpy),
+    ("detect_language_blocks (config \"fast\")", bench_blocks_fast),
+    ("detect_language_blocks (config \"accurate\")", bench_blocks_accurate),
+    ("detect_language_blocks (unspaced page)", bench_blocks_unspaced),
+    ("site: detect_languages + blocks", bench_site_full),
+    ("detect_site_language (meta confirmed)", bench_site_language),
+    ("detect_site_language (escalated)", bench_site_language_escalated),
+    ("detect_language_blocks (large page)", bench_blocks_large_page),
+    ("detect_language_blocks (large page, stream)",
+     bench_blocks_large_page_streaming),
+    ("detect_language_blocks (large page, chunks)",
+     bench_blocks_large_page_chunks),
+]
+
+
+def run(n_texts, repeat):
+    texts = get_block_texts(n_texts)
+    print("%-44s %12s %14s" % ("benchmark", "total [s]", "per text [ms]"))
+    for _name, _func in BENCHMARKS:
+        _time = min(timeit.repeat(
+            lambda: _func(texts), number=1, repeat=repeat
+        ))
+        print("%-44s %12.4f %14.4f" % (
+            _name, _time, 1000.0 * _time / n_texts
+        ))
+
+
+def get_argparser():
+    argparser = argparse.ArgumentParser(
+        description="Benchmark the language detection functions"
+    )
+    argparser.add_argument(
+        '-n',
+        '--n-texts',
+        type=int,
+        default=200,
+        help="number of texts analyzed per run"
+    )
+    argparser.add_argument(
+        '-r',
+        '--repeat',
+        type=int,
+        default=3,
+        help="number of runs, the fastest run is reported"
+    )
+    return argparser
+
+
+if __name__ == '__main__':
+    pars = get_argparser().parse_args()
+    run(pars.n_texts, pars.repeat)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Startup benchmarks for nic_crawler_analysis.analysis.lang_detect
+
+Measures the time a fresh worker process needs to import lang_detect, to
+load the language profiles (warmup) and to detect the language of a first
+text, and the peak memory (RSS) of the process, with the profiles of
+langdetect and with a compiled profile store. The profiles are loaded on
+first use, so the import itself does not depend on them.
+
+Run from the root of the repository (or with the package installed):
+
+    PYTHONPATH=. python benchmarks/bench_lang_startup.py
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from nic_crawler_analysis.analysis import lang_profiles
+
+# Runs in the worker: prints the elapsed times and the peak RSS in kB as json.
+# ru_maxrss includes the memory of the parent process before exec on Linux, so
+# the high-water mark of the process is read from /proc if possible.
+WORKER_SCRIPT = """
+import json, resource, time
+def peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.time()
+import nic_crawler_analysis.analysis.lang_detect as nca_lang
+imported = time.time()
+nca_lang.warmup()
+warm = time.time()
+nca_lang.detect_languages("An example text to test language detection.")
+detected = time.time()
+print(json.dumps([
+    imported - start,
+    warm - imported,
+    detected - start,
+    peak_rss(),
+]))
+"""
+
+
+def run_worker(env):
+    output = subprocess.check_output(
+        [sys.executable, "-c", WORKER_SCRIPT], env=env
+    )
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def run(repeat):
+    directory = tempfile.mkdtemp()
+    try:
+        store_path = os.path.join(directory, "profiles")
+        lang_profiles.compile_profiles(store_path)
+
+        env = dict(os.environ)
+        env.pop("NCA_LANG_PROFILE_STORE", None)
+        store_env = dict(env, NCA_LANG_PROFILE_STORE=store_path)
+
+        print("%-26s %11s %11s %15s %13s" % (
+            "benchmark", "import [s]", "warmup [s]", "first text [s]",
+            "max RSS [MB]"
+        ))
+        for _name, _env in [
+                ("langdetect profiles", env),
+                ("compiled profile store", store_env),
+        ]:
+            _results = [run_worker(_env) for _ in range(repeat)]
+            print("%-26s %11.4f %11.4f %15.4f %13.1f" % (
+                _name,
+                min(_r[0] for _r in _results),
+                min(_r[1] for _r in _results),
+                min(_r[2] for _r in _results),
+                min(_r[3] for _r in _results) / 1024.0,
+            ))
+    finally:
+        shutil.rmtree(directory)
+
+
+def get_argparser():
+    argparser = argparse.ArgumentParser(
+        description="Benchmark the startup of language detection workers"
+    )
+    argparser.add_argument(
+        '-r',
+        '--repeat',
+        type=int,
+        default=3,
+        help="number of workers started, the fastest run is reported"
+    )
+    return argparser
+
+
+if __name__ == '__main__':
+    pars = get_argparser().parse_args()
+    run(pars.repeat)
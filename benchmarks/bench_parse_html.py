@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for nic_crawler_analysis.parse.html
+
+Run from the root of the repository (or with the package installed):
+
+    PYTHONPATH=. python benchmarks/bench_parse_html.py
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import timeit
+
+import bs4
+
+from nic_crawler_analysis.parse import html as nca_html
+from nic_crawler_analysis.parse.html_cache import DocumentCache
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="de">
+<head>
+    <title>Beispielseite</title>
+    <meta http-equiv="Content-Language" content="de">
+    <meta name="description" content="Eine Beispielseite für Benchmarks">
+    <meta name="keywords" content="Beispiel, Benchmark">
+    <script src="/js/jquery-3.5.1.min.js"></script>
+</head>
+<body>
+"""
+
+PAGE_BLOCK = """<div class="teaser">
+    <h2>Neuigkeiten aus unserem Verein</h2>
+    <p>Hier finden Sie die neuesten Nachrichten und Termine. Besuchen Sie
+    auch <a href="https://www.example.at/termine">unseren Kalender</a>.</p>
+    <script type="text/javascript">track("teaser");</script>
+</div>
+"""
+
+PAGE_FOOT = """<noscript>Bitte aktivieren Sie JavaScript.</noscript>
+</body>
+</html>
+"""
+
+
+def get_page(n_blocks):
+    """Return a page with n_blocks content blocks"""
+    return PAGE_HEAD + PAGE_BLOCK * n_blocks + PAGE_FOOT
+
+
+# Pages encoded as UTF-8, encoded once per page
+_PAGE_BYTES = {}
+
+
+def get_page_bytes(page):
+    """Return page encoded as UTF-8"""
+    if page not in _PAGE_BYTES:
+        _PAGE_BYTES[page] = page.encode("utf-8")
+    return _PAGE_BYTES[page]
+
+
+def get_bench_parse(parser):
+    """Return a benchmark of parse_html with a parser backend"""
+    def bench_parse(page, bs):
+        return nca_html.parse_html(page, parser=parser)
+    return bench_parse
+
+
+def get_bench_parse_extract(parser):
+    """Return a benchmark of parsing and extracting all inputs"""
+    def bench_parse_extract(page, bs):
+        return nca_html.extract_all_from_html(
+            nca_html.parse_html(page, parser=parser)
+        )
+    return bench_parse_extract
+
+
+def bench_separate(page, bs):
+    return [
+        nca_html.extract_text_from_html(bs),
+        nca_html.get_site_description(bs),
+        nca_html.extract_html_lang_tag(bs),
+        nca_html.extract_http_equiv_lang_tag(bs),
+        nca_html.extract_js_from_html(bs),
+        nca_html.extract_noscript_from_html(bs),
+    ]
+
+
+def bench_extract_all(page, bs):
+    return nca_html.extract_all_from_html(bs)
+
+
+def bench_meta_full(page, bs):
+    bs = nca_html.parse_html(page)
+    return [
+        nca_html.get_site_description(bs),
+        nca_html.extract_html_lang_tag(bs),
+        nca_html.extract_http_equiv_lang_tag(bs),
+    ]
+
+
+def bench_meta_head_only(page, bs):
+    bs = nca_html.parse_html(page, head_only=True)
+    return [
+        nca_html.get_site_description(bs),
+        nca_html.extract_html_lang_tag(bs),
+        nca_html.extract_http_equiv_lang_tag(bs),
+    ]
+
+
+def bench_extract_text(page, bs):
+    return nca_html.extract_text_from_html(bs)
+
+
+def bench_extract_text_bounded(page, bs):
+    # the number of words sampled by detect_language_blocks by default
+    return nca_html.extract_text_from_html(bs, max_words=400, n_segments=20)
+
+
+def bench_separate_str(page, bs):
+    return [
+        nca_html.extract_text_from_html(page),
+        nca_html.get_site_description(page),
+        nca_html.extract_html_lang_tag(page),
+        nca_html.extract_http_equiv_lang_tag(page),
+        nca_html.extract_js_from_html(page),
+        nca_html.extract_noscript_from_html(page),
+    ]
+
+
+def bench_separate_str_cached(page, bs):
+    cache = DocumentCache()
+    return [
+        nca_html.extract_text_from_html(page, document_cache=cache),
+        nca_html.get_site_description(page, document_cache=cache),
+        nca_html.extract_html_lang_tag(page, document_cache=cache),
+        nca_html.extract_http_equiv_lang_tag(page, document_cache=cache),
+        nca_html.extract_js_from_html(page, document_cache=cache),
+        nca_html.extract_noscript_from_html(page, document_cache=cache),
+    ]
+
+
+def bench_extract_all_streaming(page, bs):
+    return nca_html.extract_all_from_html(page, streaming=True)
+
+
+def bench_parse_bytes(page, bs):
+    return nca_html.parse_html(get_page_bytes(page))
+
+
+def bench_parse_bytes_bs4(page, bs):
+    # bs4 detects the encoding of bytes with UnicodeDammit
+    return bs4.BeautifulSoup(get_page_bytes(page), nca_html.DEFAULT_PARSER)
+
+
+def bench_meta_head_only_bytes(page, bs):
+    bs = nca_html.parse_html(get_page_bytes(page), head_only=True)
+    return [
+        nca_html.get_site_description(bs),
+        nca_html.extract_html_lang_tag(bs),
+        nca_html.extract_http_equiv_lang_tag(bs),
+    ]
+
+
+def bench_extract_all_streaming_bytes(page, bs):
+    return nca_html.extract_all_from_html(get_page_bytes(page), streaming=True)
+
+
+# One benchmark per installed parser backend
+BENCHMARKS = [
+    ("parse_html (%s)" % _parser, get_bench_parse(_parser))
+    for _parser in nca_html.get_available_parsers()
+] + [
+    ("parse_html + extract_all (%s)" % _parser,
+     get_bench_parse_extract(_parser))
+    for _parser in nca_html.get_available_parsers()
+] + [
+    ("extract_* (one call each, parsed)", bench_separate),
+    ("extract_all_from_html (parsed)", bench_extract_all),
+    ("extract_text_from_html (parsed)", bench_extract_text),
+    ("extract_text_from_html (parsed, 400 words)",
+     bench_extract_text_bounded),
+    ("extract_* (one call each, str)", bench_separate_str),
+    ("extract_* (one call each, str, cached)", bench_separate_str_cached),
+    ("extract_all_from_html (streaming, unparsed)",
+     bench_extract_all_streaming),
+    ("meta-information (full parse)", bench_meta_full),
+    ("meta-information (head-only parse)", bench_meta_head_only),
+    ("parse_html (bytes)", bench_parse_bytes),
+    ("BeautifulSoup (bytes, UnicodeDammit)", bench_parse_bytes_bs4),
+    ("meta-information (bytes, head-only parse)",
+     bench_meta_head_only_bytes),
+    ("extract_all_from_html (streaming, bytes)",
+     bench_extract_all_streaming_bytes),
+]
+
+
+def run(n_blocks, repeat):
+    page = get_page(n_blocks)
+    bs = nca_html.parse_html(page)
+    print("default parser: %s, auto parser: %s"
+          % (nca_html.DEFAULT_PARSER, nca_html.AUTO_PARSER))
+    print("%-44s %12s" % ("benchmark", "time [ms]"))
+    for _name, _func in BENCHMARKS:
+        _time = min(timeit.repeat(
+            lambda: _func(page, bs), number=1, repeat=repeat
+        ))
+        print("%-44s %12.4f" % (_name, 1000.0 * _time))
+
+
+def get_argparser():
+    argparser = argparse.ArgumentParser(
+        description="Benchmark the HTML parsing and extraction functions"
+    )
+    argparser.add_argument(
+        '-n',
+        '--n-blocks',
+        type=int,
+        default=200,
+        help="number of content blocks of the page"
+    )
+    argparser.add_argument(
+        '-r',
+        '--repeat',
+        type=int,
+        default=5,
+        help="number of runs, the fastest run is reported"
+    )
+    return argparser
+
+
+if __name__ == '__main__':
+    pars = get_argparser().parse_args()
+    run(pars.n_blocks, pars.repeat)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for nic_crawler_analysis.parse.html.strip_urls
+
+Compares the fast mode with the rfc3987 mode (if regex and rfc3987 are
+installed) on texts of several MB with and without URLs.
+
+Run from the root of the repository (or with the package installed):
+
+    PYTHONPATH=. python benchmarks/bench_strip_urls.py
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import timeit
+
+from nic_crawler_analysis.parse import html as nca_html
+
+# Samples of the texts, repeated to the size of the benchmark
+TEXT_SAMPLES = [
+    ("no URLs",
+     "Hier finden Sie die neuesten Nachrichten und Termine. Besuchen Sie "
+     "auch unseren Kalender.\n"),
+    ("no URLs, colons",
+     "Termin: 10:30 Uhr, Ort: Wien. Hinweis: bitte anmelden.\n"),
+    ("URLs",
+     "Termin: 10:30 Uhr, siehe https://www.example.at/termine?id=3 oder "
+     "www.nic.at/kontakt.\n"),
+]
+
+
+def get_modes():
+    """Return the modes of strip_urls that can be used"""
+    if nca_html.RFC_REGEX_AVAILABLE:
+        return nca_html.URL_STRIP_MODES
+    return [_mode for _mode in nca_html.URL_STRIP_MODES if _mode != "rfc3987"]
+
+
+def run(sizes, repeat):
+    print("%-44s %10s %12s %10s" % ("benchmark", "size [MB]", "time [ms]",
+                                    "MB/s"))
+    for _size in sizes:
+        for _text_name, _sample in TEXT_SAMPLES:
+            _text = _sample * max(int(_size * 1e6) // len(_sample), 1)
+            for _mode in get_modes():
+                # the first call compiles the pattern of the mode
+                nca_html.strip_urls(_text[:1000], _mode)
+                _time = min(timeit.repeat(
+                    lambda: nca_html.strip_urls(_text, _mode),
+                    number=1, repeat=repeat
+                ))
+                print("%-44s %10.1f %12.2f %10.1f" % (
+                    "%s, %s" % (_mode, _text_name), len(_text) / 1e6,
+                    1000.0 * _time, len(_text) / 1e6 / _time
+                ))
+
+
+def get_argparser():
+    argparser = argparse.ArgumentParser(
+        description="Benchmark the removal of URLs from text"
+    )
+    argparser.add_argument(
+        '-s',
+        '--size',
+        type=float,
+        action='append',
+        help="size of the text in million characters (repeatable, "
+             "default: 1 and 4)"
+    )
+    argparser.add_argument(
+        '-r',
+        '--repeat',
+        type=int,
+        default=3,
+        help="number of runs, the fastest run is reported"
+    )
+    return argparser
+
+
+if __name__ == '__main__':
+    pars = get_argparser().parse_args()
+    run(pars.size or [1, 4], pars.repeat)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Result cache for language detection
+
+Crawls see the same texts (parked pages, default pages of hosting providers,
+"under construction" pages, ...) over and over again. A
+:class:`LanguageCache` can be passed to
+:func:`~nic_crawler_analysis.analysis.lang_detect.detect_languages` and
+:func:`~nic_crawler_analysis.analysis.lang_detect.detect_language_blocks` to
+reuse the results for texts that were analyzed before.
+
+The cache has two tiers: a bounded in-memory LRU cache and an optional SQLite
+database on disk that is shared between runs and processes.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import dict
+from future import standard_library
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+
+from ..util.lru import LRUDict
+
+standard_library.install_aliases()
+
+DEFAULT_MAX_SIZE = 10000
+SQLITE_TIMEOUT = 30.0  # seconds
+
+
+def cache_key(text, *params):
+    """
+    Return the cache key for a text and the parameters used to analyze it
+
+    Parameters
+    ----------
+    text : str
+        the analyzed text
+    *params
+        parameters that influence the result - must be serializable as json
+
+    Returns
+    -------
+    key : str
+        hex digest of text and params
+    """
+    digest = hashlib.sha1(text.encode("utf-8", "surrogatepass"))
+    digest.update(b"\0")
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LanguageCache(object):
+    """
+    Cache for results of language detection
+
+    Values are stored as json, so every lookup returns a new copy of the
+    cached value. All methods are thread safe.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        maximal number of entries kept in memory (default `DEFAULT_MAX_SIZE`)
+    path : str, optional
+        path of an SQLite database used as persistent second tier. The
+        database is created if it does not exist. If None, only the memory
+        is used.
+
+    Attributes
+    ----------
+    hits : int
+        number of lookups answered from memory
+    disk_hits : int
+        number of lookups answered from the database
+    misses : int
+        number of lookups that were not found in the cache
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, path=None):
+        self._entries = LRUDict(max_size)
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+    def _get_connection(self):
+        # Connections must not be shared with forked child processes
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(
+                self.path, timeout=SQLITE_TIMEOUT, check_same_thread=False
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS lang_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            self._connection.commit()
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def get(self, key):
+        """
+        Look up a key
+
+        Parameters
+        ----------
+        key : str
+            key as returned by :func:`cache_key`
+
+        Returns
+        -------
+        found : bool
+            True if the key is in the cache
+        value : object
+            cached value (None if not found)
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self.hits += 1
+                return True, json.loads(value)
+
+            if self.path is not None:
+                row = self._get_connection().execute(
+                    "SELECT value FROM lang_cache WHERE key = ?", (key, )
+                ).fetchone()
+                if row is not None:
+                    self._entries.put(key, row[0])
+                    self.disk_hits += 1
+                    return True, json.loads(row[0])
+
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        """
+        Store a value
+
+        Parameters
+        ----------
+        key : str
+            key as returned by :func:`cache_key`
+        value : object
+            value to store - must be serializable as json
+        """
+        value = json.dumps(value)
+        with self._lock:
+            self._entries.put(key, value)
+            if self.path is not None:
+                connection = self._get_connection()
+                connection.execute(
+                    "INSERT OR REPLACE INTO lang_cache (key, value) "
+                    "VALUES (?, ?)",
+                    (key, value)
+                )
+                connection.commit()
+
+    def info(self):
+        """
+        Return the counters of the cache
+
+        Returns
+        -------
+        info : dict
+            dict with the keys 'hits', 'disk_hits', 'misses' and 'size' (the
+            number of entries in memory)
+        """
+        with self._lock:
+            return dict(
+                hits=self.hits,
+                disk_hits=self.disk_hits,
+                misses=self.misses,
+                size=len(self._entries)
+            )
+
+    def clear(self):
+        """Remove all entries from memory and disk and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+            if self.path is not None:
+                connection = self._get_connection()
+                connection.execute("DELETE FROM lang_cache")
+                connection.commit()
+
+    def close(self):
+        """Close the connection to the database"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
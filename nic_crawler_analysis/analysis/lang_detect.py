@@ -3,43 +3,1032 @@ from __future__ import division
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
-from builtins import dict, range, str as unicode_str
+from builtins import bytes, chr, dict, range, zip, str as unicode_str
 from past.builtins import basestring
 from future import standard_library
 
+import os
+import re
+import sys
 import math
+import bisect
+import hashlib
+import itertools
+import threading
 import bs4
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict
 
 import langdetect
 
+from . import lang_cache
+from . import lang_numpy
+from . import lang_profiles
 from ..parse.html import (
     parse_html,
+    extract_text_from_html,
     extract_html_lang_tag,
     extract_http_equiv_lang_tag
 )
-from ..parse.http import extract_http_header_lang_tag
+from ..parse.http import (
+    extract_http_header_lang_tag,
+    extract_http_header_content_type
+)
 from ..util.misc import KNOWN_LANG_TAGS
+from langdetect.utils.ngram import NGram
+from langdetect.utils.unicode_block import unicode_block
 
 standard_library.install_aliases()
 
-# Fix seed for reproducible results
-langdetect.DetectorFactory.seed = 0
-# Init factory and fetch language list
-langdetect.detector_factory.init_factory()
-lang_list = langdetect.detector_factory._factory.get_lang_list()
+# Environment variable with the path of a compiled profile store (see
+# lang_profiles and use_profile_store)
+PROFILE_STORE_ENV = "NCA_LANG_PROFILE_STORE"
+
+# Detection backend: the factory of langdetect detectors and the profile store
+# it uses (if any). Both are initialized on first use or by warmup.
+_factory = None
+_profile_store = None
+_backend_lock = threading.Lock()
 
 TEXT_SAMPLES_N = 20
 TEXT_SAMPLES_LENGTH = 20  # words
+# Number of characters of a text split into words at once in streaming mode
+STREAM_CHUNK_LENGTH = 65536
 PROB_THRESHOLD = 0.95
 N_TRIALS = 20
 
+# Seed used when no seed is given - fixed for reproducible results
+DEFAULT_SEED = 0
+# Value of the seed parameter that derives the seed of each text from its
+# content
+SEED_FROM_TEXT = "text"
+
+# Engines that score the n-grams of a text (see detect_languages)
+ENGINES = ["langdetect", "numpy", "incremental"]
+DEFAULT_ENGINE = "langdetect"
+# Number of texts the numpy engine scores at once in iter_detect_languages
+NUMPY_BATCH_SIZE = 64
+
+# Stopping rule of the trials in detect_languages with adaptive_trials
+ADAPTIVE_MIN_TRIALS = 5
+ADAPTIVE_TRIAL_TOLERANCE = 0.01
+
+# Stopping rule of detect_language_blocks in adaptive mode
+ADAPTIVE_CONFIDENCE = 0.95
+ADAPTIVE_MAX_ERROR = 0.25
+
+# Texts detected with a restricted set of candidate languages are detected
+# again with all languages if the most probable candidate is not more probable
+# than CANDIDATE_MIN_PROB. The probabilities are relative to the candidates,
+# so texts in other languages are often assigned to a candidate with a high
+# probability. Therefore CANDIDATE_CHECK_NGRAMS n-grams of the text are also
+# scored against all languages once and the text is detected again if the
+# best language is not a candidate.
+CANDIDATE_MIN_PROB = 0.95
+CANDIDATE_CHECK_NGRAMS = 50
+
+# Unicode blocks of the letters of the scripts used by the detectable
+# languages: (first code point, last code point, script)
+SCRIPT_RANGES = [
+    (0x0041, 0x005A, "latin"),
+    (0x0061, 0x007A, "latin"),
+    (0x00C0, 0x00D6, "latin"),
+    (0x00D8, 0x00F6, "latin"),
+    (0x00F8, 0x024F, "latin"),
+    (0x0370, 0x03FF, "greek"),
+    (0x0400, 0x052F, "cyrillic"),
+    (0x0590, 0x05FF, "hebrew"),
+    (0x0600, 0x06FF, "arabic"),
+    (0x0750, 0x077F, "arabic"),
+    (0x0900, 0x097F, "devanagari"),
+    (0x0980, 0x09FF, "bengali"),
+    (0x0A00, 0x0A7F, "gurmukhi"),
+    (0x0A80, 0x0AFF, "gujarati"),
+    (0x0B80, 0x0BFF, "tamil"),
+    (0x0C00, 0x0C7F, "telugu"),
+    (0x0C80, 0x0CFF, "kannada"),
+    (0x0D00, 0x0D7F, "malayalam"),
+    (0x0E00, 0x0E7F, "thai"),
+    (0x1100, 0x11FF, "hangul"),
+    (0x1E00, 0x1EFF, "latin"),
+    (0x1F00, 0x1FFF, "greek"),
+    (0x3040, 0x30FF, "kana"),
+    (0x3130, 0x318F, "hangul"),
+    (0x31F0, 0x31FF, "kana"),
+    (0x3400, 0x4DBF, "han"),
+    (0x4E00, 0x9FFF, "han"),
+    (0xAC00, 0xD7AF, "hangul"),
+    (0xF900, 0xFAFF, "han"),
+    (0xFB50, 0xFDFF, "arabic"),
+    (0xFE70, 0xFEFF, "arabic"),
+]
+_SCRIPT_RANGE_STARTS = [_range[0] for _range in SCRIPT_RANGES]
+
+# Languages written in each script
+SCRIPT_LANGS = {
+    "latin": [
+        "af", "ca", "cs", "cy", "da", "de", "en", "es", "et", "fi", "fr",
+        "hr", "hu", "id", "it", "lt", "lv", "nl", "no", "pl", "pt", "ro",
+        "sk", "sl", "so", "sq", "sv", "sw", "tl", "tr", "vi"
+    ],
+    "greek": ["el"],
+    "cyrillic": ["bg", "mk", "ru", "uk"],
+    "hebrew": ["he"],
+    "arabic": ["ar", "fa", "ur"],
+    "devanagari": ["hi", "mr", "ne"],
+    "bengali": ["bn"],
+    "gurmukhi": ["pa"],
+    "gujarati": ["gu"],
+    "tamil": ["ta"],
+    "telugu": ["te"],
+    "kannada": ["kn"],
+    "malayalam": ["ml"],
+    "thai": ["th"],
+    "hangul": ["ko"],
+    "kana": ["ja"],
+    "han": ["zh-cn", "zh-tw", "ja"],
+}
+
+# A text is assigned to a script if at least SCRIPT_MIN_SHARE of its letters
+# are in that script. Japanese mixes kana and han: a text in these scripts is
+# Japanese if at least SCRIPT_KANA_MIN_SHARE of them are kana. Only the first
+# SCRIPT_MAX_TEXT_LENGTH characters are examined, as in langdetect.
+SCRIPT_MIN_SHARE = 0.8
+SCRIPT_KANA_MIN_SHARE = 0.1
+SCRIPT_MAX_TEXT_LENGTH = 10000
+
+# Scripts written without spaces between words. Before a text is split into
+# blocks, words with characters of these scripts are cut into pieces that end
+# UNSPACED_WORD_LENGTH characters after their first character of these
+# scripts, so that a block of TEXT_SAMPLES_LENGTH words has a bounded length.
+UNSPACED_SCRIPTS = ["han", "kana", "thai"]
+UNSPACED_WORD_LENGTH = 10  # characters
+_UNSPACED_CHARS = ''.join(
+    '%s-%s' % (chr(_first), chr(_last))
+    for _first, _last, _script in SCRIPT_RANGES
+    if _script in UNSPACED_SCRIPTS
+)
+_UNSPACED_RE = re.compile('[%s]' % _UNSPACED_CHARS)
+_UNSPACED_PIECE_RE = re.compile('[^%s]*[%s].{%d}' % (
+    _UNSPACED_CHARS, _UNSPACED_CHARS, UNSPACED_WORD_LENGTH - 1
+), re.DOTALL)
+
+# Number of blocks of the content of a site that are detected to confirm the
+# language given by its meta-information (see detect_site_language)
+SITE_SAMPLE_BLOCKS = 3
+
+# Ways detect_site_language determines the language of a site: confirmed
+# meta-information, block detection on the content, meta-information alone
+# (no content)
+SITE_PATH_META = "meta"
+SITE_PATH_BLOCKS = "blocks"
+SITE_PATH_META_ONLY = "meta_only"
+
+# Maximal length of a text processed by langdetect's detectors
+_MAX_TEXT_LENGTH = 10000
+
+# Profiles of the numpy engine and langdetect factories restricted to a set of
+# candidate languages - built on first use
+_profile_matrices = {}
+_candidate_factories = {}
+_profiles_lock = threading.Lock()
+
+# Detectors reused by iter_detect_languages - one per thread
+_detector_context = threading.local()
+
+
+class DetectionConfig(object):
+    """
+    Settings that trade the speed of language detection for its accuracy
+
+    A config can be passed to the detection functions of this module (or the
+    name of one of `CONFIG_PRESETS`). Settings that are not given take the
+    value of the corresponding module constant at the time the config is
+    created.
+
+    Parameters
+    ----------
+    n_trials : int, optional (default: `N_TRIALS`)
+        number of trials run per text
+    text_samples_n : int, optional (default: `TEXT_SAMPLES_N`)
+        number of blocks detected per text in :func:`detect_language_blocks`
+    text_samples_length : int, optional (default: `TEXT_SAMPLES_LENGTH`)
+        number of words per block in :func:`detect_language_blocks`
+    prob_threshold : float, optional (default: `PROB_THRESHOLD`)
+        minimal probability of the language of a block
+    """
+
+    def __init__(
+            self,
+            n_trials=None,
+            text_samples_n=None,
+            text_samples_length=None,
+            prob_threshold=None
+    ):
+        self.n_trials = N_TRIALS if n_trials is None else n_trials
+        self.text_samples_n = (
+            TEXT_SAMPLES_N if text_samples_n is None else text_samples_n
+        )
+        self.text_samples_length = (
+            TEXT_SAMPLES_LENGTH if text_samples_length is None
+            else text_samples_length
+        )
+        self.prob_threshold = (
+            PROB_THRESHOLD if prob_threshold is None else prob_threshold
+        )
+        for _name in ["n_trials", "text_samples_n", "text_samples_length"]:
+            _value = getattr(self, _name)
+            if (isinstance(_value, bool) or not isinstance(_value, int)
+                    or _value < 1):
+                raise ValueError("%s is '%s' - expected a positive int"
+                                 % (_name, _value))
+        if not 0.0 <= self.prob_threshold < 1.0:
+            raise ValueError("prob_threshold is '%s' - expected a float in "
+                             "[0, 1)" % self.prob_threshold)
+
+    def key(self):
+        """Return the settings as a tuple (e.g. for cache keys)"""
+        return (self.n_trials, self.text_samples_n, self.text_samples_length,
+                self.prob_threshold)
+
+    def __eq__(self, other):
+        return isinstance(other, DetectionConfig) and self.key() == other.key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return ("DetectionConfig(n_trials=%r, text_samples_n=%r, "
+                "text_samples_length=%r, prob_threshold=%r)" % self.key())
+
+
+# Named configs: "fast" runs as many trials as langdetect by default on half
+# the blocks of fewer words, "accurate" doubles the trials and the blocks
+CONFIG_PRESETS = {
+    "fast": DetectionConfig(
+        n_trials=7, text_samples_n=10, text_samples_length=15
+    ),
+    "default": DetectionConfig(),
+    "accurate": DetectionConfig(
+        n_trials=40, text_samples_n=40, text_samples_length=25
+    ),
+}
+
 
 def _test_is_bool(var, name):
     return bool(var)
 
 
-def detect_languages(text, randomize_seed=False):
+def _test_is_text(text):
+    if not (isinstance(text, str) or isinstance(text, unicode_str)):
+        raise ValueError("text is of type '%s' - expected str" % type(text))
+
+
+def _test_engine(engine, adaptive_trials=False):
+    if engine not in ENGINES:
+        raise ValueError("unknown engine '%s' - expected one of %s" % (
+            engine, ', '.join(ENGINES)
+        ))
+    if engine == "numpy" and not lang_numpy.NUMPY_AVAILABLE:
+        raise ValueError("engine 'numpy' requires the numpy library, which "
+                         "could not be found")
+    if engine == "numpy" and adaptive_trials:
+        raise ValueError("adaptive_trials is not supported by engine 'numpy'")
+
+
+def _spread_order(n):
+    # Indices 0..n-1 in bit-reversed (van der Corput) order, e.g. for n=8:
+    # 0, 4, 2, 6, 1, 5, 3, 7
+    n_bits = max(1, (n - 1).bit_length())
+    return sorted(
+        range(n),
+        key=lambda i: int(format(i, '0%db' % n_bits)[::-1], 2)
+    )
+
+
+def _confidence_z(confidence):
+    if not 0.0 < confidence < 1.0:
+        raise ValueError("confidence must be between 0 and 1 - got %s"
+                         % confidence)
+    # z with erf(z / sqrt(2)) == confidence, i.e. the quantile of the
+    # standard normal distribution at (1 + confidence) / 2, found by bisection
+    # to the precision of erf (statistics.NormalDist needs python 3.8)
+    lower, upper = 0.0, 40.0
+    for _ in range(64):
+        z = (lower + upper) / 2.0
+        if math.erf(z / math.sqrt(2.0)) < confidence:
+            lower = z
+        else:
+            upper = z
+    return (lower + upper) / 2.0
+
+
+def _wilson_half_width(count, n, z):
+    p = count / n
+    denominator = 1.0 + z * z / n
+    return z * math.sqrt(p * (1.0 - p) / n + z * z / (4.0 * n * n)) \
+        / denominator
+
+
+def _min_settled_blocks(z, max_error):
+    # The smallest number of blocks for which a share can be settled, i.e.
+    # for which the interval of a share of 1 is small enough
+    if max_error <= 0.0:
+        raise ValueError("max_error must be larger than 0 - got %s"
+                         % max_error)
+    return max(1, int(math.ceil(z * z / (2.0 * max_error) - z * z)))
+
+
+def _shares_settled(counts, n, z, max_error):
+    return all(
+        _wilson_half_width(_count, n, z) <= max_error
+        for _count in counts
+    )
+
+
+def _resolve_seed(seed, randomize_seed):
+    # Returns an int, SEED_FROM_TEXT or None for a random seed
+    if randomize_seed:
+        return None
+    if seed is None:
+        return DEFAULT_SEED
+    if seed == SEED_FROM_TEXT:
+        return SEED_FROM_TEXT
+    if isinstance(seed, bool) or not isinstance(seed, int):
+        raise ValueError("seed is of type '%s' - expected int, None or '%s'"
+                         % (type(seed), SEED_FROM_TEXT))
+    # numpy's random number generator does not take negative seeds
+    if seed < 0:
+        raise ValueError("seed must not be negative - got %s" % seed)
+    return seed
+
+
+def _resolve_config(config):
+    # Returns a DetectionConfig - the module constants if config is None
+    if config is None:
+        return DetectionConfig()
+    if isinstance(config, DetectionConfig):
+        return config
+    if isinstance(config, basestring) and config in CONFIG_PRESETS:
+        return CONFIG_PRESETS[config]
+    raise ValueError("unknown config '%s' - expected a DetectionConfig or one "
+                     "of %s" % (config, ', '.join(sorted(CONFIG_PRESETS))))
+
+
+def _get_text_seed(seed, text):
+    # seed as returned by _resolve_seed
+    if seed == SEED_FROM_TEXT:
+        return text_seed(text)
+    return seed
+
+
+def text_seed(text):
+    """
+    Derive a seed for language detection from the content of text
+
+    The seed is the same for the same text in every process and on every
+    platform (unlike python's hash).
+
+    Parameters
+    ----------
+    text : str
+        The text
+
+    Returns
+    -------
+    seed : int
+        seed between 0 and 2**32 - 1
+    """
+    digest = hashlib.sha1(text.encode("utf-8", "surrogatepass"))
+    return int(digest.hexdigest()[:8], 16)
+
+
+def _resolve_candidates(candidate_langs):
+    # Returns None (all languages) or a sorted tuple of languages
+    if candidate_langs is None:
+        return None
+    if isinstance(candidate_langs, basestring):
+        raise ValueError("candidate_langs must be a list of languages - got "
+                         "a str")
+    candidates = tuple(sorted(set(candidate_langs)))
+    if len(candidates) == 0:
+        raise ValueError("candidate_langs must not be empty")
+    langs = get_lang_list()
+    unknown = [_lang for _lang in candidates if _lang not in langs]
+    if unknown:
+        raise ValueError("unknown candidate languages: %s"
+                         % ', '.join(unknown))
+    return candidates
+
+
+def _estimate_language(text):
+    # Scores up to CANDIDATE_CHECK_NGRAMS n-grams spread over text against
+    # all languages in a single deterministic pass (naive Bayes with
+    # langdetect's smoothing) and returns the most probable language
+    detector = _get_context_detector()
+    ngrams = _extract_ngrams(detector, text)
+    if not ngrams:
+        return None
+
+    step = max(1, len(ngrams) // CANDIDATE_CHECK_NGRAMS)
+    weight = detector.alpha / detector.BASE_FREQ
+    word_lang_prob_map = detector.word_lang_prob_map
+    probs = [1.0] * len(detector.langlist)
+    for _i, _ngram in enumerate(ngrams[::step]):
+        probs = [
+            _prob * (weight + _ngram_prob)
+            for _prob, _ngram_prob in zip(probs, word_lang_prob_map[_ngram])
+        ]
+        if _i % 10 == 9:
+            _max_prob = max(probs)
+            probs = [_prob / _max_prob for _prob in probs]
+    return detector.langlist[max(range(len(probs)), key=probs.__getitem__)]
+
+
+def _needs_fallback(text, langs, candidates):
+    # True if text detected with candidate languages shall be detected again
+    # with all languages
+    if langs is None or max(langs.values()) <= CANDIDATE_MIN_PROB:
+        return True
+    return _estimate_language(text) not in candidates
+
+
+def _get_script(char):
+    i = bisect.bisect_right(_SCRIPT_RANGE_STARTS, ord(char)) - 1
+    if i >= 0 and ord(char) <= SCRIPT_RANGES[i][1]:
+        return SCRIPT_RANGES[i][2]
+    return None
+
+
+def detect_script_languages(text):
+    """
+    Find the languages a text can be in based on its script
+
+    Counts the letters of text in each script (see `SCRIPT_RANGES`). If at
+    least `SCRIPT_MIN_SHARE` of the letters are in a single script, the
+    languages written in that script are returned (see `SCRIPT_LANGS`). Some
+    scripts determine the language, e.g. Thai, Hangul, Greek or Hebrew. Texts
+    in han and kana are Japanese if at least `SCRIPT_KANA_MIN_SHARE` of these
+    letters are kana.
+
+    Parameters
+    ----------
+    text : str
+        text to be analyzed
+
+    Returns
+    -------
+    langs : list of str or None
+        the languages the text can be in or None if text has no letters or
+        no dominant script
+    """
+    _test_is_text(text)
+
+    scripts = defaultdict(int)
+    for _char, _count in Counter(text[:SCRIPT_MAX_TEXT_LENGTH]).items():
+        _script = _get_script(_char)
+        if _script is not None:
+            scripts[_script] += _count
+
+    # kana and han are counted together for Japanese
+    n_kana = scripts.pop("kana", 0)
+    if n_kana > 0:
+        n_cjk = n_kana + scripts.pop("han", 0)
+        scripts["kana" if n_kana >= SCRIPT_KANA_MIN_SHARE * n_cjk
+                else "han"] = n_cjk
+
+    n_letters = sum(scripts.values())
+    if n_letters == 0:
+        return None
+    script, count = max(scripts.items(), key=lambda x: x[1])
+    if count < SCRIPT_MIN_SHARE * n_letters:
+        return None
+
+    langs = get_lang_list()
+    return [_lang for _lang in SCRIPT_LANGS[script] if _lang in langs]
+
+
+def _narrow_candidates(text, candidates):
+    # Returns the candidates (as returned by _resolve_candidates) narrowed to
+    # the languages of the script of text
+    script_langs = detect_script_languages(text)
+    if not script_langs:
+        return candidates
+    if len(script_langs) > 1 and candidates is not None:
+        narrowed = tuple(_lang for _lang in candidates
+                         if _lang in script_langs)
+        if narrowed:
+            return narrowed
+    return tuple(sorted(script_langs))
+
+
+def _get_base_factory():
+    # Loads the profiles on first use. With a profile store they are
+    # memory-mapped instead of being parsed by langdetect.
+    global _factory, _profile_store
+    if _factory is None:
+        with _backend_lock:
+            if _factory is None:
+                path = os.environ.get(PROFILE_STORE_ENV)
+                if path:
+                    _profile_store = lang_profiles.open_profiles(path)
+                    _factory = lang_profiles.ProfileFactory(_profile_store)
+                else:
+                    langdetect.detector_factory.init_factory()
+                    _factory = langdetect.detector_factory._factory
+    return _factory
+
+
+def warmup(engine=DEFAULT_ENGINE):
+    """
+    Initialize the language detection backend
+
+    The language profiles are loaded when they are needed for the first time,
+    so importing this module is cheap. Call this function to load them in
+    advance, e.g. before forking worker processes that shall share the
+    profiles, or to keep the loading time out of the first detection.
+
+    Parameters
+    ----------
+    engine : str, optional
+        engine to initialize - one of `ENGINES` (default "langdetect")
+    """
+    _test_engine(engine)
+    _get_base_factory()
+    if engine == "numpy":
+        _get_profile_matrix()
+
+
+def get_lang_list():
+    """
+    Return the languages that can be detected
+
+    Loads the language profiles if necessary. The list is also available as
+    the module attribute lang_list, which is kept for compatibility only: it
+    is computed on first access in python 3.7 and later, but when the module
+    is imported in older versions. Use this function instead.
+
+    Returns
+    -------
+    langs : list of str
+        language codes
+    """
+    return _get_base_factory().get_lang_list()
+
+
+def __getattr__(name):
+    # lang_list is computed on first access (python 3.7 and later, see the
+    # end of the module for older versions)
+    if name == "lang_list":
+        return get_lang_list()
+    raise AttributeError("module '%s' has no attribute '%s'"
+                         % (__name__, name))
+
+
+def use_profile_store(path):
+    """
+    Use a compiled profile store for language detection
+
+    The profiles are memory-mapped from the store (see
+    :mod:`~nic_crawler_analysis.analysis.lang_profiles`), so processes that
+    use the same store share a single copy of the profiles. The store is
+    compiled first if path does not exist. Results are the same as with the
+    profiles of langdetect.
+
+    The store can also be set with the environment variable
+    `PROFILE_STORE_ENV`, which is read when the profiles are loaded for the
+    first time. Then the profiles of langdetect are not loaded at all.
+
+    Requires the numpy library.
+
+    Parameters
+    ----------
+    path : str
+        directory of the store
+    """
+    global _profile_store, _factory
+    store = lang_profiles.open_profiles(path)
+    with _backend_lock, _profiles_lock:
+        _profile_store = store
+        _factory = lang_profiles.ProfileFactory(store)
+        _profile_matrices.clear()
+        _candidate_factories.clear()
+
+
+def _get_factory(candidates=None):
+    factory = _get_base_factory()
+    if candidates is None:
+        return factory
+
+    with _profiles_lock:
+        if candidates not in _candidate_factories:
+            if _profile_store is not None:
+                candidate_factory = lang_profiles.ProfileFactory(
+                    _profile_store.subset(candidates)
+                )
+                _candidate_factories[candidates] = candidate_factory
+                return candidate_factory
+
+            columns = [factory.langlist.index(_lang) for _lang in candidates]
+            candidate_factory = langdetect.DetectorFactory()
+            candidate_factory.langlist = list(candidates)
+            for _ngram, _probs in factory.word_lang_prob_map.items():
+                _candidate_probs = [_probs[_i] for _i in columns]
+                if any(_candidate_probs):
+                    candidate_factory.word_lang_prob_map[_ngram] = \
+                        _candidate_probs
+            _candidate_factories[candidates] = candidate_factory
+        return _candidate_factories[candidates]
+
+
+def _get_language_dict(detector):
+    try:
+        langs = detector.get_probabilities()
+    except langdetect.lang_detect_exception.LangDetectException:
+        return None
+
+    return {_lang.lang: _lang.prob for _lang in langs}
+
+
+def _get_context_detector(candidates=None):
+    detectors = getattr(_detector_context, "detectors", None)
+    if detectors is None:
+        detectors = _detector_context.detectors = {}
+    factory = _get_factory(candidates)
+    if factory not in detectors:
+        detectors[factory] = factory.create()
+    return detectors[factory]
+
+
+def _reset_detector(detector, seed, n_trials=None):
+    # Puts the detector into the state of a freshly created one. The seed is
+    # set on the detector only, the seed of langdetect's factory is not used.
+    detector.text = ''
+    detector.langprob = None
+    detector.n_trial = N_TRIALS if n_trials is None else n_trials
+    detector.seed = seed
+
+
+def _get_profile_matrix(candidates=None):
+    factory = _get_base_factory()
+    with _profiles_lock:
+        if None not in _profile_matrices:
+            if _profile_store is not None:
+                _profile_matrices[None] = _profile_store
+            else:
+                _profile_matrices[None] = \
+                    lang_numpy.ProfileMatrix.from_factory(factory)
+        if candidates not in _profile_matrices:
+            _profile_matrices[candidates] = \
+                _profile_matrices[None].subset(candidates)
+        return _profile_matrices[candidates]
+
+
+def _extract_ngrams(detector, text):
+    # Same preprocessing as langdetect.detector.Detector._detect_block
+    _reset_detector(detector, None)
+    detector.append(text)
+    detector.cleaning_text()
+    return detector._extract_ngrams()
+
+
+def _run_trials(detector, ngrams, adaptive_trials):
+    # Same as the trials in langdetect.detector.Detector._detect_block. With
+    # adaptive_trials the trials stop once the running mean of the most
+    # probable language is stable. The random numbers are drawn in the same
+    # order, so the trials are identical to those of langdetect.
+    n_trial = detector.n_trial
+    n_langs = len(detector.langlist)
+    langprob = [0.0] * n_langs
+
+    detector.random.seed(detector.seed)
+    i_top_last = None
+    top_prob_last = None
+    n_done = 0
+    for _t in range(n_trial):
+        prob = detector._init_probability()
+        alpha = detector.alpha \
+            + detector.random.gauss(0.0, 1.0) * detector.ALPHA_WIDTH
+
+        i = 0
+        while True:
+            detector._update_lang_prob(
+                prob, detector.random.choice(ngrams), alpha
+            )
+            if i % 5 == 0:
+                if (
+                    detector._normalize_prob(prob) > detector.CONV_THRESHOLD
+                    or i >= detector.ITERATION_LIMIT
+                ):
+                    break
+            i += 1
+        for j in range(n_langs):
+            langprob[j] += prob[j] / n_trial
+        n_done += 1
+
+        i_top = max(range(n_langs), key=langprob.__getitem__)
+        top_prob = langprob[i_top] * n_trial / n_done
+        if (
+            adaptive_trials
+            and n_done >= ADAPTIVE_MIN_TRIALS
+            and i_top == i_top_last
+            and abs(top_prob - top_prob_last) <= ADAPTIVE_TRIAL_TOLERANCE
+        ):
+            break
+        i_top_last = i_top
+        top_prob_last = top_prob
+
+    if n_done < n_trial:
+        langprob = [_prob * n_trial / n_done for _prob in langprob]
+    return langprob, n_done
+
+
+def _detect_with_detector(detector, text, adaptive_trials):
+    # Detects the language of text with a detector that has been reset and
+    # returns the languages and the number of trials run
+    detector.append(text)
+    if not adaptive_trials:
+        langs = _get_language_dict(detector)
+        return langs, (0 if langs is None else detector.n_trial)
+
+    detector.cleaning_text()
+    return _detect_ngrams(detector, detector._extract_ngrams(), True)
+
+
+def _detect_ngrams(detector, ngrams, adaptive_trials):
+    # Detects the language of the n-grams of a text with a detector that has
+    # been reset
+    if not ngrams:
+        return None, 0
+    detector.langprob, n_trials = _run_trials(
+        detector, ngrams, adaptive_trials
+    )
+    return _get_language_dict(detector), n_trials
+
+
+def _detect_text(detector, text, adaptive_trials, document=None):
+    # Detects the language of text with a detector that has been reset. The
+    # n-grams are taken from document (a _DocumentNgrams) if it knows text.
+    ngrams = None if document is None else document.get_ngrams(text)
+    if ngrams is None:
+        return _detect_with_detector(detector, text, adaptive_trials)
+    word_lang_prob_map = detector.word_lang_prob_map
+    return _detect_ngrams(
+        detector,
+        [_ngram for _ngram in ngrams if _ngram in word_lang_prob_map],
+        adaptive_trials
+    )
+
+
+def _word_ngrams(word):
+    # Returns the n-grams of word and the n-grams that follow from a space
+    # after it (unfiltered, in the order of Detector._extract_ngrams) and the
+    # numbers of latin and non-latin characters counted by
+    # Detector.cleaning_text. word is preprocessed like Detector.append.
+    word = langdetect.detector.Detector.URL_RE.sub(' ', word)
+    word = langdetect.detector.Detector.MAIL_RE.sub(' ', word)
+    word = NGram.normalize_vi(word)
+
+    n_latin = n_non_latin = 0
+    for _char in word:
+        if 'A' <= _char <= 'z':
+            n_latin += 1
+        elif (
+                _char >= '\u0300'
+                and unicode_block(_char) != 'Latin Extended Additional'
+        ):
+            n_non_latin += 1
+
+    ngram = NGram()
+    result = []
+    for _chars in (word, ' '):
+        _ngrams = []
+        for _char in _chars:
+            ngram.add_char(_char)
+            if ngram.capitalword:
+                continue
+            for _n in range(1, NGram.N_GRAM + 1):
+                if len(ngram.grams) < _n:
+                    break
+                _ngram = ngram.grams[-_n:]
+                if _ngram != ' ':
+                    _ngrams.append(_ngram)
+        result.append(_ngrams)
+    return result[0], result[1], n_latin, n_non_latin
+
+
+class _DocumentNgrams(object):
+    # N-grams of the blocks of a document, extracted once per distinct word.
+    #
+    # The n-grams of a block joined with single spaces are the n-grams of
+    # each word followed by the n-grams of the space after it (except for the
+    # last word), because the n-gram buffer of langdetect restarts after each
+    # space. This holds as long as the block is not truncated by langdetect
+    # and Detector.cleaning_text does not remove the latin characters;
+    # get_ngrams returns None for such blocks.
+
+    def __init__(self, samples):
+        # samples is a list of (i_begin, words) pairs (see _sample_blocks)
+        self._blocks = {}
+        for _i_begin, _words in samples:
+            self._blocks.setdefault(' '.join(_words), _words)
+        self._word_ngrams = {}
+
+    def _get_word_ngrams(self, word):
+        ngrams = self._word_ngrams.get(word)
+        if ngrams is None:
+            ngrams = self._word_ngrams[word] = _word_ngrams(word)
+        return ngrams
+
+    def get_ngrams(self, text):
+        block_words = self._blocks.get(text)
+        if block_words is None or not text or len(text) > _MAX_TEXT_LENGTH:
+            return None
+
+        words = [self._get_word_ngrams(_word) for _word in block_words]
+        n_latin = sum(_word[2] for _word in words)
+        n_non_latin = sum(_word[3] for _word in words)
+        if n_latin * 2 < n_non_latin:
+            return None
+
+        ngrams = []
+        for _word in words[:-1]:
+            ngrams.extend(_word[0])
+            ngrams.extend(_word[1])
+        ngrams.extend(words[-1][0])
+        return ngrams
+
+
+def _iter_detect_languages(
+        texts,
+        seed,
+        engine,
+        adaptive_trials,
+        candidates=None,
+        fallback=True,
+        script_prefilter=False,
+        document=None,
+        n_trials=None
+):
+    # Yields (languages, number of trials) for each text. seed as returned by
+    # _resolve_seed, candidates as returned by _resolve_candidates. The
+    # "incremental" engine takes the n-grams of the texts from document (a
+    # _DocumentNgrams) if possible. n_trials defaults to N_TRIALS.
+    if script_prefilter:
+        for _result in _iter_detect_languages_by_script(
+                texts, seed, engine, adaptive_trials, candidates, fallback,
+                document, n_trials
+        ):
+            yield _result
+        return
+
+    if engine == "numpy":
+        batch = []
+        for _text in texts:
+            batch.append(_text)
+            if len(batch) >= NUMPY_BATCH_SIZE:
+                for _result in _detect_languages_numpy_batch(
+                        batch, seed, candidates, fallback, n_trials
+                ):
+                    yield _result
+                batch = []
+        if batch:
+            for _result in _detect_languages_numpy_batch(
+                    batch, seed, candidates, fallback, n_trials
+            ):
+                yield _result
+        return
+
+    detector = _get_context_detector(candidates)
+    for _text in texts:
+        _test_is_text(_text)
+        _reset_detector(detector, _get_text_seed(seed, _text), n_trials)
+        _result = _detect_text(detector, _text, adaptive_trials, document)
+        if (
+                candidates is not None
+                and fallback
+                and _needs_fallback(_text, _result[0], candidates)
+        ):
+            _full_detector = _get_context_detector()
+            _reset_detector(
+                _full_detector, _get_text_seed(seed, _text), n_trials
+            )
+            _result = _detect_text(
+                _full_detector, _text, adaptive_trials, document
+            )
+        yield _result
+
+
+def _iter_detect_languages_by_script(
+        texts,
+        seed,
+        engine,
+        adaptive_trials,
+        candidates,
+        fallback,
+        document,
+        n_trials
+):
+    # Texts whose script determines the language are not scored. The other
+    # texts are scored with the candidates narrowed to the languages of their
+    # script, in groups of texts with the same candidates.
+    texts = iter(texts)
+    while True:
+        chunk = list(itertools.islice(texts, NUMPY_BATCH_SIZE))
+        if not chunk:
+            return
+
+        results = [None] * len(chunk)
+        groups = defaultdict(list)
+        for _i, _text in enumerate(chunk):
+            _candidates = _narrow_candidates(_text, candidates)
+            if _candidates is not None and len(_candidates) == 1:
+                results[_i] = ({_candidates[0]: 1.0}, 0)
+            else:
+                groups[_candidates].append(_i)
+
+        for _candidates, _indices in groups.items():
+            for _i, _result in zip(_indices, _iter_detect_languages(
+                    [chunk[_i] for _i in _indices], seed, engine,
+                    adaptive_trials, _candidates, fallback,
+                    document=document, n_trials=n_trials
+            )):
+                results[_i] = _result
+
+        for _result in results:
+            yield _result
+
+
+def _detect_languages_numpy_batch(
+        texts, seed, candidates, fallback, n_trials=None
+):
+    # Returns (languages, number of trials) for each text
+    if n_trials is None:
+        n_trials = N_TRIALS
+    results = _detect_languages_numpy(texts, seed, candidates, n_trials)
+    if candidates is not None and fallback:
+        i_fallback = [
+            _i for _i, _langs in enumerate(results)
+            if _needs_fallback(texts[_i], _langs, candidates)
+        ]
+        if i_fallback:
+            for _i, _langs in zip(i_fallback, _detect_languages_numpy(
+                    [texts[_i] for _i in i_fallback], seed, n_trials=n_trials
+            )):
+                results[_i] = _langs
+    return [
+        (_langs, (0 if _langs is None else n_trials)) for _langs in results
+    ]
+
+
+def _detect_languages_numpy(texts, seed, candidates=None, n_trials=None):
+    matrix = _get_profile_matrix(candidates)
+    detector = _get_context_detector(candidates)
+
+    ngram_ids = []
+    for _text in texts:
+        _test_is_text(_text)
+        ngram_ids.append(matrix.to_ids(_extract_ngrams(detector, _text)))
+
+    seeds = [_get_text_seed(seed, _text) for _text in texts]
+
+    results = []
+    for _probs in lang_numpy.score_ngrams(
+            matrix, ngram_ids, N_TRIALS if n_trials is None else n_trials,
+            seeds=seeds
+    ):
+        if _probs is None:
+            results.append(None)
+            continue
+        # Same filtering and ordering as langdetect
+        _langs = sorted(
+            [
+                (_lang, float(_prob))
+                for _lang, _prob in zip(matrix.langs, _probs)
+                if _prob > detector.PROB_THRESHOLD
+            ],
+            key=lambda x: x[1],
+            reverse=True
+        )
+        results.append(dict(_langs))
+    return results
+
+
+def detect_languages(
+        text,
+        randomize_seed=False,
+        engine=DEFAULT_ENGINE,
+        adaptive_trials=False,
+        return_n_trials=False,
+        seed=None,
+        cache=None,
+        candidate_langs=None,
+        candidate_fallback=True,
+        script_prefilter=False,
+        config=None
+):
     """
     Detect the language of text
 
@@ -50,7 +1039,56 @@ def detect_languages(text, randomize_seed=False):
 
     The underlying implementation in the langdetect library uses random
     samples of the text which are chosen based on an random-number-generator
-    seed. This seed is fixed by default.
+    seed. This seed is fixed to `DEFAULT_SEED` by default. Another seed can
+    be given with seed; seed=SEED_FROM_TEXT derives the seed from the content
+    of the text (see :func:`text_seed`). The seed is set for each call
+    separately and no global state is modified, so the function can be
+    called from several threads or processes at once and returns the same
+    results as when it is called serially.
+
+    Results can be cached in a
+    :class:`~nic_crawler_analysis.analysis.lang_cache.LanguageCache` that is
+    passed as cache. The results are stored under a digest of the text, the
+    seed and all parameters that influence the result. The cache is not used
+    if randomize_seed is True.
+
+    Three engines are available to score the text: "langdetect" uses the
+    langdetect library directly. "numpy" scores all trials at once with
+    vectorized operations (see
+    :mod:`~nic_crawler_analysis.analysis.lang_numpy`) and requires the numpy
+    library. It runs the same algorithm with other random numbers, so its
+    probabilities of ambiguous texts differ from those of "langdetect" (by up
+    to `lang_numpy.PROB_TOLERANCE` on the evaluation corpus), which can
+    change the language of blocks near `PROB_THRESHOLD` (see there).
+    "incremental" is the same as "langdetect" for single texts and only
+    differs in :func:`detect_language_blocks`.
+
+    langdetect runs `N_TRIALS` trials and averages their results. With
+    adaptive_trials the trials stop early once the most probable language
+    and its averaged probability are stable: after at least
+    `ADAPTIVE_MIN_TRIALS` trials, a trial that neither changes the most
+    probable language nor its probability by more than
+    `ADAPTIVE_TRIAL_TOLERANCE` ends the detection. The trials draw the same
+    random numbers as without adaptive_trials, so results are reproducible
+    for a fixed seed. Only the "langdetect" engine supports adaptive_trials.
+
+    If the language of the text is known to be one of a few languages (e.g.
+    from the top-level domain or the meta-information of a site), these can
+    be given as candidate_langs. Only the profiles of these languages are
+    scored, which is faster than scoring all languages. The probabilities are
+    then relative to the candidates. With candidate_fallback the text is
+    detected again with all languages if no candidate has a probability above
+    `CANDIDATE_MIN_PROB` or if a quick check of `CANDIDATE_CHECK_NGRAMS`
+    n-grams against all languages favours a language that is not a
+    candidate, so that texts in other languages are still recognized.
+
+    With script_prefilter the letters of the text are first counted per
+    Unicode script (see :func:`detect_script_languages`). If the script
+    determines the language (e.g. Thai, Hangul, Greek, Hebrew, Japanese
+    kana), the language is returned with a probability of 1.0 without
+    scoring any n-grams (and n_trials is 0). If several languages use the
+    script (e.g. Cyrillic, Arabic, Latin), only these languages are used as
+    candidates (intersected with candidate_langs if given).
 
     Parameters
     ----------
@@ -59,34 +1097,544 @@ def detect_languages(text, randomize_seed=False):
     randomize_seed : bool, optional
         True if random seed used in language detection shall be chosen at
         random (default False)
+    engine : str, optional
+        engine used to score the text - one of `ENGINES`
+        (default "langdetect")
+    adaptive_trials : bool, optional
+        True if the trials shall stop once the result is stable
+        (default False)
+    return_n_trials : bool, optional
+        True if the number of trials that were run shall be returned
+        (default False)
+    seed : int or str, optional
+        seed of the random number generator (a non-negative int) or
+        `SEED_FROM_TEXT`. Ignored if randomize_seed is True.
+        (default `DEFAULT_SEED`)
+    cache : LanguageCache, optional
+        cache for the results (default None)
+    candidate_langs : list of str, optional
+        languages the text is expected to be in - must be in
+        :func:`get_lang_list` (default None: all languages)
+    candidate_fallback : bool, optional
+        True if the text shall be detected with all languages when no
+        candidate is probable enough (default True)
+    script_prefilter : bool, optional
+        True if the script of the text shall be used to determine the
+        language or narrow the candidates (default False)
+    config : DetectionConfig or str, optional
+        settings of the detection or the name of one of `CONFIG_PRESETS`
+        (default None: the module constants, e.g. `N_TRIALS`)
 
     Returns
     -------
     languages : dict
         dict of language -> probability pairs
+    n_trials : int, optional (return_n_trials == True)
+        number of trials that were run (0 if the text has no features)
     """
-    if not (isinstance(text, str) or isinstance(text, unicode_str)):
-        raise ValueError("text is of type '%s' - expected str" % type(text))
+    _test_is_text(text)
 
-    _test_is_bool(randomize_seed, "randomize_seed")
+    randomize_seed = _test_is_bool(randomize_seed, "randomize_seed")
+    adaptive_trials = _test_is_bool(adaptive_trials, "adaptive_trials")
+    return_n_trials = _test_is_bool(return_n_trials, "return_n_trials")
+    candidate_fallback = _test_is_bool(
+        candidate_fallback, "candidate_fallback"
+    )
+    script_prefilter = _test_is_bool(script_prefilter, "script_prefilter")
+    _test_engine(engine, adaptive_trials)
+    seed = _resolve_seed(seed, randomize_seed)
+    candidates = _resolve_candidates(candidate_langs)
+    config = _resolve_config(config)
 
-    if randomize_seed:
-        preset_seed = langdetect.DetectorFactory.seed
-        langdetect.DetectorFactory.seed = None
+    if cache is not None and seed is not None:
+        key = lang_cache.cache_key(
+            text, "detect_languages", seed, config.n_trials, engine,
+            adaptive_trials, candidates, candidate_fallback, script_prefilter
+        )
+        found, value = cache.get(key)
+        if found:
+            langs, n_trials = value
+        else:
+            langs, n_trials = _detect_languages(
+                text, engine, adaptive_trials, seed, candidates,
+                candidate_fallback, script_prefilter, config.n_trials
+            )
+            cache.put(key, [langs, n_trials])
+    else:
+        langs, n_trials = _detect_languages(
+            text, engine, adaptive_trials, seed, candidates,
+            candidate_fallback, script_prefilter, config.n_trials
+        )
 
-    detector = langdetect.detector_factory._factory.create()
-    detector.n_trial = N_TRIALS
-    detector.append(text)
+    if return_n_trials:
+        return langs, n_trials
+    else:
+        return langs
 
-    if randomize_seed:
-        langdetect.DetectorFactory.seed = preset_seed
 
-    try:
-        langs = detector.get_probabilities()
-    except langdetect.lang_detect_exception.LangDetectException:
-        return None
+def _detect_languages(
+        text,
+        engine,
+        adaptive_trials,
+        seed,
+        candidates=None,
+        fallback=True,
+        script_prefilter=False,
+        n_trials=None
+):
+    if script_prefilter:
+        candidates = _narrow_candidates(text, candidates)
+        if candidates is not None and len(candidates) == 1:
+            return {candidates[0]: 1.0}, 0
 
-    return {_lang.lang: _lang.prob for _lang in langs}
+    if engine == "numpy":
+        return _detect_languages_numpy_batch(
+            [text], seed, candidates, fallback, n_trials
+        )[0]
+
+    result = _detect_languages_single(
+        text, seed, adaptive_trials, candidates, n_trials
+    )
+    if (
+            candidates is not None
+            and fallback
+            and _needs_fallback(text, result[0], candidates)
+    ):
+        result = _detect_languages_single(
+            text, seed, adaptive_trials, n_trials=n_trials
+        )
+    return result
+
+
+def _detect_languages_single(
+        text, seed, adaptive_trials, candidates=None, n_trials=None
+):
+    detector = _get_factory(candidates).create()
+    _reset_detector(detector, _get_text_seed(seed, text), n_trials)
+    return _detect_with_detector(detector, text, adaptive_trials)
+
+
+def iter_detect_languages(
+        texts,
+        randomize_seed=False,
+        engine=DEFAULT_ENGINE,
+        adaptive_trials=False,
+        seed=None,
+        candidate_langs=None,
+        candidate_fallback=True,
+        script_prefilter=False,
+        config=None
+):
+    """
+    Detect the language of each text in an iterable of texts
+
+    Works like :func:`detect_languages` but reuses a single langdetect
+    detector per thread for all texts instead of creating a new one for every
+    text. The detector is reset before each text, so the results are the same
+    as those of :func:`detect_languages`.
+
+    The numpy engine scores `NUMPY_BATCH_SIZE` texts at once.
+
+    Parameters
+    ----------
+    texts : iterable of str
+        The texts to be analyzed
+    randomize_seed : bool, optional
+        True if random seed used in language detection shall be chosen at
+        random (default False)
+    engine : str, optional
+        engine used to score the texts - one of `ENGINES`
+        (default "langdetect")
+    adaptive_trials : bool, optional
+        True if the trials shall stop once the result is stable (see
+        :func:`detect_languages`, default False)
+    seed : int or str, optional
+        seed of the random number generator or `SEED_FROM_TEXT` (see
+        :func:`detect_languages`, default `DEFAULT_SEED`)
+    candidate_langs : list of str, optional
+        languages the texts are expected to be in (see
+        :func:`detect_languages`, default None: all languages)
+    candidate_fallback : bool, optional
+        True if a text shall be detected with all languages when no candidate
+        is probable enough (default True)
+    script_prefilter : bool, optional
+        True if the script of a text shall be used to determine its language
+        or narrow the candidates (see :func:`detect_languages`,
+        default False)
+    config : DetectionConfig or str, optional
+        settings of the detection or the name of one of `CONFIG_PRESETS`
+        (see :func:`detect_languages`, default None)
+
+    Yields
+    ------
+    languages : dict or None
+        dict of language -> probability pairs for each text, in the order of
+        texts
+    """
+    randomize_seed = _test_is_bool(randomize_seed, "randomize_seed")
+    adaptive_trials = _test_is_bool(adaptive_trials, "adaptive_trials")
+    candidate_fallback = _test_is_bool(
+        candidate_fallback, "candidate_fallback"
+    )
+    script_prefilter = _test_is_bool(script_prefilter, "script_prefilter")
+    _test_engine(engine, adaptive_trials)
+    seed = _resolve_seed(seed, randomize_seed)
+    candidates = _resolve_candidates(candidate_langs)
+    config = _resolve_config(config)
+
+    for _langs, _n_trials in _iter_detect_languages(
+            texts, seed, engine, adaptive_trials, candidates,
+            candidate_fallback, script_prefilter, n_trials=config.n_trials
+    ):
+        yield _langs
+
+
+def detect_languages_batch(
+        texts,
+        randomize_seed=False,
+        engine=DEFAULT_ENGINE,
+        adaptive_trials=False,
+        seed=None,
+        candidate_langs=None,
+        candidate_fallback=True,
+        script_prefilter=False,
+        config=None
+):
+    """
+    Detect the language of many texts
+
+    See :func:`iter_detect_languages`.
+
+    Parameters
+    ----------
+    texts : iterable of str
+        The texts to be analyzed
+    randomize_seed : bool, optional
+        True if random seed used in language detection shall be chosen at
+        random (default False)
+    engine : str, optional
+        engine used to score the texts - one of `ENGINES`
+        (default "langdetect")
+    adaptive_trials : bool, optional
+        True if the trials shall stop once the result is stable (see
+        :func:`detect_languages`, default False)
+    seed : int or str, optional
+        seed of the random number generator or `SEED_FROM_TEXT` (see
+        :func:`detect_languages`, default `DEFAULT_SEED`)
+    candidate_langs : list of str, optional
+        languages the texts are expected to be in (see
+        :func:`detect_languages`, default None: all languages)
+    candidate_fallback : bool, optional
+        True if a text shall be detected with all languages when no candidate
+        is probable enough (default True)
+    script_prefilter : bool, optional
+        True if the script of a text shall be used to determine its language
+        or narrow the candidates (see :func:`detect_languages`,
+        default False)
+    config : DetectionConfig or str, optional
+        settings of the detection or the name of one of `CONFIG_PRESETS`
+        (see :func:`detect_languages`, default None)
+
+    Returns
+    -------
+    languages : list of dict
+        dict of language -> probability pairs (or None) for each text, in the
+        order of texts
+    """
+    return list(iter_detect_languages(
+        texts,
+        randomize_seed=randomize_seed,
+        engine=engine,
+        adaptive_trials=adaptive_trials,
+        seed=seed,
+        candidate_langs=candidate_langs,
+        candidate_fallback=candidate_fallback,
+        script_prefilter=script_prefilter,
+        config=config
+    ))
+
+
+def _segment_word(word):
+    # Pieces of word (see UNSPACED_SCRIPTS). The cuts only depend on the
+    # characters before them, so a word can be segmented while it is read.
+    pieces = []
+    begin = 0
+    for _match in _UNSPACED_PIECE_RE.finditer(word):
+        pieces.append(word[begin:_match.end()])
+        begin = _match.end()
+    if begin < len(word):
+        pieces.append(word[begin:])
+    return pieces
+
+
+def _segment_words(words):
+    # words with the words of unspaced scripts replaced by their pieces
+    segmented = []
+    for _word in words:
+        if len(_word) > UNSPACED_WORD_LENGTH and _UNSPACED_RE.search(_word):
+            segmented.extend(_segment_word(_word))
+        else:
+            segmented.append(_word)
+    return segmented
+
+
+def _split_words(text):
+    # Words of text as used for blocks - text.split() with the words of
+    # unspaced scripts segmented
+    words = text.split()
+    if _UNSPACED_RE.search(text):
+        words = _segment_words(words)
+    return words
+
+
+def _get_block_begins(n_words, config):
+    # Index of the first word of each block of a text with n_words words
+    length = config.text_samples_length
+    n_samples = config.text_samples_n
+    if n_words <= length:
+        # there is only enough space for a single sample
+        begins = [0, ]
+    elif n_words < (length + n_samples):
+        # we can slide over (n_words - length) times
+        begins = range(0, n_words - length, 1)
+    else:
+        # The text is large enough that we can slide over n_samples times.
+        # step is chosen so that the samples are uniformly distributed over the
+        # text.
+        step = math.floor(float(n_words - length) / n_samples)
+        assert step > 0, "step should be larger than 0"
+        begins = range(0, n_words - length, int(step))
+    return list(begins)
+
+
+def _sample_blocks(words, config):
+    # (i_begin, words) of each block of a list of words
+    length = config.text_samples_length
+    return [
+        (_i_begin, words[_i_begin:_i_begin + length])
+        for _i_begin in _get_block_begins(len(words), config)
+    ]
+
+
+def _iter_text_chunks(text):
+    # Slices of STREAM_CHUNK_LENGTH characters of text
+    for _i in range(0, len(text), STREAM_CHUNK_LENGTH):
+        yield text[_i:_i + STREAM_CHUNK_LENGTH]
+
+
+def _iter_chunk_words(chunks):
+    # Lists of the words of the concatenation of chunks as returned by
+    # _split_words - a word that spans several chunks is in the list of the
+    # last of them, apart from its complete pieces if it is segmented
+    rest = ''
+    for _chunk in chunks:
+        _test_is_text(_chunk)
+        _chunk = rest + _chunk
+        rest = ''
+        _words = _split_words(_chunk)
+        if _words and not _chunk[-1].isspace():
+            rest = _words.pop()
+            if _UNSPACED_RE.search(rest):
+                _pieces = _segment_word(rest)
+                rest = _pieces.pop()
+                _words.extend(_pieces)
+        yield _words
+    if rest:
+        yield [rest]
+
+
+def _sample_text_blocks(text, config):
+    # Same blocks as _sample_blocks(_split_words(text)), found in two passes
+    # over the chunks of text without holding all of its words: the first
+    # pass counts the words, the second one collects the words of the blocks.
+    length = config.text_samples_length
+    n_words = sum(
+        len(_words) for _words in _iter_chunk_words(_iter_text_chunks(text))
+    )
+    samples = [
+        (_i_begin, []) for _i_begin in _get_block_begins(n_words, config)
+    ]
+    end = samples[-1][0] + length
+
+    offset = 0  # index of the first word of the chunk
+    for _words in _iter_chunk_words(_iter_text_chunks(text)):
+        for _i_begin, _block_words in samples:
+            if offset - length < _i_begin < offset + len(_words):
+                _block_words.extend(_words[
+                    max(_i_begin - offset, 0):
+                    _i_begin + length - offset
+                ])
+        offset += len(_words)
+        if offset >= end:
+            break
+    return samples
+
+
+def _sample_stream_blocks(chunk_words, config):
+    # Blocks of the words of an iterable of chunks in a single pass (see the
+    # streaming parameter of detect_language_blocks). chunk_words yields the
+    # list of words of each chunk. The blocks starting at every step-th word
+    # are kept; step doubles whenever 2 * config.text_samples_n blocks are
+    # kept, so that the kept blocks always cover the words seen so far evenly.
+    # As in _get_block_begins, the last block of the text is only used if the
+    # text has a single block.
+    length = config.text_samples_length
+    n_samples = config.text_samples_n
+    step = 1
+    samples = []
+    tail = []  # last words of the previous chunks that fit in a block
+    n_words = 0
+    for _words in chunk_words:
+        if not _words:
+            continue
+        _buffer = tail + _words
+        _offset = n_words - len(tail)  # index of the first word of _buffer
+        # blocks ending before one of the new words, which are therefore not
+        # the last block of the text
+        _i_begin = max(n_words - length, 0)
+        _i_begin = -(-_i_begin // step) * step
+        n_words += len(_words)
+        while _i_begin + length < n_words:
+            samples.append((_i_begin, _buffer[
+                _i_begin - _offset:_i_begin - _offset + length
+            ]))
+            if len(samples) == 2 * n_samples:
+                step *= 2
+                samples = samples[::2]
+            _i_begin = (_i_begin // step + 1) * step
+        tail = _buffer[-length:]
+
+    if n_words <= length:
+        return [(0, tail)]
+    if len(samples) > n_samples:
+        samples = [
+            samples[_i * len(samples) // n_samples]
+            for _i in range(n_samples)
+        ]
+    return samples
+
+
+def _detect_language_blocks(
+        text,
+        include_unk,
+        return_shares,
+        engine,
+        adaptive,
+        confidence,
+        max_error,
+        adaptive_trials,
+        seed,
+        candidates,
+        candidate_fallback,
+        script_prefilter,
+        streaming,
+        config
+):
+    # See detect_language_blocks - returns the shares/counts, the blocks and
+    # the number of blocks evaluated
+    if not streaming:
+        samples = _sample_blocks(_split_words(text), config)
+    elif isinstance(text, basestring):
+        samples = _sample_text_blocks(text, config)
+    else:
+        samples = _sample_stream_blocks(_iter_chunk_words(text), config)
+
+    language_block_counts = defaultdict(int)
+    count_blocks_identified = 0
+
+    # The incremental engine extracts the n-grams of each word once and
+    # detects identical blocks once (unless the seed is random)
+    document = None
+    if engine == "incremental":
+        document = _DocumentNgrams(samples)
+    reuse_results = engine == "incremental" and seed is not None
+
+    if adaptive:
+        # Evaluate the blocks spread over the whole text first, so that the
+        # blocks evaluated before stopping early are a representative sample
+        samples = [samples[_i] for _i in _spread_order(len(samples))]
+        z = _confidence_z(confidence)
+        chunk_size = _min_settled_blocks(z, max_error)
+    else:
+        chunk_size = len(samples)
+
+    blocks = []
+    n_blocks = 0
+
+    while n_blocks < len(samples):
+        _chunk_samples = samples[n_blocks:n_blocks + chunk_size]
+        _chunk_begins = [_i_begin for _i_begin, _ in _chunk_samples]
+        _chunk_texts = [' '.join(_words) for _, _words in _chunk_samples]
+        if reuse_results:
+            _unique_texts = list(OrderedDict.fromkeys(_chunk_texts))
+        else:
+            _unique_texts = _chunk_texts
+        _chunk_langs = _iter_detect_languages(
+            _unique_texts, seed, engine, adaptive_trials, candidates,
+            candidate_fallback, script_prefilter, document, config.n_trials
+        )
+        if reuse_results:
+            _results = dict(zip(_unique_texts, _chunk_langs))
+            _chunk_langs = [
+                (_langs if _langs is None else dict(_langs), _n_trials)
+                for _langs, _n_trials in (
+                    _results[_text] for _text in _chunk_texts
+                )
+            ]
+
+        for _i_begin, _text, (_langs, _n_trials) in zip(
+                _chunk_begins, _chunk_texts, _chunk_langs
+        ):
+            _lang_detected = "unk"
+            if _langs is not None:
+                for _lang, _prob in _langs.items():
+                    if _prob > config.prob_threshold:
+                        _lang_detected = _lang
+                        language_block_counts[_lang] += 1
+                        count_blocks_identified += 1
+                        break
+
+            blocks.append({
+                'i_begin': _i_begin,
+                'text': _text,
+                'lang_probs': _langs,
+                'lang': _lang_detected,
+                'n_trials': _n_trials
+            })
+        n_blocks += len(_chunk_begins)
+
+        if adaptive:
+            if _shares_settled(
+                    list(language_block_counts.values())
+                    + [n_blocks - count_blocks_identified],
+                    n_blocks,
+                    z,
+                    max_error
+            ):
+                break
+            chunk_size = 1
+
+    if adaptive:
+        blocks.sort(key=lambda x: x['i_begin'])
+
+    if return_shares:
+        count = n_blocks if include_unk else count_blocks_identified
+        result = {
+            _lang: _counts / count
+            for _lang, _counts in language_block_counts.items()
+        }
+        if include_unk:
+            unk_share = 1.0 - count_blocks_identified / count
+            if unk_share > 0:
+                result["unk"] = unk_share
+    else:
+        result = dict(language_block_counts)
+        if include_unk:
+            unk_n = n_blocks - count_blocks_identified
+            if unk_n > 0:
+                result["unk"] = unk_n
+
+    return result, blocks, n_blocks
 
 
 def detect_language_blocks(
@@ -94,7 +1642,20 @@ def detect_language_blocks(
         include_unk=True,
         randomize_seed=False,
         return_shares=True,
-        return_blocks=False
+        return_blocks=False,
+        engine=DEFAULT_ENGINE,
+        adaptive=False,
+        confidence=ADAPTIVE_CONFIDENCE,
+        max_error=ADAPTIVE_MAX_ERROR,
+        return_n_blocks=False,
+        adaptive_trials=False,
+        seed=None,
+        cache=None,
+        candidate_langs=None,
+        candidate_fallback=True,
+        script_prefilter=False,
+        streaming=False,
+        config=None
 ):
     """
     Split text into blocks and detect the language of each block
@@ -102,7 +1663,18 @@ def detect_language_blocks(
     The text is split into at most 20 blocks of 20 words each of which may
     overlap with each other depending on the length of the string. If the
     string is too short to generate 20 blocks without repeating a block, the
-    number of blocks is reduced accordingly.
+    number of blocks is reduced accordingly. The number and length of the
+    blocks, the probability threshold and the number of trials can be set
+    with config.
+
+    Chinese, Japanese and Thai are written without spaces between words, so
+    a "word" of such a text may be a whole sentence or paragraph. Words with
+    characters of these scripts (see `UNSPACED_SCRIPTS`) are therefore cut
+    into pieces that end `UNSPACED_WORD_LENGTH` characters after their first
+    character of these scripts, and the pieces are used as words. This bounds
+    the length of the blocks of such texts. Words without characters of
+    these scripts are never cut. The text of a block consists of its words
+    joined with single spaces.
 
     The language probabilities of each block are calculated using
     detectLanguage and a block is considered to be in a given language if its
@@ -117,10 +1689,33 @@ def detect_language_blocks(
 
     Additional information on each block is returned if return_blocks == True.
 
+    In adaptive mode the blocks are evaluated in an order that spreads them
+    over the whole text and the evaluation stops as soon as the shares of all
+    languages (including "unk") are known well enough: the half width of the
+    Wilson score interval of each share at the given confidence level must be
+    at most max_error. With the default settings a text where all blocks agree
+    is settled after 4 blocks, while a text with two languages of similar
+    share needs all blocks. The shares are then estimated from the evaluated
+    blocks only.
+
+    In streaming mode the text is never split into a list of all its words,
+    which saves memory and time on very large texts, as only the words of the
+    blocks are needed. A str is scanned twice, first to count its words and
+    then to collect the words of the blocks, so the blocks are the same as
+    without streaming. An iterable of str is scanned in a single pass: the
+    chunks are concatenated (a word may span several chunks) and the blocks
+    starting at every step-th word are kept, where step starts at 1 and
+    doubles whenever 40 blocks are kept. At the end at most 20 of the kept
+    blocks are picked evenly spread over the text. The blocks are thus spread
+    evenly over the text as without streaming, but not necessarily at the
+    same positions. For texts of up to 40 words the blocks are the same. The
+    results of iterables are not cached.
+
     Parameters
     ----------
-    text : str
-        text to be analyzed
+    text : str or iterable of str
+        text to be analyzed - an iterable of chunks of the text in streaming
+        mode only
     include_unk : bool, optional (default: True)
         True if result should include unknown blocks marked with "unk"
     randomize_seed : bool, optional (default: False)
@@ -132,6 +1727,50 @@ def detect_language_blocks(
     return_blocks : bool, optional (default: False)
         True if the blocks used to detect the language shall be returned as a
         list of dict.
+    engine : str, optional (default: "langdetect")
+        engine used to score the blocks - one of `ENGINES`. The numpy engine
+        scores all blocks of the text at once (see :func:`detect_languages`).
+        The incremental engine extracts the n-grams of each distinct word of
+        the text once and assembles the n-grams of each block from those of
+        its words instead of extracting them from every block, and detects
+        identical blocks only once. Its results are identical to those of the
+        langdetect engine.
+    adaptive : bool, optional (default: False)
+        True if the evaluation of blocks shall stop once the language shares
+        are settled
+    confidence : float, optional (default: `ADAPTIVE_CONFIDENCE`)
+        confidence level of the intervals used in adaptive mode
+    max_error : float, optional (default: `ADAPTIVE_MAX_ERROR`)
+        maximal half width of the interval of each share in adaptive mode
+    return_n_blocks : bool, optional (default: False)
+        True if the number of blocks that were evaluated shall be returned
+    adaptive_trials : bool, optional (default: False)
+        True if the trials for each block shall stop once the result is
+        stable (see :func:`detect_languages`). The number of trials run is
+        stored under 'n_trials' in the information on each block.
+    seed : int or str, optional (default: `DEFAULT_SEED`)
+        seed of the random number generator or `SEED_FROM_TEXT` (see
+        :func:`detect_languages`). With `SEED_FROM_TEXT` the seed of each
+        block is derived from the text of the block.
+    cache : LanguageCache, optional (default: None)
+        cache for the results (see :func:`detect_languages`)
+    candidate_langs : list of str, optional (default: None)
+        languages the text is expected to be in (see
+        :func:`detect_languages`). Each block is detected with these
+        languages only.
+    candidate_fallback : bool, optional (default: True)
+        True if a block shall be detected with all languages when no
+        candidate is probable enough
+    script_prefilter : bool, optional (default: False)
+        True if the script of each block shall be used to determine its
+        language or narrow the candidates (see :func:`detect_languages`)
+    streaming : bool, optional (default: False)
+        True if the blocks shall be sampled without splitting the whole text
+        into words (see above)
+    config : DetectionConfig or str, optional (default: None)
+        settings of the detection or the name of one of `CONFIG_PRESETS` -
+        the number and length of the blocks, the probability threshold and
+        the number of trials (see :class:`DetectionConfig`)
 
     Returns
     -------
@@ -140,81 +1779,67 @@ def detect_language_blocks(
 
     blocks : list of dict, optional (return_blocks == True)
         list of dict where each dict contains information on a single block of
-        text that was generated.
+        text that was evaluated, ordered by position in the text.
+
+    n_blocks : int, optional (return_n_blocks == True)
+        number of blocks that were evaluated
     """
 
-    if not isinstance(text, basestring):
+    streaming = _test_is_bool(streaming, "streaming")
+    is_text = isinstance(text, basestring)
+    if not (is_text or streaming and hasattr(text, '__iter__')):
         raise ValueError("text is of type '%s' - expected str" % type(text))
 
     include_unk = _test_is_bool(include_unk, "include_unk")
     randomize_seed = _test_is_bool(randomize_seed, "randomize_seed")
     return_shares = _test_is_bool(return_shares, "return_shares")
     return_blocks = _test_is_bool(return_blocks, "return_blocks")
+    adaptive = _test_is_bool(adaptive, "adaptive")
+    return_n_blocks = _test_is_bool(return_n_blocks, "return_n_blocks")
+    adaptive_trials = _test_is_bool(adaptive_trials, "adaptive_trials")
+    candidate_fallback = _test_is_bool(
+        candidate_fallback, "candidate_fallback"
+    )
+    script_prefilter = _test_is_bool(script_prefilter, "script_prefilter")
+    _test_engine(engine, adaptive_trials)
+    seed = _resolve_seed(seed, randomize_seed)
+    candidates = _resolve_candidates(candidate_langs)
+    config = _resolve_config(config)
 
-    words = text.split()
-    n_words = len(words)
-
-    language_block_counts = defaultdict(int)
-    count_blocks_identified = 0
-
-    if n_words <= TEXT_SAMPLES_LENGTH:
-        # there is only enough space for a single sample
-        begins = [0, ]
-    elif n_words < (TEXT_SAMPLES_LENGTH + TEXT_SAMPLES_N):
-        # we can slide over (n_words - TEXT_SAMPLES_LENGTH) times
-        begins = range(0, n_words - TEXT_SAMPLES_LENGTH, 1)
-    else:
-        # The text is large enough that we can slide over TEXT_SAMPLES_N times.
-        # step is chosen so that the samples are uniformly distributed over the
-        # text.
-        step = math.floor(
-            float(n_words - TEXT_SAMPLES_LENGTH) / TEXT_SAMPLES_N
+    # The blocks of a str do not depend on streaming, so neither does the key
+    if cache is not None and seed is not None and is_text:
+        key = lang_cache.cache_key(
+            text, "detect_language_blocks", seed, config.n_trials,
+            config.text_samples_n, config.text_samples_length,
+            UNSPACED_WORD_LENGTH, config.prob_threshold, include_unk,
+            return_shares, engine, adaptive, confidence, max_error,
+            adaptive_trials, candidates, candidate_fallback, script_prefilter
         )
-        assert step > 0, "step should be larger than 0"
-        begins = range(0, n_words - TEXT_SAMPLES_LENGTH, step)
-
-    blocks = []
-
-    for _i_begin in begins:
-        _text = ' '.join(words[_i_begin:_i_begin + TEXT_SAMPLES_LENGTH])
-        _langs = detect_languages(_text, randomize_seed=randomize_seed)
-
-        _lang_detected = "unk"
-        if _langs is not None:
-            for _lang, _prob in _langs.items():
-                if _prob > PROB_THRESHOLD:
-                    _lang_detected = _lang
-                    language_block_counts[_lang] += 1
-                    count_blocks_identified += 1
-                    break
-
-        blocks.append({
-            'i_begin': _i_begin,
-            'text': _text,
-            'lang_probs': _langs,
-            'lang': _lang_detected
-
-        })
-
-    if return_shares:
-        count = len(begins) if include_unk else count_blocks_identified
-        result = {
-            _lang: _counts / count
-            for _lang, _counts in language_block_counts.items()
-        }
-        if include_unk:
-            unk_share = 1.0 - count_blocks_identified / count
-            if unk_share > 0:
-                result["unk"] = unk_share
+        found, value = cache.get(key)
+        if found:
+            result, blocks, n_blocks = value
+        else:
+            result, blocks, n_blocks = _detect_language_blocks(
+                text, include_unk, return_shares, engine, adaptive,
+                confidence, max_error, adaptive_trials, seed, candidates,
+                candidate_fallback, script_prefilter, streaming, config
+            )
+            cache.put(key, [result, blocks, n_blocks])
     else:
-        result = dict(language_block_counts)
-        if include_unk:
-            unk_n = len(begins) - count_blocks_identified
-            if unk_n > 0:
-                result["unk"] = unk_n
+        result, blocks, n_blocks = _detect_language_blocks(
+            text, include_unk, return_shares, engine, adaptive, confidence,
+            max_error, adaptive_trials, seed, candidates, candidate_fallback,
+            script_prefilter, streaming, config
+        )
 
+    ret = (result, )
     if return_blocks:
-        return result, blocks
+        ret += (blocks, )
+    if return_n_blocks:
+        ret += (n_blocks, )
+
+    if len(ret) > 1:
+        return ret
     else:
         return result
 
@@ -222,24 +1847,31 @@ def detect_language_blocks(
 def get_site_meta_language(
         header,
         body,
-        accepted_langs=KNOWN_LANG_TAGS
+        accepted_langs=KNOWN_LANG_TAGS,
+        document_cache=None
 ):
     """
     Find the language of a site in the meta-information given.
 
     The function looks at three places in the following order: the top-level
     <html> tag, a http-equiv tag and finally in the HTTP header. The first
-    language found that is in accepted_langs is returned.
+    language found that is in accepted_langs is returned. If body is a str
+    or bytes, only its <head> is parsed (see
+    :func:`~nic_crawler_analysis.parse.html.parse_html`). The Content-Type
+    of header is used to decode bytes.
 
     Parameters
     ----------
     header : str or list of dict
         Header either as a str that contains json or a list of dictionaries
         each with the keys 'h' and 'v'
-    body : str or bs4.BeautifulSoup
+    body : str, bytes or bs4.BeautifulSoup
         HTML content of the site
     accepted_langs : list
         list of accepted language tags
+    document_cache : DocumentCache, optional
+        cache of parsed documents, used if body is a str or bytes (see
+        :func:`~nic_crawler_analysis.parse.html.parse_html`)
 
     Returns
     -------
@@ -254,10 +1886,17 @@ def get_site_meta_language(
     if isinstance(body, bs4.BeautifulSoup):
         bs = body
     elif isinstance(body, str):
-        bs = parse_html(body)
+        bs = parse_html(
+            body, head_only=True, document_cache=document_cache
+        )
+    elif isinstance(body, bytes):
+        bs = parse_html(
+            body, head_only=True, document_cache=document_cache,
+            content_type=extract_http_header_content_type(header)
+        )
     else:
-        raise ValueError("unknown body - expected str or bs4.BeautifulSoup - "
-                         "got '%s'" % (type(body)))
+        raise ValueError("unknown body - expected str, bytes or "
+                         "bs4.BeautifulSoup - got '%s'" % (type(body)))
 
     # Prefer language tags in the following order:
     #   HTML Start -> HTTP-EQUIV -> HEADER
@@ -283,3 +1922,215 @@ def get_site_meta_language(
 
     # No language found
     return None
+
+
+def _get_site_meta_languages(header, bs, accepted_langs):
+    # Languages of the <html> tag, the http-equiv tag and the HTTP header
+    return [
+        extract_html_lang_tag(bs, accepted_langs=accepted_langs),
+        extract_http_equiv_lang_tag(bs, accepted_langs=accepted_langs),
+        extract_http_header_lang_tag(header, accepted_langs=accepted_langs),
+    ]
+
+
+def _confirm_site_language(text, lang, engine, seed, cache, config):
+    # True if the blocks of a small sample of text are all detected in lang
+    samples = _sample_blocks(_split_words(text), config)
+    samples = [
+        samples[_i] for _i in _spread_order(len(samples))
+    ][:SITE_SAMPLE_BLOCKS]
+    results = [
+        detect_languages(
+            ' '.join(_words), engine=engine, seed=seed, cache=cache,
+            config=config
+        )
+        for _, _words in samples
+    ]
+    confirmed = all(
+        _langs is not None and _langs.get(lang, 0) > config.prob_threshold
+        for _langs in results
+    )
+    return confirmed, len(samples)
+
+
+def detect_site_language(
+        header,
+        body,
+        accepted_langs=KNOWN_LANG_TAGS,
+        text=None,
+        engine=DEFAULT_ENGINE,
+        seed=None,
+        cache=None,
+        config=None,
+        return_path=False,
+        return_n_blocks=False,
+        document_cache=None,
+        bounded_text=False
+):
+    """
+    Determine the language of a site from its meta-information and content
+
+    The meta-information is cheap to evaluate and usually right, so it is
+    checked first: if the languages of the <html> tag, the http-equiv tag and
+    the HTTP header that are present (see :func:`get_site_meta_language`)
+    agree, a sample of `SITE_SAMPLE_BLOCKS` blocks of the content, spread over
+    the text, is detected. If the language of every block of the sample is
+    the one of the meta-information with a probability above the threshold
+    of the config (0.95 by default), that language is returned (path
+    `SITE_PATH_META`).
+
+    Otherwise, i.e. if there is no meta-information, if it disagrees or if
+    the sample does not confirm it, the languages of all blocks of the
+    content are detected with :func:`detect_language_blocks` and the language
+    with the largest share is returned (path `SITE_PATH_BLOCKS`). If the site
+    has no text, the language of the meta-information is returned if it
+    agrees (path `SITE_PATH_META_ONLY`).
+
+    Parameters
+    ----------
+    header : str or dict
+        HTTP header either as a str that contains json (a list of dicts each
+        with the keys 'h' and 'v') or as a dict of header names and values
+    body : str, bytes, bs4.BeautifulSoup or dict
+        HTML content of the site (the Content-Type of header is used to
+        decode bytes - see
+        :func:`~nic_crawler_analysis.parse.html.parse_html`) or its inputs
+        as returned by
+        :func:`~nic_crawler_analysis.parse.html.extract_all_from_html` (e.g.
+        in streaming mode), which were extracted with the same
+        accepted_langs
+    accepted_langs : list, optional
+        list of accepted language tags of the meta-information
+    text : str, optional (default: None)
+        text of the site if it was extracted already (see
+        :func:`~nic_crawler_analysis.parse.html.extract_text_from_html`)
+    engine : str, optional (default: "langdetect")
+        engine used to detect the language of the content - one of `ENGINES`
+    seed : int or str, optional (default: `DEFAULT_SEED`)
+        seed of the random number generator or `SEED_FROM_TEXT` (see
+        :func:`detect_languages`)
+    cache : LanguageCache, optional (default: None)
+        cache for the results of the content detection
+    config : DetectionConfig or str, optional (default: None)
+        settings of the content detection or the name of one of
+        `CONFIG_PRESETS` (see :func:`detect_language_blocks`)
+    return_path : bool, optional (default: False)
+        True if the way the language was determined shall be returned
+    return_n_blocks : bool, optional (default: False)
+        True if the number of blocks of the content that were detected shall
+        be returned
+    document_cache : DocumentCache, optional (default: None)
+        cache of parsed documents, used if body is a str or bytes (see
+        :func:`~nic_crawler_analysis.parse.html.parse_html`)
+    bounded_text : bool, optional (default: False)
+        True if only as many words of the text shall be extracted as the
+        content detection samples (the text_samples_n blocks of
+        text_samples_length words of the config, spread over the document -
+        see max_words of
+        :func:`~nic_crawler_analysis.parse.html.extract_text_from_html`), so
+        that large sites cost about as much as small ones. Not used if text
+        is given or body is a dict
+
+    Returns
+    -------
+    language : str or None
+        language of the site or None if it could not be determined
+    path : str, optional (return_path == True)
+        one of `SITE_PATH_META`, `SITE_PATH_BLOCKS` and `SITE_PATH_META_ONLY`
+    n_blocks : int, optional (return_n_blocks == True)
+        number of blocks that were detected
+    """
+    if not isinstance(header, str) and not isinstance(header, dict):
+        raise ValueError(
+            "unknown header - expected str or dict - got '%s'" % (type(header))
+        )
+
+    extracted = None
+    if isinstance(body, bs4.BeautifulSoup):
+        bs = body
+    elif isinstance(body, str):
+        bs = parse_html(body, document_cache=document_cache)
+    elif isinstance(body, bytes):
+        bs = parse_html(
+            body, document_cache=document_cache,
+            content_type=extract_http_header_content_type(header)
+        )
+    elif isinstance(body, dict):
+        extracted = body
+    else:
+        raise ValueError("unknown body - expected str, bytes, "
+                         "bs4.BeautifulSoup or dict - got '%s'"
+                         % (type(body)))
+
+    return_path = _test_is_bool(return_path, "return_path")
+    return_n_blocks = _test_is_bool(return_n_blocks, "return_n_blocks")
+    bounded_text = _test_is_bool(bounded_text, "bounded_text")
+    _test_engine(engine)
+    config = _resolve_config(config)
+
+    if extracted is not None:
+        meta_langs = [
+            extracted['html_lang'],
+            extracted['http_equiv_lang'],
+            extract_http_header_lang_tag(
+                header, accepted_langs=accepted_langs
+            ),
+        ]
+    else:
+        meta_langs = _get_site_meta_languages(header, bs, accepted_langs)
+    meta_langs = set(_lang for _lang in meta_langs if _lang is not None)
+    meta_lang = meta_langs.pop() if len(meta_langs) == 1 else None
+
+    if text is None:
+        if extracted is not None:
+            text = extracted['text']
+        elif bounded_text:
+            text = extract_text_from_html(
+                bs,
+                max_words=config.text_samples_n * config.text_samples_length,
+                n_segments=config.text_samples_n
+            )
+        else:
+            text = extract_text_from_html(bs)
+
+    if not text:
+        language, path, n_blocks = meta_lang, SITE_PATH_META_ONLY, 0
+    else:
+        confirmed = False
+        n_blocks = 0
+        if meta_lang is not None:
+            confirmed, n_blocks = _confirm_site_language(
+                text, meta_lang, engine, seed, cache, config
+            )
+
+        if confirmed:
+            language, path = meta_lang, SITE_PATH_META
+        else:
+            shares, n_blocks_all = detect_language_blocks(
+                text, include_unk=False, engine=engine, seed=seed,
+                cache=cache, config=config, return_n_blocks=True
+            )
+            language = None
+            if shares:
+                language = max(
+                    sorted(shares.items()), key=lambda x: x[1]
+                )[0]
+            path = SITE_PATH_BLOCKS
+            n_blocks += n_blocks_all
+
+    ret = (language, )
+    if return_path:
+        ret += (path, )
+    if return_n_blocks:
+        ret += (n_blocks, )
+
+    if len(ret) > 1:
+        return ret
+    else:
+        return language
+
+
+# Module __getattr__ (PEP 562) is not called before python 3.7, so lang_list
+# is computed at import there, as before profiles were loaded lazily
+if sys.version_info < (3, 7):
+    lang_list = get_lang_list()
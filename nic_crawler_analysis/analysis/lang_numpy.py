@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized n-gram scoring for language detection
+
+This module implements the scoring algorithm of the langdetect library with
+NumPy. The language profiles are loaded into a dense matrix of n-gram ->
+language probabilities and all trials of all texts are scored at once with
+array operations instead of updating one n-gram at a time in python.
+
+The algorithm is the same as langdetect's: each trial starts with a uniform
+distribution over the languages, randomly picks n-grams of the text and
+multiplies the probabilities of each language with the probability of the
+n-gram in that language (plus a smoothing term alpha that is drawn at random
+for each trial). A trial stops when the probability of the most probable
+language exceeds `CONV_THRESHOLD` (checked every 5 n-grams) or after
+`ITERATION_LIMIT` n-grams. The probabilities of all trials are averaged.
+
+The random numbers are drawn from NumPy's random number generator instead of
+python's :mod:`random` module, so the results are not identical to those of
+langdetect, but statistically the same. Almost every trial converges to a
+single language, so the probabilities returned by both engines are close to
+multiples of 1 / n_trial. For unambiguous texts, where all trials agree, both
+engines return the same language with probabilities that differ by less than
+`PROB_TOLERANCE_UNAMBIGUOUS`. For ambiguous texts (e.g. a few CJK characters)
+a different number of trials may end up in each language. `PROB_TOLERANCE`
+is the largest difference of such probabilities that was measured on the
+evaluation corpus of the tests; it is not a bound. On that corpus both
+engines return the same most probable language for every document.
+
+The engines are therefore not interchangeable where a probability is
+compared to a threshold. A difference of `PROB_TOLERANCE` moves a
+probability across `PROB_THRESHOLD` of
+:mod:`~nic_crawler_analysis.analysis.lang_detect` (0.95), so
+detect_language_blocks with engine="numpy" can label short or ambiguous
+blocks with another language or "unk" than langdetect does (22 of 650 runs
+on the evaluation corpus with 10 seeds).
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import zip
+from future import standard_library
+
+standard_library.install_aliases()
+
+# Test whether ModuleNotFoundError is available and replace it if not
+# This is a python 2.7 compatibility fix
+try:
+    ModuleNotFoundError
+except NameError:
+    ModuleNotFoundError = ImportError
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ModuleNotFoundError:
+    NUMPY_AVAILABLE = False
+
+# Parameters of langdetect.detector.Detector
+ALPHA_DEFAULT = 0.5
+ALPHA_WIDTH = 0.05
+ITERATION_LIMIT = 1000
+CONV_THRESHOLD = 0.99999
+BASE_FREQ = 10000
+
+# Number of n-grams that are drawn per trial in each vectorized step. Must be
+# a multiple of 5 so that convergence checks fall on the same n-grams as in
+# langdetect.
+CHUNK_SIZE = 20
+
+# Differences of language probabilities compared to langdetect for
+# unambiguous and ambiguous texts (see module documentation). The latter is
+# only the largest difference measured on the evaluation corpus with 10
+# seeds, i.e. 5 of 20 trials that end in another language.
+PROB_TOLERANCE_UNAMBIGUOUS = 1e-5
+PROB_TOLERANCE = 0.25
+
+
+class ProfileMatrix(object):
+    """
+    Language profiles stored as a dense n-gram x language matrix
+
+    The n-grams are kept in a sorted array and looked up with a binary
+    search, so the profiles consist of plain arrays only. This allows to store
+    them in binary files that are memory-mapped (see
+    :mod:`~nic_crawler_analysis.analysis.lang_profiles`).
+
+    Attributes
+    ----------
+    langs : list of str
+        languages in the order of the columns of probs
+    ngrams : numpy.ndarray
+        sorted array of the n-grams in the order of the rows of probs
+    probs : numpy.ndarray
+        array of shape (n_ngrams, n_langs) with the probability of each n-gram
+        in each language
+    """
+
+    def __init__(self, langs, ngrams, probs):
+        if not NUMPY_AVAILABLE:
+            raise ValueError("ProfileMatrix requires the numpy library, "
+                             "which could not be found")
+        self.langs = list(langs)
+        self.ngrams = ngrams
+        self.probs = probs
+
+    @classmethod
+    def from_factory(cls, factory):
+        """
+        Build the matrix from the profiles loaded by a langdetect factory
+
+        Parameters
+        ----------
+        factory : langdetect.detector_factory.DetectorFactory
+            factory with loaded profiles
+
+        Returns
+        -------
+        matrix : ProfileMatrix
+            the profiles of factory
+        """
+        if not NUMPY_AVAILABLE:
+            raise ValueError("ProfileMatrix requires the numpy library, "
+                             "which could not be found")
+        word_lang_prob_map = factory.word_lang_prob_map
+        ngrams = np.array(sorted(word_lang_prob_map))
+        probs = np.zeros(
+            (len(ngrams), len(factory.langlist)),
+            dtype=np.float64
+        )
+        for _i, _ngram in enumerate(ngrams):
+            probs[_i, :] = word_lang_prob_map[_ngram]
+        return cls(factory.langlist, ngrams, probs)
+
+    def subset(self, langs):
+        """
+        Return the profiles of some languages only
+
+        N-grams that have a probability of 0 in all of these languages are
+        dropped.
+
+        Parameters
+        ----------
+        langs : list of str
+            languages to keep - must be in self.langs
+
+        Returns
+        -------
+        matrix : ProfileMatrix
+            the profiles of langs
+        """
+        columns = [self.langs.index(_lang) for _lang in langs]
+        probs = self.probs[:, columns]
+        rows = np.flatnonzero(probs.any(axis=1))
+        return ProfileMatrix(langs, self.ngrams[rows], probs[rows])
+
+    def find(self, ngrams):
+        """
+        Return the row indices of a list of n-grams
+
+        Parameters
+        ----------
+        ngrams : list of str
+            n-grams to look up
+
+        Returns
+        -------
+        ids : numpy.ndarray
+            row index of each n-gram in probs or -1 if it is not in the
+            profiles
+        """
+        if len(ngrams) == 0:
+            return np.zeros(0, dtype=np.intp)
+        if len(self.ngrams) == 0:
+            return np.full(len(ngrams), -1, dtype=np.intp)
+        ngrams = np.array(ngrams)
+        ids = np.searchsorted(self.ngrams, ngrams)
+        ids[ids >= len(self.ngrams)] = 0
+        ids[self.ngrams[ids] != ngrams] = -1
+        return ids
+
+    def to_ids(self, ngrams):
+        """Return the row indices of the known n-grams of a list as array"""
+        ids = self.find(ngrams)
+        return ids[ids >= 0]
+
+
+def _init_rows(ngram_id_arrays, n_trial):
+    # One row per trial of each text that has n-grams
+    texts = []
+    lengths = []
+    offsets = []
+    offset = 0
+    for _i_text, _ids in enumerate(ngram_id_arrays):
+        if len(_ids) > 0:
+            texts.extend([_i_text] * n_trial)
+            lengths.extend([len(_ids)] * n_trial)
+            offsets.extend([offset] * n_trial)
+        offset += len(_ids)
+    return (
+        np.array(texts, dtype=np.intp),
+        np.array(lengths, dtype=np.intp),
+        np.array(offsets, dtype=np.intp),
+    )
+
+
+def _draw_uniform(rngs, row_texts, n_steps):
+    # Draws the random numbers of each row from the generator of its text, so
+    # that the numbers a text gets do not depend on the other texts scored
+    # with it. The rows of a text are consecutive.
+    uniform = np.empty((len(row_texts), n_steps))
+    bounds = np.flatnonzero(np.diff(row_texts)) + 1
+    for _begin, _end in zip(
+            np.concatenate(([0], bounds)),
+            np.concatenate((bounds, [len(row_texts)]))
+    ):
+        uniform[_begin:_end] = rngs[row_texts[_begin]].random(
+            (_end - _begin, n_steps)
+        )
+    return uniform
+
+
+def score_ngrams(
+        matrix,
+        ngram_id_arrays,
+        n_trial,
+        seeds=None,
+        alpha=ALPHA_DEFAULT
+):
+    """
+    Score the n-grams of several texts against all language profiles
+
+    Each text uses its own random number generator, so the result for a text
+    only depends on the text and its seed and not on the other texts that are
+    scored in the same call.
+
+    Parameters
+    ----------
+    matrix : ProfileMatrix
+        language profiles
+    ngram_id_arrays : list of numpy.ndarray
+        for each text the row indices of its n-grams in matrix (see
+        :meth:`ProfileMatrix.to_ids`)
+    n_trial : int
+        number of trials per text
+    seeds : list of int or None, optional
+        for each text the seed of its random number generator. None for a
+        random seed. If seeds is None, all texts get a random seed.
+    alpha : float, optional
+        mean of the smoothing parameter
+
+    Returns
+    -------
+    probs : list of numpy.ndarray or None
+        for each text the average probability of each language (in the order
+        of matrix.langs) or None if the text has no n-grams
+    """
+    n_langs = len(matrix.langs)
+    if seeds is None:
+        seeds = [None] * len(ngram_id_arrays)
+    rngs = [np.random.default_rng(_seed) for _seed in seeds]
+
+    row_texts, row_lengths, row_offsets = _init_rows(
+        ngram_id_arrays, n_trial
+    )
+    n_rows = len(row_texts)
+
+    result = [None] * len(ngram_id_arrays)
+    if n_rows == 0:
+        return result
+
+    all_ids = np.concatenate([
+        _ids for _ids in ngram_id_arrays if len(_ids) > 0
+    ])
+    weights = np.concatenate([
+        rngs[_i_text].standard_normal(n_trial)
+        for _i_text in row_texts[::n_trial]
+    ])
+    weights = (alpha + weights * ALPHA_WIDTH) / BASE_FREQ
+
+    # The probabilities are kept in log space, which makes the periodic
+    # normalization done by langdetect unnecessary
+    log_probs = np.full((n_rows, n_langs), -np.log(n_langs))
+    active = np.arange(n_rows)
+    step = 0
+    while active.size > 0:
+        n_steps = min(CHUNK_SIZE, ITERATION_LIMIT + 1 - step)
+        picks = (
+            _draw_uniform(rngs, row_texts[active], n_steps)
+            * row_lengths[active, None]
+        ).astype(np.intp) + row_offsets[active, None]
+        updates = np.log(
+            weights[active, None, None] + matrix.probs[all_ids[picks]]
+        )
+        cumulated = log_probs[active, None, :] + np.cumsum(updates, axis=1)
+
+        # langdetect checks for convergence after n-gram 0, 5, 10, ...
+        iterations = np.arange(step, step + n_steps)
+        checks = np.nonzero(
+            (iterations % 5 == 0) | (iterations >= ITERATION_LIMIT)
+        )[0]
+        checked = cumulated[:, checks, :]
+        max_probs = 1.0 / np.exp(
+            checked - checked.max(axis=2)[:, :, None]
+        ).sum(axis=2)
+        converged = (
+            (max_probs > CONV_THRESHOLD)
+            | (iterations[checks] >= ITERATION_LIMIT)[None, :]
+        )
+        is_done = converged.any(axis=1)
+        first = converged.argmax(axis=1)
+
+        log_probs[active[is_done]] = checked[is_done, first[is_done]]
+        log_probs[active[~is_done]] = cumulated[~is_done, -1]
+        active = active[~is_done]
+        step += n_steps
+
+    log_probs -= log_probs.max(axis=1)[:, None]
+    probs = np.exp(log_probs)
+    probs /= probs.sum(axis=1)[:, None]
+
+    # The trials of a text are stored in consecutive rows
+    text_probs = probs.reshape(-1, n_trial, n_langs).mean(axis=1)
+    for _i_text, _probs in zip(row_texts[::n_trial], text_probs):
+        result[_i_text] = _probs
+    return result
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled, memory-mapped language profiles
+
+langdetect parses its language profiles from dozens of JSON files into python
+dicts in every process that uses it. This takes a noticeable time at startup
+and every worker process holds its own copy of the profiles.
+
+This module compiles the profiles once into a directory of binary NumPy
+arrays:
+
+- ``ngrams.npy``: the sorted n-grams as fixed-width unicode strings
+- ``probs.npy``: the n-gram x language matrix of probabilities (float64)
+- ``profiles.json``: the languages (the columns of probs) and the format
+  version
+
+:func:`load_profiles` memory-maps these arrays instead of reading them, so
+loading takes milliseconds and all processes that load the same store share
+one physical copy of the profiles through the page cache.
+:class:`ProfileFactory` provides the store to code that expects a langdetect
+factory. The probabilities are copied unchanged from langdetect's profiles, so
+detection results are identical.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import dict
+from future import standard_library
+
+import os
+import json
+import shutil
+import tempfile
+
+import langdetect
+from langdetect.detector import Detector
+
+from . import lang_numpy
+
+standard_library.install_aliases()
+
+FORMAT_VERSION = 1
+META_FILE = "profiles.json"
+NGRAMS_FILE = "ngrams.npy"
+PROBS_FILE = "probs.npy"
+
+# Maximal number of unknown n-grams remembered by a ProfileProbMap
+MAX_CACHED_MISSES = 100000
+
+
+def compile_profiles(path, factory=None):
+    """
+    Compile language profiles into a store
+
+    The store is written to a temporary directory first and then renamed, so
+    several processes may compile the same store at once.
+
+    Parameters
+    ----------
+    path : str
+        directory of the store - must not exist
+    factory : langdetect.detector_factory.DetectorFactory, optional
+        factory with loaded profiles. By default the profiles shipped with
+        langdetect are loaded.
+    """
+    if factory is None:
+        factory = langdetect.DetectorFactory()
+        factory.load_profile(langdetect.detector_factory.PROFILES_DIRECTORY)
+    matrix = lang_numpy.ProfileMatrix.from_factory(factory)
+
+    parent = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+    tmp_path = tempfile.mkdtemp(dir=parent)
+    try:
+        # mkdtemp creates the directory readable by the owner only
+        os.chmod(tmp_path, 0o755)
+        lang_numpy.np.save(os.path.join(tmp_path, NGRAMS_FILE), matrix.ngrams)
+        lang_numpy.np.save(os.path.join(tmp_path, PROBS_FILE), matrix.probs)
+        with open(os.path.join(tmp_path, META_FILE), "w") as f:
+            json.dump(
+                dict(format_version=FORMAT_VERSION, langs=matrix.langs), f
+            )
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+
+
+def load_profiles(path, mmap=True):
+    """
+    Load the language profiles of a store
+
+    Parameters
+    ----------
+    path : str
+        directory of the store (see :func:`compile_profiles`)
+    mmap : bool, optional
+        True if the arrays shall be memory-mapped instead of being read into
+        memory (default True)
+
+    Returns
+    -------
+    matrix : ProfileMatrix
+        the profiles (read-only if mmap is True)
+    """
+    if not lang_numpy.NUMPY_AVAILABLE:
+        raise ValueError("Profile stores require the numpy library, which "
+                         "could not be found")
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError("profile store '%s' has format version %s - "
+                         "expected %s"
+                         % (path, meta.get("format_version"), FORMAT_VERSION))
+
+    mmap_mode = "r" if mmap else None
+    ngrams = lang_numpy.np.load(
+        os.path.join(path, NGRAMS_FILE), mmap_mode=mmap_mode
+    )
+    probs = lang_numpy.np.load(
+        os.path.join(path, PROBS_FILE), mmap_mode=mmap_mode
+    )
+    return lang_numpy.ProfileMatrix(meta["langs"], ngrams, probs)
+
+
+def open_profiles(path):
+    """
+    Load the profiles of a store and compile the store first if it is missing
+
+    Parameters
+    ----------
+    path : str
+        directory of the store
+
+    Returns
+    -------
+    matrix : ProfileMatrix
+        the memory-mapped profiles
+    """
+    if not os.path.isdir(path):
+        compile_profiles(path)
+    return load_profiles(path)
+
+
+class ProfileProbMap(object):
+    """
+    Read-only n-gram -> probabilities mapping backed by a ProfileMatrix
+
+    Implements the part of the dict interface langdetect's Detector uses. Rows
+    that were looked up are kept as lists, so that repeated lookups are as
+    fast as with a dict, while n-grams that never occur are not loaded.
+
+    Parameters
+    ----------
+    matrix : ProfileMatrix
+        the profiles
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self._rows = {}
+        self._misses = set()
+
+    def _lookup(self, ngram):
+        row = self._rows.get(ngram)
+        if row is None and ngram not in self._misses:
+            i = self.matrix.find([ngram])[0]
+            if i >= 0:
+                row = self._rows[ngram] = self.matrix.probs[i].tolist()
+            else:
+                if len(self._misses) >= MAX_CACHED_MISSES:
+                    self._misses.clear()
+                self._misses.add(ngram)
+        return row
+
+    def __contains__(self, ngram):
+        return self._lookup(ngram) is not None
+
+    def __getitem__(self, ngram):
+        row = self._lookup(ngram)
+        if row is None:
+            raise KeyError(ngram)
+        return row
+
+    def __len__(self):
+        return len(self.matrix.ngrams)
+
+    def get(self, ngram, default=None):
+        row = self._lookup(ngram)
+        return default if row is None else row
+
+
+class ProfileFactory(object):
+    """
+    Factory of langdetect detectors that use the profiles of a ProfileMatrix
+
+    Can be used in place of langdetect's DetectorFactory.
+
+    Parameters
+    ----------
+    matrix : ProfileMatrix
+        the profiles, e.g. as returned by :func:`load_profiles`
+
+    Attributes
+    ----------
+    langlist : list of str
+        the languages of the profiles
+    word_lang_prob_map : ProfileProbMap
+        n-gram -> probability of each language in langlist
+    seed : int or None
+        default seed of the detectors
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.langlist = list(matrix.langs)
+        self.word_lang_prob_map = ProfileProbMap(matrix)
+        self.seed = None
+
+    def create(self, alpha=None):
+        """Return a new langdetect detector"""
+        detector = Detector(self)
+        if alpha is not None:
+            detector.set_alpha(alpha)
+        return detector
+
+    def get_lang_list(self):
+        return list(self.langlist)
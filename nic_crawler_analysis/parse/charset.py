@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Character encoding of HTML documents given as bytes
+
+:func:`sniff_charset` determines the encoding of a document the way browsers
+do, but only from a prefix of it: a byte order mark, the charset of the HTTP
+Content-Type header and the charset of a <meta> tag in the first
+`SNIFF_LENGTH` bytes are checked in this order. Documents without any of
+these are tested for UTF-8, and only if the test fails, a statistical
+detector (cchardet, chardet or charset_normalizer, whichever is installed)
+is run on a sample of `DETECT_LENGTH` bytes.
+
+:func:`decode_html` decodes a whole document and :func:`iter_decode_html`
+decodes it chunk by chunk, so that the consumers of a stream never hold a
+second copy of the whole document.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import bytes, range
+from future import standard_library
+
+import re
+import codecs
+
+standard_library.install_aliases()
+
+# Test whether ModuleNotFoundError is available and replace it if not
+# This is a python 2.7 compatibility fix
+try:
+    ModuleNotFoundError
+except NameError:
+    ModuleNotFoundError = ImportError
+
+# Statistical detectors in the order of preference. All of them have a
+# chardet compatible detect function.
+try:
+    import cchardet as _detector
+    CHARSET_DETECTOR_AVAILABLE = True
+except ModuleNotFoundError:
+    try:
+        import chardet as _detector
+        CHARSET_DETECTOR_AVAILABLE = True
+    except ModuleNotFoundError:
+        try:
+            import charset_normalizer as _detector
+            CHARSET_DETECTOR_AVAILABLE = True
+        except ModuleNotFoundError:
+            CHARSET_DETECTOR_AVAILABLE = False
+
+# Number of bytes searched for a <meta> tag with a charset
+SNIFF_LENGTH = 4096
+# Number of bytes tested for UTF-8 and given to the statistical detector
+DETECT_LENGTH = 65536
+# Number of bytes decoded at once by iter_decode_html
+DECODE_CHUNK_LENGTH = 65536
+# Encoding of documents whose encoding can not be determined otherwise
+# (windows-1252, as in browsers)
+DEFAULT_CHARSET = "cp1252"
+
+# Where the encoding returned by sniff_charset was found
+CHARSET_SOURCES = ["bom", "header", "meta", "utf-8", "detector", "default"]
+
+# Byte order marks and the codecs that decode them (and remove the mark).
+# The marks of UTF-32 start with the ones of UTF-16 and are checked first.
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Encodings that browsers decode with another one (see the WHATWG Encoding
+# Standard): latin-1 and ASCII are decoded as windows-1252,
+_CHARSET_REPLACEMENTS = {
+    "ascii": "cp1252",
+    "iso8859-1": "cp1252",
+}
+# and a UTF-16 or UTF-32 <meta> charset, which can not have been read from
+# the ASCII bytes of the document, as UTF-8
+_META_CHARSET_REPLACEMENTS = {
+    "utf-16": "utf-8",
+    "utf-16-le": "utf-8",
+    "utf-16-be": "utf-8",
+    "utf-32": "utf-8",
+    "utf-32-le": "utf-8",
+    "utf-32-be": "utf-8",
+}
+
+_CONTENT_TYPE_CHARSET_RE = re.compile(
+    r"""charset\s*=\s*["']?\s*([^\s;"']+)""", re.IGNORECASE
+)
+_META_CHARSET_RE = re.compile(
+    br"""<meta\s[^>]*?charset\s*=\s*["']?\s*([a-zA-Z0-9_:.\-]+)""",
+    re.IGNORECASE
+)
+
+
+def normalize_charset(label):
+    """
+    Return the name of the codec of an encoding label
+
+    Parameters
+    ----------
+    label : str
+        label of an encoding, e.g. "UTF8" or "iso-8859-1"
+
+    Returns
+    -------
+    charset : str or None
+        name of the python codec or None if the label is unknown. Encodings
+        that browsers decode with another one (e.g. "iso-8859-1" with
+        "windows-1252", whose codec is "cp1252") are replaced.
+    """
+    if isinstance(label, bytes):
+        label = label.decode("ascii", "replace")
+    try:
+        name = codecs.lookup(label.strip()).name
+    except (LookupError, ValueError):
+        return None
+    return _CHARSET_REPLACEMENTS.get(name, name)
+
+
+def get_content_type_charset(content_type):
+    """
+    Return the charset of a Content-Type header
+
+    Parameters
+    ----------
+    content_type : str
+        value of the Content-Type header, e.g. "text/html; charset=utf-8"
+
+    Returns
+    -------
+    charset : str or None
+        name of the codec (see :func:`normalize_charset`) or None if
+        content_type has no known charset
+    """
+    if not content_type:
+        return None
+    match = _CONTENT_TYPE_CHARSET_RE.search(content_type)
+    if match is None:
+        return None
+    return normalize_charset(match.group(1))
+
+
+def get_meta_charset(data):
+    """
+    Return the charset of the first <meta> tag that declares one
+
+    Both <meta charset="..."> and <meta http-equiv="Content-Type"
+    content="...; charset=..."> are found. Only the first `SNIFF_LENGTH`
+    bytes of data are searched.
+
+    Parameters
+    ----------
+    data : bytes
+        HTML document
+
+    Returns
+    -------
+    charset : str or None
+        name of the codec (see :func:`normalize_charset`) or None
+    """
+    for _match in _META_CHARSET_RE.finditer(data[:SNIFF_LENGTH]):
+        charset = normalize_charset(_match.group(1))
+        if charset is not None:
+            return _META_CHARSET_REPLACEMENTS.get(charset, charset)
+    return None
+
+
+def _is_utf8(sample, final):
+    # True if sample is valid UTF-8 - the last character may be incomplete if
+    # sample is only the beginning of the data
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _detect_charset(sample):
+    # Encoding detected by the statistical detector or None
+    if not CHARSET_DETECTOR_AVAILABLE:
+        return None
+    result = _detector.detect(sample)
+    if not result or not result.get("encoding"):
+        return None
+    return normalize_charset(result["encoding"])
+
+
+def sniff_charset(data, content_type=None, return_source=False):
+    """
+    Determine the encoding of an HTML document
+
+    Checks, in this order, a byte order mark, the charset of content_type
+    and a <meta> charset in the first `SNIFF_LENGTH` bytes. Documents
+    without any of these whose first `DETECT_LENGTH` bytes are valid UTF-8
+    are taken for UTF-8. Otherwise the encoding is detected statistically
+    from these bytes, if a detector is installed (see
+    `CHARSET_DETECTOR_AVAILABLE`), or `DEFAULT_CHARSET` is returned.
+
+    Parameters
+    ----------
+    data : bytes
+        HTML document
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response
+    return_source : bool, optional
+        True if the source of the encoding shall be returned (default False)
+
+    Returns
+    -------
+    charset : str
+        name of the codec that decodes data - codecs of byte order marks
+        remove the mark
+    source : str, optional (return_source == True)
+        one of `CHARSET_SOURCES`
+    """
+    if not isinstance(data, bytes):
+        raise ValueError("unknown data - expected bytes got '%s'"
+                         % (type(data)))
+
+    charset = source = None
+    for _bom, _charset in BOMS:
+        if data.startswith(_bom):
+            charset, source = _charset, "bom"
+            break
+    if charset is None:
+        charset = get_content_type_charset(content_type)
+        source = "header"
+    if charset is None:
+        charset = get_meta_charset(data)
+        source = "meta"
+    if charset is None:
+        sample = data[:DETECT_LENGTH]
+        if _is_utf8(sample, len(data) <= DETECT_LENGTH):
+            charset, source = "utf-8", "utf-8"
+        else:
+            charset, source = _detect_charset(sample), "detector"
+    if charset is None:
+        charset, source = DEFAULT_CHARSET, "default"
+
+    if return_source:
+        return charset, source
+    return charset
+
+
+def decode_html(data, content_type=None, charset=None):
+    """
+    Decode an HTML document
+
+    Parameters
+    ----------
+    data : bytes
+        HTML document
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response
+    charset : str, optional
+        encoding of data as returned by :func:`sniff_charset` (default None:
+        sniffed from data and content_type)
+
+    Returns
+    -------
+    html : str
+        the decoded document - bytes that are not valid in the encoding are
+        replaced by U+FFFD
+    """
+    if charset is None:
+        charset = sniff_charset(data, content_type)
+    return data.decode(charset, "replace")
+
+
+def iter_decode_html(data, content_type=None, charset=None,
+                     chunk_length=DECODE_CHUNK_LENGTH):
+    """
+    Decode an HTML document chunk by chunk
+
+    Parameters
+    ----------
+    data : bytes or iterable of bytes
+        HTML document or chunks of it. The encoding of chunks is sniffed
+        from the first chunk if charset is not given, which should therefore
+        be at least `SNIFF_LENGTH` bytes long.
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response
+    charset : str, optional
+        encoding of data as returned by :func:`sniff_charset` (default None:
+        sniffed from data and content_type)
+    chunk_length : int, optional
+        number of bytes decoded at once if data is bytes (default
+        `DECODE_CHUNK_LENGTH`)
+
+    Yields
+    ------
+    html : str
+        decoded chunks of the document (see :func:`decode_html`)
+    """
+    if isinstance(data, bytes):
+        if charset is None:
+            charset = sniff_charset(data, content_type)
+        chunks = (
+            data[_i:_i + chunk_length]
+            for _i in range(0, len(data), chunk_length)
+        )
+    else:
+        chunks = iter(data)
+    decoder = None
+    for _chunk in chunks:
+        if decoder is None:
+            if charset is None:
+                charset = sniff_charset(_chunk, content_type)
+            decoder = codecs.getincrementaldecoder(charset)("replace")
+        _text = decoder.decode(_chunk)
+        if _text:
+            yield _text
+    if decoder is not None:
+        _text = decoder.decode(b"", True)
+        if _text:
+            yield _text
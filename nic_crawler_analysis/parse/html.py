@@ -3,16 +3,24 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
-from builtins import dict
+from builtins import bytes, dict, range
 from builtins import str as unicode_str
 from past.builtins import basestring
+from builtins import chr as unichr
 from future import standard_library
+from future.utils import PY2
+from future.moves.html.parser import HTMLParser
+from future.moves.html.entities import name2codepoint
 
 import re
 import copy
+import bisect
+import itertools
 import bs4
 
 from ..util.misc import KNOWN_LANG_TAGS, parse_lang_tag
+from .charset import sniff_charset, decode_html, iter_decode_html
+from .html_cache import document_key
 
 standard_library.install_aliases()
 
@@ -48,11 +56,168 @@ SITE_DESCRIPTION_TAGS = [
     "Keywords"
 ]
 
+# Characters tokenized at once while looking for the <body> tag
+HEAD_CHUNK_LENGTH = 4096
+
+# Number of places of the text that the words of a word-budgeted text
+# extraction are taken from (see extract_text_from_html)
+TEXT_SEGMENTS_N = 20
+
+# Parser backends of BeautifulSoup supported by parse_html
+PARSERS = ["lxml", "html5lib", "html.parser"]
+# Backends that are selected by parser="auto", in the order of preference.
+# html5lib is slower than html.parser and therefore only used on request.
+AUTO_PARSERS = ["lxml", "html.parser"]
+
+HTTP_EQUIV_LANG_NAMES = [
+    "Content-Language",
+    "content-language"
+]
+
+# How BeautifulSoup builds HTML trees, for the streaming extraction:
+# elements without end tag,
+_VOID_TAGS = frozenset([
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+    "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+    "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr"
+])
+# elements whose strings are not text (see bs4.Tag.get_text),
+_STRING_CONTAINER_TAGS = frozenset(["rp", "rt", "script", "style", "template"])
+# elements in which whitespace is kept as is,
+_PRESERVE_WHITESPACE_TAGS = frozenset(["pre", "textarea"])
+# attributes of <script> that hold a list of values,
+_LIST_ATTRIBUTES = ["accesskey", "class", "dropzone"]
+_NON_WHITESPACE_RE = re.compile(r"\S+")
+# whitespace that is reduced to a single character
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+# and the characters of named references (the HTML5 names used by bs4, or
+# the HTML 4 names of python 2.7) and the digits of numeric ones
+if PY2:
+    _ENTITY_CHARS = dict(
+        (_name, unichr(_codepoint))
+        for _name, _codepoint in name2codepoint.items()
+    )
+else:
+    from html.entities import html5 as _html5_entities
+    _ENTITY_CHARS = dict(
+        (_name.rstrip(";"), _char)
+        for _name, _char in _html5_entities.items()
+    )
+_DEC_CHARREF_RE = re.compile(r"^([0-9]+)(.*)", re.DOTALL)
+_HEX_CHARREF_RE = re.compile(r"^([0-9a-fA-F]+)(.*)", re.DOTALL)
+
+# Ways of removing URLs from text (see strip_urls): "fast" finds URLs that
+# start with a scheme followed by "://", "www." or "mailto:", "rfc3987"
+# matches URIs as defined in RFC 3987 (requires the optional regex and
+# rfc3987 libraries)
+URL_STRIP_MODES = ["fast", "rfc3987"]
+# Maximal number of characters of the scheme and of the rest of a URL that
+# are removed in fast mode
+URL_SCHEME_MAX_LENGTH = 32
+URL_MAX_LENGTH = 2048
+# Start of the URLs found in fast mode and the characters they consist of
+_URL_MARKERS = ["://", "www.", "WWW.", "mailto:"]
+_URL_SCHEME_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9+.\-]*\Z")
+_URL_SCHEME_CHARS = frozenset(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+.-"
+)
+_URL_REST_RE = re.compile(
+    r"[\w\-.~:/?#\[\]@!$&'()*+,;=%%]{1,%d}" % URL_MAX_LENGTH, re.UNICODE
+)
+# Compiled pattern of rfc3987, which is loaded on first use
+_rfc3987_uri_regex = None
+
+# Characters that filter_text replaces by spaces
+FILTER_CHARS = (
+    '\n []"\'.,:!?/+-–\\*#()%&=_§€$@<>;|'
+    '©0123456789»«®…”“•�°←→„▶\x96\xa0\t'
+)
+
+# Characters that separate the words of filtered text (besides whitespace)
+_WORD_SEPARATORS = frozenset(FILTER_CHARS)
+
+
+class TextFilter(object):
+    """
+    Replaces runs of characters of a character set by a single space
+
+    Spaces are always part of the character set. Texts that can be encoded
+    as latin-1 (most texts in languages written with the latin alphabet,
+    once the characters of the set that are not in latin-1, such as
+    typographic quotes and dashes, are replaced) are filtered as bytes: the
+    characters are mapped to spaces with a precomputed table of
+    bytes.translate and the runs of spaces are collapsed afterwards, which
+    is several times faster than a regular expression with a character
+    class. Other texts are filtered with such a regular expression
+    (str.translate looks up each character of these texts in a dict and is
+    slower than the regular expression).
+
+    Parameters
+    ----------
+    chars : str, optional
+        characters to be filtered (default `FILTER_CHARS`)
+    """
+
+    def __init__(self, chars=None):
+        if chars is None:
+            chars = FILTER_CHARS
+        self.chars = chars
+        table = bytearray(range(256))
+        for _c in chars + " ":
+            if ord(_c) < 256:
+                table[ord(_c)] = ord(" ")
+        self._table = bytes(table)
+        self._wide_chars = "".join(_c for _c in chars if ord(_c) >= 256)
+        self._regex = re.compile("[%s]+" % "".join(
+            re.escape(_c) for _c in sorted(set(chars + " "))
+        ))
+
+    def __call__(self, text):
+        """
+        Filter the characters out of text
+
+        Parameters
+        ----------
+        text : str
+            The string to be filtered
+
+        Returns
+        -------
+        text :  str
+            The filtered string without leading and trailing whitespace
+        """
+        try:
+            encoded = text.encode("latin-1")
+        except UnicodeEncodeError as e:
+            # Texts in other scripts are not worth the replacements
+            if text[e.start] not in self._wide_chars:
+                return self._regex.sub(" ", text).strip()
+            for _c in self._wide_chars:
+                text = text.replace(_c, " ")
+            try:
+                encoded = text.encode("latin-1")
+            except UnicodeEncodeError:
+                return self._regex.sub(" ", text).strip()
+        encoded = encoded.translate(self._table)
+        # Each pass halves the runs of spaces
+        while b"  " in encoded:
+            encoded = encoded.replace(b"  ", b" ")
+        return encoded.decode("latin-1").strip()
+
+    def __repr__(self):
+        return "TextFilter(chars=%r)" % self.chars
+
+
+_DEFAULT_TEXT_FILTER = TextFilter()
+
 
 def filter_text(text):
     """
     Filter out a list of characters from _text_.
 
+    Runs of the characters of `FILTER_CHARS` are replaced by a single space
+    (see :class:`TextFilter`).
+
     Parameters
     ----------
     text : str
@@ -63,35 +228,300 @@ def filter_text(text):
     text :  str
         The filtered string
     """
-    return re.sub(
-        '[\n \[\]"\'.,:!?/+\-–\\\\*#()%&=_§€$@<>;|'
-        '©0123456789»«®…”“•�°←→„▶\x96\xa0\t]+',
-        ' ',
-        text
-    ).strip()
+    return _DEFAULT_TEXT_FILTER(text)
 
 
-def parse_html(html_):
+def _find_url_end(text, begin, marker):
+    # Index after the URL at index begin of text that starts with marker or
+    # None if there is no URL
+    match = _URL_REST_RE.match(text, begin + len(marker))
+    if marker == "://":
+        return match.end() if match else begin + len(marker)
+    if (match is None
+            or (begin > 0 and text[begin - 1] in _URL_SCHEME_CHARS)):
+        return None
+    return match.end()
+
+
+def _find_url_begin(text, index):
+    # Index of the scheme of the URL with "://" at index of text or None
+    match = _URL_SCHEME_RE.search(
+        text, max(index - URL_SCHEME_MAX_LENGTH, 0), index
+    )
+    return match.start() if match else None
+
+
+def _get_rfc3987_uri_regex():
+    global _rfc3987_uri_regex
+    if _rfc3987_uri_regex is None:
+        _rfc3987_uri_regex = rfc3987.get_compiled_pattern(rule='URI')
+    return _rfc3987_uri_regex
+
+
+def _test_strip_urls(pre_strip_urls):
+    # The URL_STRIP_MODES mode of pre_strip_urls (True is "fast") or None
+    if pre_strip_urls is False or pre_strip_urls is None:
+        return None
+    if pre_strip_urls is True:
+        return "fast"
+    if pre_strip_urls not in URL_STRIP_MODES:
+        raise ValueError("unknown pre_strip_urls '%s' - expected bool or one "
+                         "of %s"
+                         % (pre_strip_urls, ', '.join(URL_STRIP_MODES)))
+    if pre_strip_urls == "rfc3987" and not RFC_REGEX_AVAILABLE:
+        raise ValueError("pre_strip_urls='rfc3987' requires regex and "
+                         "rfc3987 libraries. One or both could not be found")
+    return pre_strip_urls
+
+
+def strip_urls(text, mode="fast"):
+    """
+    Replace the URLs in text by spaces
+
+    In fast mode, only texts that contain "://", "www." or "mailto:" are
+    searched. A URL is a scheme of at most `URL_SCHEME_MAX_LENGTH`
+    characters followed by "://" or a word starting with "www." or
+    "mailto:", and the characters after it that may be part of a URL, up to
+    `URL_MAX_LENGTH` of them. Everything else is kept, e.g. words followed
+    by a colon, which the rfc3987 mode takes for URIs (such as "Adresse:").
+
+    Parameters
+    ----------
+    text : str
+        text with URLs
+    mode : str, optional
+        one of `URL_STRIP_MODES` (default "fast")
+
+    Returns
+    -------
+    text : str
+        text with each URL replaced by a space
+    """
+    mode = _test_strip_urls(mode)
+    if mode is None:
+        return text
+    if mode == "rfc3987":
+        return _get_rfc3987_uri_regex().sub(" ", text)
+
+    # The URLs start at the markers or at the scheme before "://"
+    begins = []
+    for _marker in _URL_MARKERS:
+        _index = text.find(_marker)
+        while _index >= 0:
+            if _marker == "://":
+                _begin = _find_url_begin(text, _index)
+                if _begin is not None:
+                    begins.append((_begin, _index, _marker))
+            else:
+                begins.append((_index, _index, _marker))
+            _index = text.find(_marker, _index + len(_marker))
+    if not begins:
+        return text
+
+    parts = []
+    end = 0
+    for _begin, _index, _marker in sorted(begins):
+        if _begin < end:
+            # e.g. the "www." of "https://www."
+            continue
+        _end = _find_url_end(text, _index, _marker)
+        if _end is not None:
+            parts.append(text[end:_begin])
+            end = _end
+    parts.append(text[end:])
+    return " ".join(parts)
+
+
+def get_available_parsers():
+    """
+    Return the parser backends of `PARSERS` that are installed
+
+    Returns
+    -------
+    parsers : list of str
+        names of the backends that can be passed to :func:`parse_html`
+    """
+    return [
+        _parser for _parser in PARSERS
+        if bs4.builder.builder_registry.lookup(_parser) is not None
+    ]
+
+
+def _select_parser():
+    # The first backend of AUTO_PARSERS that is installed
+    available = get_available_parsers()
+    for _parser in AUTO_PARSERS:
+        if _parser in available:
+            return _parser
+
+
+# Backend used by parse_html by default. The other backends repair malformed
+# markup differently, so they are only used on request.
+DEFAULT_PARSER = "html.parser"
+# Backend used by parse_html for parser="auto": the fastest one installed
+AUTO_PARSER = _select_parser()
+
+
+def _test_parser(parser):
+    if parser not in PARSERS:
+        raise ValueError("unknown parser '%s' - expected one of %s"
+                         % (parser, ', '.join(PARSERS)))
+    if parser not in get_available_parsers():
+        raise ValueError("parser '%s' requires the %s library, which could "
+                         "not be found" % (parser, parser))
+
+
+def _set_string_containers(bs):
+    # The html5lib tree builder of bs4 stores the contents of <script>,
+    # <style> and <template> as plain strings, so get_text() would include
+    # them. Convert them to the string classes the other builders use.
+    containers = getattr(bs.builder, "string_containers", None) or {}
+    for _tag in bs.find_all(list(containers)):
+        _container = containers[_tag.name]
+        for _string in _tag.find_all(string=True):
+            if type(_string) is bs4.NavigableString:
+                _string.replace_with(_container(_string))
+
+
+class _BodyFound(Exception):
+    """Raised by _BodyFinder at the first <body> tag"""
+    pass
+
+
+class _BodyFinder(HTMLParser):
+    """Parser that stops at the first <body> tag"""
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            raise _BodyFound()
+
+
+def _get_head_markup(html_, charset=None):
+    # The markup before the first <body> tag or all of html_ if there is
+    # none. The document is tokenized, so that "<body" in comments or scripts
+    # does not count, and only up to the <body> tag. Bytes are decoded with
+    # charset up to the <body> tag as well.
+    if isinstance(html_, bytes):
+        chunks = iter_decode_html(
+            html_, charset=charset, chunk_length=HEAD_CHUNK_LENGTH
+        )
+    else:
+        chunks = (
+            html_[_i:_i + HEAD_CHUNK_LENGTH]
+            for _i in range(0, len(html_), HEAD_CHUNK_LENGTH)
+        )
+    finder = _BodyFinder()
+    markup = []
+    try:
+        for _chunk in chunks:
+            markup.append(_chunk)
+            finder.feed(_chunk)
+    except _BodyFound:
+        markup = ''.join(markup)
+        # getpos() is the (line, column) of the <body> tag
+        lineno, offset = finder.getpos()
+        begin = 0
+        for _ in range(lineno - 1):
+            begin = markup.index("\n", begin) + 1
+        return markup[:begin + offset]
+    if isinstance(html_, bytes):
+        return ''.join(markup)
+    return html_
+
+
+def parse_html(html_, parser=None, head_only=False, document_cache=None,
+               content_type=None):
     """
     Take a html string, parse it and return the structure as a BeautifulSoup
     object.
 
+    The tree is built by one of the parser backends of BeautifulSoup. By
+    default python's html.parser is used (see `DEFAULT_PARSER`). With
+    parser="auto" the fastest one that is installed is used (see
+    `AUTO_PARSER`): lxml if it is installed and html.parser otherwise.
+    html5lib parses like a browser does, but is the slowest backend and is
+    only used if it is selected. All backends give the same results for
+    well-formed documents; they differ in how they repair malformed ones
+    (e.g. lxml and html5lib add a <body> to fragments, which html.parser
+    does not, and drop CDATA sections).
+
+    HTML given as bytes is decoded with the encoding determined by
+    :func:`~nic_crawler_analysis.parse.charset.sniff_charset` from its byte
+    order mark, content_type or its <meta> charset (and detected
+    statistically only if there is none). With head_only, only the bytes
+    before the <body> tag are decoded.
+
     Parameters
     ----------
-    html_ : str
+    html_ : str or bytes
         string that contains HTML
+    parser : str, optional
+        parser backend - one of `PARSERS` or "auto" for `AUTO_PARSER`
+        (default None: `DEFAULT_PARSER`)
+    head_only : bool, optional
+        If True, only the part of the document before the first <body> tag
+        is parsed, i.e. the <html> start tag and the <head>. This is enough
+        for the meta-information (see :func:`extract_html_lang_tag`,
+        :func:`extract_http_equiv_lang_tag` and
+        :func:`get_site_description`) and a fraction of the cost of parsing
+        the whole document. Default: False
+    document_cache : DocumentCache, optional
+        cache of parsed documents (see
+        :class:`~nic_crawler_analysis.parse.html_cache.DocumentCache`). If
+        html_ was parsed in the same way before, the cached tree is returned
+        instead of parsing it again (a tree of the whole document is returned
+        for head_only as well).
+        Default: None
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response, whose charset
+        is the encoding of html_ if it is bytes without byte order mark.
+        Default: None
 
     Returns
     -------
     bs : bs4.BeautifulSoup
         Parsed HTML
     """
-    return bs4.BeautifulSoup(html_, 'html.parser')
+    if parser is None:
+        parser = DEFAULT_PARSER
+    elif parser == "auto":
+        parser = AUTO_PARSER
+    else:
+        _test_parser(parser)
+    charset = None
+    if isinstance(html_, bytes):
+        charset = sniff_charset(html_, content_type)
+    if document_cache is not None:
+        key = document_key(html_, parser, head_only, charset)
+        if head_only:
+            found, bs = document_cache.get(
+                document_key(html_, parser, charset=charset), key
+            )
+        else:
+            found, bs = document_cache.get(key)
+        if found:
+            return bs
+
+    if head_only:
+        html_ = _get_head_markup(html_, charset)
+    elif charset is not None:
+        html_ = decode_html(html_, charset=charset)
+    bs = bs4.BeautifulSoup(html_, parser)
+    if parser == "html5lib":
+        _set_string_containers(bs)
+
+    if document_cache is not None:
+        document_cache.put(key, bs)
+    return bs
 
 
 def extract_text_from_html(
         input_,
-        pre_strip_urls=False
+        pre_strip_urls=False,
+        document_cache=None,
+        max_words=None,
+        n_segments=TEXT_SEGMENTS_N,
+        content_type=None
 ):
     """
     Take a HTML document and return the raw text
@@ -105,53 +535,162 @@ def extract_text_from_html(
 
     Parameters
     ----------
-    input_ : str or bs4.BeautifulSoup
+    input_ : str, bytes or bs4.BeautifulSoup
         HTML document from which the text will be extracted
 
-    pre_strip_urls : bool
+    pre_strip_urls : bool or str
         If True, Links that are found in the text part of the HTML are removed
-        prior to filtering
+        prior to filtering. True is the "fast" mode of :func:`strip_urls`,
+        "rfc3987" removes all URIs as defined in RFC 3987, which is much
+        slower and requires the optional regex and rfc3987 libraries
+    document_cache : DocumentCache, optional
+        cache of parsed documents, used if input_ is a str or bytes (see
+        :func:`parse_html`). Default: None
+    max_words : int, optional
+        If given, at most max_words words of the text are returned. The text
+        is split into n_segments segments of about the same number of
+        characters and the words are taken from the beginning of each
+        segment, so that they are spread over the document. Only the strings
+        of the document that provide these words are joined and filtered,
+        which makes large texts much cheaper to extract (e.g. as input of
+        language detection). If the text has no more than max_words words,
+        it is returned unchanged, as without max_words. Default: None (the
+        whole text)
+    n_segments : int, optional
+        number of segments the words are taken from if max_words is given
+        (e.g. the number of blocks detected by
+        :func:`~nic_crawler_analysis.analysis.lang_detect.detect_language_blocks`).
+        Default: `TEXT_SEGMENTS_N`
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response, used if
+        input_ is bytes (see :func:`parse_html`). Default: None
 
     Returns
     -------
     text : str
         The text found in the HTML document
     """
+    if max_words is not None:
+        _test_positive_int(max_words, "max_words")
+        _test_positive_int(n_segments, "n_segments")
+    pre_strip_urls = _test_strip_urls(pre_strip_urls)
+
     if isinstance(input_, bs4.BeautifulSoup):
         bs = input_
     elif isinstance(input_, basestring):
-        bs = parse_html(input_)
+        bs = parse_html(input_, document_cache=document_cache,
+                        content_type=content_type)
     else:
-        raise ValueError("unknown input_ - expected str or "
+        raise ValueError("unknown input_ - expected str, bytes or "
                          "bs4.BeautifulSoup got '%s'" % (type(input_)))
 
+    if max_words is not None:
+        if bs.body is None:
+            return None
+        return _extract_text_bounded(
+            bs.body, pre_strip_urls, max_words, n_segments
+        )
+
     try:
         text = bs.body.get_text().strip()
     except (TypeError,AttributeError):
         return None
 
     if pre_strip_urls:
-        if RFC_REGEX_AVAILABLE:
-            text = rfc3987.get_compiled_pattern(rule='URI').sub(" ", text)
-        else:
-            raise ValueError("pre_strip_urls requires regex and rfc3987 "
-                             "libraries. One or both could not be found")
+        text = strip_urls(text, pre_strip_urls)
 
     return filter_text(text)
 
 
-def get_site_description(input_):
+def _test_positive_int(var, name):
+    if not isinstance(var, int) or isinstance(var, bool) or var < 1:
+        raise ValueError("%s must be a positive int - got '%s'" % (name, var))
+
+
+def _is_word_char(char):
+    # True if char is part of a word of the filtered text
+    return char not in _WORD_SEPARATORS and not char.isspace()
+
+
+def _extract_text_bounded(body, pre_strip_urls, max_words, n_segments):
+    # extract_text_from_html with max_words: the strings of body that
+    # body.get_text() would join are collected without joining them, and the
+    # words of each segment are filtered string by string until the budget
+    # of the segment is met. Words split over strings (e.g. "foo<b>bar</b>")
+    # are counted once. The words not used by a segment are shared by the
+    # segments after it.
+    types = _get_text_types(body)
+    strings = [_s for _s in body.descendants if type(_s) in types]
+    offsets = []  # index of the first character of each string
+    n_chars = 0
+    for _string in strings:
+        offsets.append(n_chars)
+        n_chars += len(_string)
+    begins = sorted(set(
+        max(bisect.bisect_right(offsets, _i * n_chars // n_segments) - 1, 0)
+        for _i in range(n_segments)
+    ))
+
+    segments = []
+    truncated = False
+    n_words = 0
+    for _j, _begin in enumerate(begins):
+        _end = begins[_j + 1] if _j + 1 < len(begins) else len(strings)
+        _budget = -(-(max_words - n_words) // (len(begins) - _j))
+        _parts = []
+        _n_words = 0
+        _in_word = False  # the last string ends inside a word
+        for _string in strings[_begin:_end]:
+            # a string that continues the last word is not a new word
+            _continues = (
+                _in_word and _string and _is_word_char(_string[0])
+            )
+            if _n_words >= _budget and not _continues:
+                truncated = True
+                break
+            _parts.append(_string)
+            _n_words += len(filter_text(_string).split()) - bool(_continues)
+            if _string:
+                _in_word = _is_word_char(_string[-1])
+        if _n_words > _budget:
+            truncated = True
+        n_words += min(_n_words, _budget)
+        segments.append((_parts, _budget))
+
+    if not truncated:
+        # the whole text is within the budget and returned unchanged
+        text = ''.join(strings).strip()
+        if pre_strip_urls:
+            text = strip_urls(text, pre_strip_urls)
+        return filter_text(text)
+    words = []
+    for _parts, _budget in segments:
+        _text = ''.join(_parts).strip()
+        if pre_strip_urls:
+            _text = strip_urls(_text, pre_strip_urls)
+        words.extend(filter_text(_text).split()[:_budget])
+    return ' '.join(words)
+
+
+def get_site_description(input_, document_cache=None, content_type=None):
     """
     Return the description given in an HTML document
 
     The function looks for meta tags that have one of the names in the
     `SITE_DESCRIPTION_TAGS` list and concatenates their content into a single
-    string. The string is then filtered with :func:`filter_text`.
+    string. The string is then filtered with :func:`filter_text`. If input_
+    is a str, only its <head> is parsed (see :func:`parse_html`).
 
     Parameters
     ----------
-    input_ : str or bs4.BeautifulSoup
+    input_ : str, bytes or bs4.BeautifulSoup
         HTML document from which the description will be extracted
+    document_cache : DocumentCache, optional
+        cache of parsed documents, used if input_ is a str or bytes (see
+        :func:`parse_html`). Default: None
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response, used if
+        input_ is bytes (see :func:`parse_html`). Default: None
 
     Returns
     -------
@@ -162,16 +701,19 @@ def get_site_description(input_):
     if isinstance(input_, bs4.BeautifulSoup):
         bs = input_
     elif isinstance(input_, basestring):
-        bs = parse_html(input_)
+        bs = parse_html(
+            input_, head_only=True, document_cache=document_cache,
+            content_type=content_type
+        )
     else:
-        raise ValueError("unknown input_ - expected str or bs4.BeautifulSoup "
-                         "got '%s'" % (type(input_)))
+        raise ValueError("unknown input_ - expected str, bytes or "
+                         "bs4.BeautifulSoup got '%s'" % (type(input_)))
 
     try:
         desc_tags = bs.head.find_all(
             "meta", attrs=dict(name=SITE_DESCRIPTION_TAGS)
         )
-    except(TypeError, ParseError):
+    except (TypeError, AttributeError, ParseError):
         return None
 
     return (' '.join([
@@ -183,20 +725,29 @@ def get_site_description(input_):
 
 def extract_html_lang_tag(
         input_,
-        accepted_langs=KNOWN_LANG_TAGS
+        accepted_langs=KNOWN_LANG_TAGS,
+        document_cache=None,
+        content_type=None
 ):
     """
     Find the language tag in the opening <html> tag and return it
 
-    Only languages that are in the accepted_langs list are returned.
+    Only languages that are in the accepted_langs list are returned. If
+    input_ is a str, only its <head> is parsed (see :func:`parse_html`).
 
     Parameters
     ----------
-    input_ : str or bs4.BeautifulSoup
+    input_ : str, bytes or bs4.BeautifulSoup
         HTML document from which the description will be extracted
     accepted_langs : list
         List of languages that are accepted by the function.
         Default: `nic_crawler_analysis.util.misc.KNOWN_LANG_TAGS`
+    document_cache : DocumentCache, optional
+        cache of parsed documents, used if input_ is a str or bytes (see
+        :func:`parse_html`). Default: None
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response, used if
+        input_ is bytes (see :func:`parse_html`). Default: None
 
     Returns
     -------
@@ -206,10 +757,13 @@ def extract_html_lang_tag(
     if isinstance(input_, bs4.BeautifulSoup):
         bs = input_
     elif isinstance(input_, basestring):
-        bs = parse_html(input_)
+        bs = parse_html(
+            input_, head_only=True, document_cache=document_cache,
+            content_type=content_type
+        )
     else:
-        raise ValueError("unknown input_ - expected str or bs4.BeautifulSoup "
-                         "got '%s'" % (type(input_)))
+        raise ValueError("unknown input_ - expected str, bytes or "
+                         "bs4.BeautifulSoup got '%s'" % (type(input_)))
 
     try:
         tag_text = bs.html["lang"]
@@ -225,20 +779,31 @@ def extract_html_lang_tag(
 
 def extract_http_equiv_lang_tag(
         input_,
-        accepted_langs=KNOWN_LANG_TAGS
+        accepted_langs=KNOWN_LANG_TAGS,
+        document_cache=None,
+        content_type=None
 ):
     """
     Find the language tag in an http-equiv tag return it
 
-    Only languages that are in the accepted_langs list are returned.
+    Only languages that are in the accepted_langs list are returned. If
+    input_ is a str, only its <head> is parsed (see :func:`parse_html`), so
+    http-equiv tags in the <body>, where they are not allowed, are only
+    found in parsed documents.
 
     Parameters
     ----------
-    input_ : str or bs4.BeautifulSoup
+    input_ : str, bytes or bs4.BeautifulSoup
         HTML document from which the description will be extracted
     accepted_langs : list
         List of languages that are accepted by the function.
         Default: `nic_crawler_analysis.util.misc.KNOWN_LANG_TAGS`
+    document_cache : DocumentCache, optional
+        cache of parsed documents, used if input_ is a str or bytes (see
+        :func:`parse_html`). Default: None
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response, used if
+        input_ is bytes (see :func:`parse_html`). Default: None
 
     Returns
     -------
@@ -248,20 +813,19 @@ def extract_http_equiv_lang_tag(
     if isinstance(input_, bs4.BeautifulSoup):
         bs = input_
     elif isinstance(input_, basestring):
-        bs = parse_html(input_)
+        bs = parse_html(
+            input_, head_only=True, document_cache=document_cache,
+            content_type=content_type
+        )
     else:
-        raise ValueError("unknown input_ - expected str or bs4.BeautifulSoup "
-                         "got '%s'" % (type(input_)))
+        raise ValueError("unknown input_ - expected str, bytes or "
+                         "bs4.BeautifulSoup got '%s'" % (type(input_)))
 
     try:
         tags_lang = bs.findAll(
             "meta",
-            attrs={
-                'http-equiv': [
-                    "Content-Language",
-                    "content-language"
-                ]
-            })
+            attrs={'http-equiv': HTTP_EQUIV_LANG_NAMES}
+        )
         langs = parse_lang_tag(tags_lang[0]["content"])
         if len(langs) == 1:
             return langs[0]
@@ -271,14 +835,20 @@ def extract_http_equiv_lang_tag(
         return None
 
 
-def extract_js_from_html(input_):
+def extract_js_from_html(input_, document_cache=None, content_type=None):
     """
     Find all script tags and return their contents
 
     Parameters
     ----------
-    input_ : str or bs4.Beautifulsoup
+    input_ : str, bytes or bs4.Beautifulsoup
         HTML content to extract from
+    document_cache : DocumentCache, optional
+        cache of parsed documents, used if input_ is a str or bytes (see
+        :func:`parse_html`). Default: None
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response, used if
+        input_ is bytes (see :func:`parse_html`). Default: None
 
     Returns
     -------
@@ -291,10 +861,11 @@ def extract_js_from_html(input_):
     if isinstance(input_, bs4.BeautifulSoup):
         bs = input_
     elif isinstance(input_, basestring):
-        bs = parse_html(input_)
+        bs = parse_html(input_, document_cache=document_cache,
+                        content_type=content_type)
     else:
-        raise ValueError("unknown input_ - expected str or bs4.BeautifulSoup "
-                         "got '%s'" % (type(input_)))
+        raise ValueError("unknown input_ - expected str, bytes or "
+                         "bs4.BeautifulSoup got '%s'" % (type(input_)))
 
     return [
         (
@@ -306,14 +877,21 @@ def extract_js_from_html(input_):
     ]
 
 
-def extract_noscript_from_html(input_):
+def extract_noscript_from_html(input_, document_cache=None,
+                               content_type=None):
     """
     Find all script tags and return their contents
 
     Parameters
     ----------
-    input_ : str or bs4.Beautifulsoup
+    input_ : str, bytes or bs4.Beautifulsoup
         HTML content to extract from
+    document_cache : DocumentCache, optional
+        cache of parsed documents, used if input_ is a str or bytes (see
+        :func:`parse_html`). Default: None
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response, used if
+        input_ is bytes (see :func:`parse_html`). Default: None
 
     Returns
     -------
@@ -324,10 +902,11 @@ def extract_noscript_from_html(input_):
     if isinstance(input_, bs4.BeautifulSoup):
         bs = input_
     elif isinstance(input_, basestring):
-        bs = parse_html(input_)
+        bs = parse_html(input_, document_cache=document_cache,
+                        content_type=content_type)
     else:
-        raise ValueError("unknown input_ - expected str or bs4.BeautifulSoup "
-                         "got '%s'" % (type(input_)))
+        raise ValueError("unknown input_ - expected str, bytes or "
+                         "bs4.BeautifulSoup got '%s'" % (type(input_)))
 
     try:
         tag_strings = [
@@ -338,3 +917,491 @@ def extract_noscript_from_html(input_):
         return []
 
     return tag_strings
+
+
+def _get_text_types(tag):
+    # The string types that tag.get_text() returns
+    types = getattr(tag, "interesting_string_types", None)
+    if types is None:
+        types = (bs4.NavigableString, bs4.CData)
+    elif isinstance(types, type):
+        types = (types,)
+    return types
+
+
+def _get_element_after(tag):
+    # The element that follows tag and all of its descendants in document
+    # order or None
+    while tag is not None:
+        if tag.next_sibling is not None:
+            return tag.next_sibling
+        tag = tag.parent
+    return None
+
+
+def _finish_extracted(
+        text_parts,
+        desc_contents,
+        html_lang_tag,
+        http_equiv_content,
+        js_code,
+        noscript_tags,
+        accepted_langs,
+        pre_strip_urls
+):
+    # Turns the raw values collected by extract_all_from_html into its result.
+    # text_parts and desc_contents are None if there is no <body> or <head>.
+
+    # extract_text_from_html
+    if text_parts is None:
+        text = None
+    else:
+        text = ''.join(text_parts).strip()
+        if pre_strip_urls:
+            text = strip_urls(text, pre_strip_urls)
+        text = filter_text(text)
+
+    # get_site_description
+    if desc_contents is None:
+        description = None
+    else:
+        description = (' '.join([
+            filter_text(_content) for _content in desc_contents
+        ])).strip()
+
+    # extract_html_lang_tag
+    html_lang = None
+    if html_lang_tag is not None:
+        langs = parse_lang_tag(html_lang_tag, accepted_langs=accepted_langs)
+        if len(langs) > 0:
+            html_lang = langs[0]
+
+    # extract_http_equiv_lang_tag
+    http_equiv_lang = None
+    if http_equiv_content is not None:
+        langs = parse_lang_tag(http_equiv_content)
+        if len(langs) == 1:
+            http_equiv_lang = langs[0]
+
+    return dict(
+        text=text,
+        description=description,
+        html_lang=html_lang,
+        http_equiv_lang=http_equiv_lang,
+        js=js_code,
+        noscript=noscript_tags,
+    )
+
+
+def _extract_all_from_tree(bs, accepted_langs, pre_strip_urls):
+    html_tag = None
+    http_equiv_tag = None
+    # Only the first <head> and <body> count, as with bs.head and bs.body.
+    # The end of each is the element that follows its last descendant.
+    head = body = None
+    head_end = body_end = None
+    in_head = in_body = False
+    text_types = None
+    text_parts = []
+    desc_contents = []
+    js_code = []
+    noscript_tags = []
+
+    for _element in bs.descendants:
+        if _element is head_end:
+            in_head = False
+        if _element is body_end:
+            in_body = False
+
+        if not isinstance(_element, bs4.Tag):
+            if in_body and type(_element) in text_types:
+                text_parts.append(_element)
+            continue
+
+        _name = _element.name
+        if _name == "html":
+            if html_tag is None:
+                html_tag = _element
+        elif _name == "head":
+            if head is None:
+                head = _element
+                head_end = _get_element_after(_element)
+                in_head = True
+        elif _name == "body":
+            if body is None:
+                body = _element
+                body_end = _get_element_after(_element)
+                in_body = True
+                text_types = _get_text_types(_element)
+        elif _name == "meta":
+            _attrs = _element.attrs
+            if (http_equiv_tag is None
+                    and _attrs.get("http-equiv") in HTTP_EQUIV_LANG_NAMES):
+                http_equiv_tag = _element
+            if (in_head and _attrs.get("name") in SITE_DESCRIPTION_TAGS
+                    and "content" in _attrs):
+                desc_contents.append(_attrs["content"])
+        elif _name == "script":
+            js_code.append((
+                copy.deepcopy(_element.attrs),
+                unicode_str(_element.string)
+                if _element.string is not None else None
+            ))
+        elif _name == "noscript":
+            noscript_tags.append(
+                unicode_str(_element.string)
+                if _element.string is not None else None
+            )
+
+    return _finish_extracted(
+        text_parts if body is not None else None,
+        desc_contents if head is not None else None,
+        html_tag.attrs.get("lang") if html_tag is not None else None,
+        http_equiv_tag.attrs.get("content")
+        if http_equiv_tag is not None else None,
+        js_code,
+        noscript_tags,
+        accepted_langs,
+        pre_strip_urls
+    )
+
+
+def _resolve_charref(name):
+    """
+    Data of a numeric character reference as BeautifulSoup makes it
+
+    Numbers are mapped as HTML5 does: 0, surrogates and numbers beyond
+    U+10FFFF become U+FFFD and 128 - 159 are read as windows-1252. Anything
+    after the leading digits of name (after its "x" if hexadecimal) is kept
+    as data.
+    """
+    if name[:1] in ("x", "X"):
+        name = name[1:]
+        match = _HEX_CHARREF_RE.match(name)
+        base = 16
+    else:
+        match = _DEC_CHARREF_RE.match(name)
+        base = 10
+    if match is None:
+        return name
+    number = int(match.group(1), base)
+    if number == 0 or number > 0x10FFFF or 0xD800 <= number <= 0xDFFF:
+        char = "\ufffd"
+    elif 0x80 <= number <= 0x9F:
+        try:
+            char = bytes([number]).decode("windows-1252")
+        except UnicodeDecodeError:
+            char = unichr(number)
+    else:
+        char = unichr(number)
+    return char + match.group(2)
+
+
+def _resolve_entityref(name):
+    """
+    Data of a named character reference as BeautifulSoup makes it
+
+    Unknown names are kept without the ";" (e.g. "&notanentity;" becomes
+    "&notanentity", where html.unescape makes "\xacanentity;" of it).
+    """
+    char = _ENTITY_CHARS.get(name)
+    return char if char is not None else "&" + name
+
+
+class _StreamExtractor(HTMLParser):
+    """
+    Event-driven parser that collects the inputs of extract_all_from_html
+
+    Follows the way BeautifulSoup builds its tree from the events of
+    html.parser, but only keeps the stack of open elements instead of the
+    tree: void elements are closed at once, an end tag closes the most
+    recent open element of its name and all elements opened after it, and
+    consecutive data forms one string, which is reduced to a single space
+    or newline if it consists of whitespace only (except in <pre> and
+    <textarea>). Strings in `_STRING_CONTAINER_TAGS` are not text. Character
+    references are resolved as BeautifulSoup resolves them.
+    """
+
+    def __init__(self):
+        if PY2:
+            # HTMLParser of python 2.7 never converts character references
+            HTMLParser.__init__(self)
+        else:
+            HTMLParser.__init__(self, convert_charrefs=False)
+        # Open elements: [name, number of children, value of the only
+        # child, kind, attributes, index in js_code or noscript_tags]
+        self.stack = []
+        self.data = []
+        # Number of end tags of each void element that are to be ignored
+        # because the element was closed at its start tag
+        self.already_closed_void = dict()
+        self.n_containers = 0
+        self.n_preserve = 0
+        self.head = self.body = None
+        self.in_head = self.in_body = False
+        self.html_lang_tag = None
+        self.html_seen = False
+        self.http_equiv_content = None
+        self.http_equiv_seen = False
+        self.text_parts = []
+        self.desc_contents = []
+        self.js_code = []
+        self.noscript_tags = []
+
+    def _end_data(self, kind="data"):
+        # Adds the collected data as string of a kind: "data" (text unless
+        # in a string container), "cdata" (text) or "other" (no text)
+        if not self.data:
+            return
+        data = ''.join(self.data)
+        self.data = []
+        if self.n_preserve == 0 and not data.strip(_ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+        is_text = kind == "cdata" or (
+            kind == "data" and self.n_containers == 0
+        )
+        if is_text and self.in_body:
+            self.text_parts.append(data)
+        if self.stack:
+            parent = self.stack[-1]
+            parent[1] += 1
+            parent[2] = data
+
+    def _pop(self):
+        entry = self.stack.pop()
+        name, n_children, value, kind, attrs, slot = entry
+        value = value if n_children == 1 else None
+        if kind == "script":
+            self.js_code[slot] = (attrs, value)
+        elif kind == "noscript":
+            self.noscript_tags[slot] = value
+        if entry is self.head:
+            self.in_head = False
+        if entry is self.body:
+            self.in_body = False
+        if name in _STRING_CONTAINER_TAGS:
+            self.n_containers -= 1
+        if name in _PRESERVE_WHITESPACE_TAGS:
+            self.n_preserve -= 1
+        if self.stack:
+            # The value of a tag as child is its .string
+            parent = self.stack[-1]
+            parent[1] += 1
+            parent[2] = value
+
+    def _start(self, tag, attrs):
+        self._end_data()
+        attrs = dict(
+            (_key, _value if _value is not None else "")
+            for _key, _value in attrs
+        )
+        entry = [tag, 0, None, None, None, None]
+        if tag == "html":
+            if not self.html_seen:
+                self.html_seen = True
+                self.html_lang_tag = attrs.get("lang")
+        elif tag == "head":
+            if self.head is None:
+                self.head = entry
+                self.in_head = True
+        elif tag == "body":
+            if self.body is None:
+                self.body = entry
+                self.in_body = True
+        elif tag == "meta":
+            if (not self.http_equiv_seen
+                    and attrs.get("http-equiv") in HTTP_EQUIV_LANG_NAMES):
+                self.http_equiv_seen = True
+                self.http_equiv_content = attrs.get("content")
+            if (self.in_head and attrs.get("name") in SITE_DESCRIPTION_TAGS
+                    and "content" in attrs):
+                self.desc_contents.append(attrs["content"])
+        elif tag == "script":
+            for _key in _LIST_ATTRIBUTES:
+                if _key in attrs:
+                    attrs[_key] = _NON_WHITESPACE_RE.findall(attrs[_key])
+            entry[3:] = ["script", attrs, len(self.js_code)]
+            self.js_code.append(None)
+        elif tag == "noscript":
+            entry[3:] = ["noscript", None, len(self.noscript_tags)]
+            self.noscript_tags.append(None)
+        if tag in _STRING_CONTAINER_TAGS:
+            self.n_containers += 1
+        if tag in _PRESERVE_WHITESPACE_TAGS:
+            self.n_preserve += 1
+        self.stack.append(entry)
+
+    def _end(self, tag):
+        self._end_data()
+        for _i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[_i][0] == tag:
+                while len(self.stack) > _i:
+                    self._pop()
+                break
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs)
+        if tag in _VOID_TAGS:
+            self._end(tag)
+            self.already_closed_void[tag] = (
+                self.already_closed_void.get(tag, 0) + 1
+            )
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs)
+        self._end(tag)
+
+    def handle_endtag(self, tag):
+        if self.already_closed_void.get(tag, 0) > 0:
+            self.already_closed_void[tag] -= 1
+        else:
+            self._end(tag)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_charref(self, name):
+        self.data.append(_resolve_charref(name))
+
+    def handle_entityref(self, name):
+        self.data.append(_resolve_entityref(name))
+
+    def _handle_string(self, data, kind="other"):
+        self._end_data()
+        self.data.append(data)
+        self._end_data(kind)
+
+    def handle_comment(self, data):
+        self._handle_string(data)
+
+    def handle_decl(self, decl):
+        self._handle_string(decl[len("DOCTYPE "):])
+
+    def handle_pi(self, data):
+        self._handle_string(data)
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            self._handle_string(data[len("CDATA["):], kind="cdata")
+        else:
+            self._handle_string(data)
+
+    def close(self):
+        HTMLParser.close(self)
+        self._end_data()
+        while self.stack:
+            self._pop()
+
+
+def _extract_all_from_stream(chunks, accepted_langs, pre_strip_urls):
+    parser = _StreamExtractor()
+    for _chunk in chunks:
+        parser.feed(_chunk)
+    parser.close()
+    return _finish_extracted(
+        parser.text_parts if parser.body is not None else None,
+        parser.desc_contents if parser.head is not None else None,
+        parser.html_lang_tag,
+        parser.http_equiv_content,
+        parser.js_code,
+        parser.noscript_tags,
+        accepted_langs,
+        pre_strip_urls
+    )
+
+
+def extract_all_from_html(
+        input_,
+        accepted_langs=KNOWN_LANG_TAGS,
+        pre_strip_urls=False,
+        streaming=False,
+        document_cache=None,
+        content_type=None
+):
+    """
+    Extract the inputs of all analyses from a HTML document at once
+
+    The document is traversed once and the results of
+    :func:`extract_text_from_html`, :func:`get_site_description`,
+    :func:`extract_html_lang_tag`, :func:`extract_http_equiv_lang_tag`,
+    :func:`extract_js_from_html` and :func:`extract_noscript_from_html` are
+    collected on the way, instead of traversing the document once per
+    function. The results are the same as those of the functions.
+
+    In streaming mode no tree is built. The inputs are collected from the
+    events of python's html.parser while the document is read, so apart from
+    the results only the open elements are kept in memory. The document may
+    be given in chunks (e.g. as a file object). The results are the same as
+    those of the functions on the tree built by html.parser, also for
+    unknown character references; they may differ from those on the trees
+    of other backends for malformed documents (see :func:`parse_html`).
+
+    Parameters
+    ----------
+    input_ : str, bytes, bs4.BeautifulSoup or iterable of str or bytes
+        HTML document from which the inputs will be extracted - an iterable
+        of chunks of the document in streaming mode only. Bytes are decoded
+        as in :func:`parse_html`, chunk by chunk in streaming mode.
+    accepted_langs : list
+        List of languages that are accepted for the language of the <html>
+        tag (see :func:`extract_html_lang_tag`).
+        Default: `nic_crawler_analysis.util.misc.KNOWN_LANG_TAGS`
+    pre_strip_urls : bool or str
+        If True or "rfc3987", links are removed from the text prior to
+        filtering (see :func:`extract_text_from_html`)
+    streaming : bool
+        If True, the inputs are extracted while parsing without building a
+        tree. input_ must not be a bs4.BeautifulSoup then. Default: False
+    document_cache : DocumentCache, optional
+        cache of parsed documents, used if input_ is a str or bytes (see
+        :func:`parse_html`). Default: None
+    content_type : str, optional
+        value of the Content-Type header of the HTTP response, used if
+        input_ is bytes (see :func:`parse_html`). Default: None
+
+    Returns
+    -------
+    extracted : dict
+        dict with the keys
+        - 'text': as returned by :func:`extract_text_from_html`
+        - 'description': as returned by :func:`get_site_description` or None
+          if the document has no <head>
+        - 'html_lang': as returned by :func:`extract_html_lang_tag`
+        - 'http_equiv_lang': as returned by
+          :func:`extract_http_equiv_lang_tag`
+        - 'js': as returned by :func:`extract_js_from_html`
+        - 'noscript': as returned by :func:`extract_noscript_from_html`
+    """
+    pre_strip_urls = _test_strip_urls(pre_strip_urls)
+
+    if streaming:
+        if isinstance(input_, bytes):
+            chunks = iter_decode_html(input_, content_type)
+        elif isinstance(input_, basestring):
+            chunks = [input_]
+        elif (hasattr(input_, "__iter__")
+              and not isinstance(input_, bs4.BeautifulSoup)):
+            chunks = iter(input_)
+            first = next(chunks, None)
+            chunks = itertools.chain([] if first is None else [first],
+                                     chunks)
+            if isinstance(first, bytes):
+                chunks = iter_decode_html(chunks, content_type)
+        else:
+            raise ValueError("unknown input_ - expected str, bytes or "
+                             "iterable of str or bytes in streaming mode "
+                             "got '%s'" % (type(input_)))
+        return _extract_all_from_stream(
+            chunks, accepted_langs, pre_strip_urls
+        )
+
+    if isinstance(input_, bs4.BeautifulSoup):
+        bs = input_
+    elif isinstance(input_, basestring):
+        bs = parse_html(
+            input_, document_cache=document_cache, content_type=content_type
+        )
+    else:
+        raise ValueError("unknown input_ - expected str, bytes or "
+                         "bs4.BeautifulSoup got '%s'" % (type(input_)))
+    return _extract_all_from_tree(bs, accepted_langs, pre_strip_urls)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of parsed HTML documents
+
+The functions of :mod:`~nic_crawler_analysis.parse.html` and
+:mod:`~nic_crawler_analysis.analysis.lang_detect` that take HTML as str or
+bytes parse it on every call, so a caller that passes the same document to
+several of them pays for several parses. A :class:`DocumentCache` can be
+passed to these functions (as `document_cache`) to parse each document once
+and share the tree between them.
+
+The cache is a bounded in-memory LRU cache keyed by the content of the
+document, so it also avoids parsing documents that are seen again (e.g. the
+same default page on many sites). Parsed documents are large - a tree takes
+a multiple of the memory of its HTML - so only a few are kept by default.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import bytes, dict
+from future import standard_library
+
+import hashlib
+import threading
+
+from ..util.lru import LRUDict
+
+standard_library.install_aliases()
+
+DEFAULT_MAX_SIZE = 16
+
+
+def document_key(html_, parser, head_only=False, charset=None):
+    """
+    Return the cache key of a document parsed in a certain way
+
+    Parameters
+    ----------
+    html_ : str or bytes
+        the HTML of the document
+    parser : str
+        parser backend used (see
+        :func:`~nic_crawler_analysis.parse.html.parse_html`)
+    head_only : bool, optional
+        True if only the head of the document is parsed (default False)
+    charset : str, optional
+        encoding html_ is decoded with if it is bytes (default None)
+
+    Returns
+    -------
+    key : str
+        hex digest of html_ and the parameters
+    """
+    if isinstance(html_, bytes):
+        digest = hashlib.sha1(html_)
+        digest.update(("\0bytes\0%s" % charset).encode("utf-8"))
+    else:
+        digest = hashlib.sha1(html_.encode("utf-8", "surrogatepass"))
+    digest.update(b"\0")
+    digest.update(("%s\0%d" % (parser, head_only)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DocumentCache(object):
+    """
+    Cache for parsed HTML documents
+
+    Lookups return the cached tree itself, not a copy, so the trees must not
+    be modified. All methods are thread safe.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        maximal number of documents kept (default `DEFAULT_MAX_SIZE`)
+
+    Attributes
+    ----------
+    hits : int
+        number of lookups answered from the cache, i.e. parses avoided
+    misses : int
+        number of lookups that were not found in the cache, i.e. parses done
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self._entries = LRUDict(max_size)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, *keys):
+        """
+        Look up a document
+
+        Parameters
+        ----------
+        *keys : str
+            keys as returned by :func:`document_key` - the first one that is
+            in the cache is used (e.g. the key of the whole document and the
+            key of its head, as the whole document contains the head)
+
+        Returns
+        -------
+        found : bool
+            True if one of the keys is in the cache
+        value : bs4.BeautifulSoup
+            cached document (None if not found)
+        """
+        with self._lock:
+            for _key in keys:
+                value = self._entries.get(_key)
+                if value is not None:
+                    self.hits += 1
+                    return True, value
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        """
+        Store a document
+
+        Parameters
+        ----------
+        key : str
+            key as returned by :func:`document_key`
+        value : bs4.BeautifulSoup
+            parsed document
+        """
+        with self._lock:
+            self._entries.put(key, value)
+
+    def info(self):
+        """
+        Return the counters of the cache
+
+        Returns
+        -------
+        info : dict
+            dict with the keys 'hits' (parses avoided), 'misses' (parses
+            done) and 'size' (the number of documents in the cache)
+        """
+        with self._lock:
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                size=len(self._entries)
+            )
+
+    def clear(self):
+        """Remove all documents and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -102,3 +102,41 @@ def extract_http_header_lang_tag(header, accepted_langs=KNOWN_LANG_TAGS):
         return langs[0]
     else:
         return None
+
+
+def extract_http_header_content_type(header):
+    """
+    Parse an http header and return the value of its Content-Type
+
+    Parameters
+    ----------
+    header : str or dict
+        HTTP header to parse, either as a string containing json or as a list
+        of dicts with 'h' and 'v' keys
+
+    Returns
+    -------
+    content_type : str
+        value of the Content-Type header (e.g. "text/html; charset=utf-8")
+        or None
+    """
+    if isinstance(header, str):
+        try:
+            d = parse_header_json(header)
+            if d is None:
+                return None
+        except Exception as e:
+            raise ValueError("could not parse header - %s" % str(e))
+    elif isinstance(header, dict):
+        d = header
+    else:
+        raise ValueError(
+            "header is of type '%s' - expected str or dict" % type(header)
+        )
+
+    for _name, _value in d.items():
+        if _name.lower() == "content-type":
+            if isinstance(_value, str):
+                return _value
+            return None
+    return None
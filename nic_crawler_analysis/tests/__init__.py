@@ -9,5 +9,10 @@ standard_library.install_aliases()
 import nic_crawler_analysis.tests.util
 
 import nic_crawler_analysis.tests.test_analysis_lang_detect
+import nic_crawler_analysis.tests.test_analysis_lang_cache
+import nic_crawler_analysis.tests.test_analysis_lang_profiles
 import nic_crawler_analysis.tests.test_parse_html
+import nic_crawler_analysis.tests.test_parse_charset
+import nic_crawler_analysis.tests.test_parse_html_cache
+import nic_crawler_analysis.tests.test_util_lru
 import nic_crawler_analysis.tests.test_integration
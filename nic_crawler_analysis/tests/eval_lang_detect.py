@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Accuracy versus throughput evaluation of language detection
+
+Runs :func:`~nic_crawler_analysis.analysis.lang_detect.detect_languages` and
+:func:`~nic_crawler_analysis.analysis.lang_detect.detect_language_blocks`
+with each engine and each preset of `CONFIG_PRESETS` over a labelled corpus
+and reports for each combination (method) the accuracy, the share of
+documents detected as "unk", the throughput and the p50/p99 latency per
+document. Methods that no other method beats in both accuracy and throughput
+are marked as Pareto-optimal. The precision and recall of each language
+follow for each method.
+
+The corpus is a JSON lines file with one document per line, e.g.
+``{"lang": "de", "text": "..."}``, where "unk" labels documents without a
+language. The default corpus `CORPUS_PATH` ships with the tests, and the
+seed is fixed, so the evaluation runs offline and its accuracy figures are
+reproducible.
+
+Run from the root of the repository (or with the package installed):
+
+    python -m nic_crawler_analysis.tests.eval_lang_detect
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import dict, range, zip
+from future import standard_library
+standard_library.install_aliases()
+
+import io
+import os
+import json
+import timeit
+import argparse
+import functools
+
+import nic_crawler_analysis.analysis.lang_detect as nca_lang
+import nic_crawler_analysis.analysis.lang_numpy as nca_lang_numpy
+
+CORPUS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "lang_corpus.jsonl"
+)
+
+FUNCTIONS = ["detect_languages", "detect_language_blocks"]
+# Engines evaluated by default: those whose libraries are installed
+ENGINES = [
+    _engine for _engine in nca_lang.ENGINES
+    if _engine != "numpy" or nca_lang_numpy.NUMPY_AVAILABLE
+]
+
+
+def load_corpus(path=CORPUS_PATH):
+    """
+    Load a labelled corpus
+
+    Parameters
+    ----------
+    path : str, optional
+        JSON lines file with a "lang" and a "text" entry per line (default
+        `CORPUS_PATH`)
+
+    Returns
+    -------
+    corpus : list of tuple
+        (language, text) pairs
+    """
+    corpus = []
+    with io.open(path, encoding="utf-8") as f:
+        for _line in f:
+            if _line.strip():
+                _doc = json.loads(_line)
+                corpus.append((_doc["lang"], _doc["text"]))
+    return corpus
+
+
+def _predict_languages(text, engine, preset):
+    # The most probable language if it is probable enough, "unk" otherwise
+    config = nca_lang.CONFIG_PRESETS[preset]
+    langs = nca_lang.detect_languages(text, engine=engine, config=preset)
+    if langs:
+        lang, prob = max(langs.items(), key=lambda _item: _item[1])
+        if prob >= config.prob_threshold:
+            return lang
+    return "unk"
+
+
+def _predict_language_blocks(text, engine, preset):
+    # The language with the largest share of blocks, which may be "unk"
+    shares = nca_lang.detect_language_blocks(
+        text, engine=engine, config=preset
+    )
+    if shares:
+        return max(sorted(shares.items()), key=lambda _item: _item[1])[0]
+    return "unk"
+
+
+_PREDICTORS = dict(
+    detect_languages=_predict_languages,
+    detect_language_blocks=_predict_language_blocks,
+)
+
+
+def get_methods(functions=None, engines=None, presets=None):
+    """
+    Return the methods to evaluate
+
+    Parameters
+    ----------
+    functions : list of str, optional
+        functions of `FUNCTIONS` (default None: all)
+    engines : list of str, optional
+        engines of `nca_lang.ENGINES` (default None: `ENGINES`)
+    presets : list of str, optional
+        presets of `CONFIG_PRESETS` (default None: all)
+
+    Returns
+    -------
+    methods : list of tuple
+        (name, engine, predict) triples, where predict(text) returns the
+        language of text or "unk"
+    """
+    methods = []
+    for _function in functions or FUNCTIONS:
+        for _engine in engines or ENGINES:
+            for _preset in presets or sorted(nca_lang.CONFIG_PRESETS):
+                methods.append((
+                    "%s/%s/%s" % (_function, _engine, _preset),
+                    _engine,
+                    functools.partial(
+                        _PREDICTORS[_function], engine=_engine,
+                        preset=_preset
+                    ),
+                ))
+    return methods
+
+
+def _percentile(values, q):
+    # Nearest-rank percentile of a sorted list
+    i = int(round(q / 100.0 * (len(values) - 1)))
+    return values[i]
+
+
+def evaluate(predict, corpus, repeat=1):
+    """
+    Evaluate a method on a corpus
+
+    Parameters
+    ----------
+    predict : callable
+        returns the language of a text or "unk"
+    corpus : list of tuple
+        (language, text) pairs as returned by :func:`load_corpus`
+    repeat : int, optional
+        number of passes over the corpus - the fastest latency of each
+        document is kept (default 1)
+
+    Returns
+    -------
+    result : dict
+        "accuracy", "unk_rate", "docs_per_sec", "p50" and "p99" (latencies
+        in seconds) and "languages", a dict of language -> dict with the
+        "precision", "recall" and "support" (number of documents) of the
+        language
+    """
+    latencies = [None] * len(corpus)
+    predicted = [None] * len(corpus)
+    for _ in range(repeat):
+        for _i, (_lang, _text) in enumerate(corpus):
+            _start = timeit.default_timer()
+            predicted[_i] = predict(_text)
+            _elapsed = timeit.default_timer() - _start
+            if latencies[_i] is None or _elapsed < latencies[_i]:
+                latencies[_i] = _elapsed
+
+    labels = [_lang for _lang, _text in corpus]
+    languages = dict()
+    for _lang in sorted(set(labels) | set(predicted)):
+        _true = sum(
+            1 for _label, _pred in zip(labels, predicted)
+            if _label == _pred == _lang
+        )
+        _n_predicted = predicted.count(_lang)
+        _support = labels.count(_lang)
+        languages[_lang] = dict(
+            precision=_true / _n_predicted if _n_predicted else 0.0,
+            recall=_true / _support if _support else 0.0,
+            support=_support,
+        )
+
+    latencies.sort()
+    return dict(
+        accuracy=sum(
+            1 for _label, _pred in zip(labels, predicted) if _label == _pred
+        ) / len(corpus),
+        unk_rate=predicted.count("unk") / len(corpus),
+        docs_per_sec=len(corpus) / sum(latencies),
+        p50=_percentile(latencies, 50),
+        p99=_percentile(latencies, 99),
+        languages=languages,
+    )
+
+
+def pareto_front(results):
+    """
+    Return the methods that are not dominated in accuracy and throughput
+
+    Parameters
+    ----------
+    results : dict
+        method name -> result as returned by :func:`evaluate`
+
+    Returns
+    -------
+    names : set of str
+        names of the methods for which no other method is at least as
+        accurate and as fast and better in one of both
+    """
+    names = set()
+    for _name, _result in results.items():
+        _dominated = any(
+            _other["accuracy"] >= _result["accuracy"]
+            and _other["docs_per_sec"] >= _result["docs_per_sec"]
+            and (_other["accuracy"] > _result["accuracy"]
+                 or _other["docs_per_sec"] > _result["docs_per_sec"])
+            for _other_name, _other in results.items()
+            if _other_name != _name
+        )
+        if not _dominated:
+            names.add(_name)
+    return names
+
+
+def print_results(results, per_language=True):
+    """Print the results of :func:`evaluate` as table sorted by throughput"""
+    front = pareto_front(results)
+    names = sorted(results, key=lambda _name: -results[_name]["docs_per_sec"])
+    print("%-44s %8s %8s %10s %9s %9s %6s" % (
+        "method", "accuracy", "unk", "docs/s", "p50 [ms]", "p99 [ms]",
+        "pareto"
+    ))
+    for _name in names:
+        _result = results[_name]
+        print("%-44s %8.3f %8.3f %10.1f %9.3f %9.3f %6s" % (
+            _name, _result["accuracy"], _result["unk_rate"],
+            _result["docs_per_sec"], _result["p50"] * 1000,
+            _result["p99"] * 1000, "*" if _name in front else "",
+        ))
+
+    if per_language:
+        for _name in names:
+            print("")
+            print(_name)
+            print("    %-8s %9s %9s %8s" % (
+                "language", "precision", "recall", "support"
+            ))
+            for _lang, _scores in sorted(results[_name]["languages"].items()):
+                print("    %-8s %9.3f %9.3f %8d" % (
+                    _lang, _scores["precision"], _scores["recall"],
+                    _scores["support"]
+                ))
+
+
+def run(corpus_path=CORPUS_PATH, functions=None, engines=None, presets=None,
+        repeat=1, per_language=True):
+    corpus = load_corpus(corpus_path)
+    results = dict()
+    for _name, _engine, _predict in get_methods(functions, engines, presets):
+        # The profiles are loaded before the documents are timed
+        nca_lang.warmup(_engine)
+        results[_name] = evaluate(_predict, corpus, repeat)
+    print("%d documents from %s" % (len(corpus), corpus_path))
+    print_results(results, per_language)
+
+
+def get_argparser():
+    argparser = argparse.ArgumentParser(
+        description="Evaluate the accuracy and throughput of language "
+                    "detection on a labelled corpus"
+    )
+    argparser.add_argument(
+        '-c',
+        '--corpus',
+        default=CORPUS_PATH,
+        help="JSON lines file with a 'lang' and a 'text' per line"
+    )
+    argparser.add_argument(
+        '-f',
+        '--function',
+        action='append',
+        choices=FUNCTIONS,
+        help="function to evaluate (repeatable, default: all)"
+    )
+    argparser.add_argument(
+        '-e',
+        '--engine',
+        action='append',
+        choices=nca_lang.ENGINES,
+        help="engine to evaluate (repeatable, default: all installed)"
+    )
+    argparser.add_argument(
+        '-p',
+        '--preset',
+        action='append',
+        choices=sorted(nca_lang.CONFIG_PRESETS),
+        help="preset to evaluate (repeatable, default: all)"
+    )
+    argparser.add_argument(
+        '-r',
+        '--repeat',
+        type=int,
+        default=1,
+        help="number of passes over the corpus, the fastest latency of each "
+             "document is reported"
+    )
+    argparser.add_argument(
+        '--no-per-language',
+        dest='per_language',
+        action='store_false',
+        help="do not print precision and recall of each language"
+    )
+    return argparser
+
+
+if __name__ == '__main__':
+    pars = get_argparser().parse_args()
+    run(pars.corpus, pars.function, pars.engine, pars.preset, pars.repeat,
+        pars.per_language)
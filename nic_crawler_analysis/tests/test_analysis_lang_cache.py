@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from future import standard_library
+standard_library.install_aliases()
+import os
+import shutil
+import tempfile
+from nose.tools import assert_equals, nottest
+
+import nic_crawler_analysis.analysis.lang_detect as nca_lang
+from nic_crawler_analysis.analysis import lang_cache as nca_lang_cache
+
+from . import util as nca_util
+
+TEXT_STRING_LIST = [
+    "Ein Beispieltext mit dem wir uns anschauen, ob beim ausführne von unseren Funktionen das richtige herauskommt.",
+    "An example text to test for english language detection. If everything goes well we should get the result english " \
+    "when we're done.",
+]
+
+TEST_SET_LRU = [
+    # max_size, keys put, keys looked up, expected found
+    (2, ["a", "b", "c"], ["a", "b", "c"], [False, True, True]),
+    (2, ["a", "b", "a", "c"], ["a", "b", "c"], [True, False, True]),
+    (0, ["a"], ["a"], [False]),
+]
+
+TEST_SET_DETECT_CACHED = [
+    (nca_lang.detect_languages, {}),
+    (nca_lang.detect_languages, {"return_n_trials": True}),
+    (nca_lang.detect_language_blocks, {}),
+    (nca_lang.detect_language_blocks, {"return_blocks": True, "return_n_blocks": True}),
+]
+
+TEST_GENERATORS = []
+
+
+## Test generators
+def test_gen_lru():
+    for parameters in TEST_SET_LRU:
+        yield lru_test, parameters[0], parameters[1], parameters[2], parameters[3]
+TEST_GENERATORS.append(test_gen_lru)
+
+
+def test_gen_detect_cached():
+    for parameters in TEST_SET_DETECT_CACHED:
+        yield detect_cached_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_detect_cached)
+
+
+def test_gen_disk_cache():
+    for parameters in TEXT_STRING_LIST:
+        yield disk_cache_test, parameters
+TEST_GENERATORS.append(test_gen_disk_cache)
+
+
+## Test functions
+@nottest
+def lru_test(max_size, keys_put, keys_get, expected_found):
+    cache = nca_lang_cache.LanguageCache(max_size=max_size)
+    for _key in keys_put:
+        if _key in keys_put[:keys_put.index(_key)]:
+            cache.get(_key)
+        else:
+            cache.put(_key, {_key: 1.0})
+    cache.hits = cache.misses = 0
+
+    for _key, _found in zip(keys_get, expected_found):
+        found, value = cache.get(_key)
+        assert_equals(found, _found)
+        if found:
+            assert_equals(value, {_key: 1.0})
+    assert_equals(cache.info()["hits"], sum(expected_found))
+    assert_equals(cache.info()["misses"], len(expected_found) - sum(expected_found))
+
+
+@nottest
+def detect_cached_test(func, kwargs):
+    cache = nca_lang_cache.LanguageCache()
+    for _text in TEXT_STRING_LIST:
+        expected = func(_text, **kwargs)
+        assert_equals(func(_text, cache=cache, **kwargs), expected)
+        assert_equals(func(_text, cache=cache, **kwargs), expected)
+    assert_equals(cache.info()["misses"], len(TEXT_STRING_LIST))
+    assert_equals(cache.info()["hits"], len(TEXT_STRING_LIST))
+
+    # randomized results are never cached
+    func(TEXT_STRING_LIST[0], cache=cache, randomize_seed=True, **kwargs)
+    assert_equals(cache.info()["misses"], len(TEXT_STRING_LIST))
+
+
+@nottest
+def disk_cache_test(text):
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "cache.sqlite")
+        cache = nca_lang_cache.LanguageCache(path=path)
+        expected = nca_lang.detect_languages(text, cache=cache)
+        cache.close()
+
+        cache = nca_lang_cache.LanguageCache(path=path)
+        assert_equals(nca_lang.detect_languages(text, cache=cache), expected)
+        assert_equals(nca_lang.detect_languages(text, cache=cache), expected)
+        assert_equals(cache.info()["disk_hits"], 1)
+        assert_equals(cache.info()["hits"], 1)
+        assert_equals(cache.info()["misses"], 0)
+        cache.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+@nottest
+def test_all():
+    nca_util.test_all(TEST_GENERATORS)
@@ -6,11 +6,21 @@ from __future__ import unicode_literals
 from builtins import zip
 from future import standard_library
 standard_library.install_aliases()
-from nose.tools import assert_equals, nottest
+import os
+import sys
+import json
+import subprocess
+from multiprocessing.pool import ThreadPool
+import langdetect
+from nose.tools import assert_equals, assert_raises, nottest
 
 import nic_crawler_analysis.analysis.lang_detect as nca_lang
+import nic_crawler_analysis.analysis.lang_numpy as nca_lang_numpy
+from nic_crawler_analysis.analysis.lang_cache import LanguageCache
+from nic_crawler_analysis.parse.html import extract_all_from_html
 
 from . import util as nca_util
+from . import eval_lang_detect as nca_eval
 
 
 TEXT_STRING_LIST = [
@@ -37,6 +47,142 @@ LANG_BLOCKS_FROM_TEXT_RESULTS = [
 
 TEST_SET_LANG_FROM_TEXT = zip(TEXT_STRING_LIST, LANG_FROM_TEXT_RESULTS)
 TEST_SET_LANG_BLOCKS_FROM_TEXT = zip(TEXT_STRING_LIST, LANG_BLOCKS_FROM_TEXT_RESULTS)
+# Engines whose libraries are installed - the numpy tests are skipped
+# without numpy
+ENGINES_AVAILABLE = [
+    _engine for _engine in nca_lang.ENGINES
+    if _engine != "numpy" or nca_lang_numpy.NUMPY_AVAILABLE
+]
+TEST_SET_LANG_NUMPY_FROM_TEXT = TEXT_STRING_LIST if nca_lang_numpy.NUMPY_AVAILABLE else []
+TEST_SET_LANG_NUMPY_CORPUS = [0, 1, 2] if nca_lang_numpy.NUMPY_AVAILABLE else []  # seeds
+TEST_SET_CONFIDENCE_Z = [
+    # confidence, quantile of the standard normal distribution at (1 + confidence) / 2
+    (0.5, 0.6744897501960817),
+    (0.9, 1.6448536269514722),
+    (0.95, 1.959963984540054),
+    (0.99, 2.5758293035489004),
+]
+TEST_SET_LANG_BLOCKS_NUMPY_FROM_TEXT = (
+    zip(TEXT_STRING_LIST, LANG_BLOCKS_FROM_TEXT_RESULTS) if nca_lang_numpy.NUMPY_AVAILABLE else []
+)
+TEST_SET_LANG_BLOCKS_ADAPTIVE_FROM_TEXT = [
+    # text, expected languages, maximal number of blocks evaluated
+    (' '.join([TEXT_STRING_LIST[0]] * 40), {'de': (1.0, 1.0)}, 4),
+    (' '.join([TEXT_STRING_LIST[1]] * 40), {'en': (1.0, 1.0)}, 4),
+    (
+        ' '.join([TEXT_STRING_LIST[0]] * 40 + [TEXT_STRING_LIST[1]] * 40),
+        {'de': (0.3, 0.7), 'en': (0.3, 0.7)},
+        20
+    ),
+]
+TEST_SET_LANG_ADAPTIVE_TRIALS_FROM_TEXT = zip(TEXT_STRING_LIST, LANG_FROM_TEXT_RESULTS)
+TEST_SET_LANG_PARALLEL_FROM_TEXT = [
+    # engine, seed
+    (_engine, _seed)
+    for _engine in ["langdetect", "numpy"] if _engine in ENGINES_AVAILABLE
+    for _seed in [None, nca_lang.SEED_FROM_TEXT]
+]
+TEST_SET_LANG_INVALID_SEED = [
+    (_engine, _seed)
+    for _engine in ENGINES_AVAILABLE
+    for _seed in [-1, -2**40, "unknown", 1.5, True]
+]
+TEST_SET_LANG_BATCH_FROM_TEXT = [
+    TEXT_STRING_LIST,
+    TEXT_STRING_LIST[::-1],
+    TEXT_STRING_LIST + ["", "1234"],
+]
+TEST_SET_LANG_CANDIDATES_FROM_TEXT = [
+    # text, candidates, fallback, expected most probable language
+    (TEXT_STRING_LIST[0], ["de", "en"], True, "de"),
+    (TEXT_STRING_LIST[1], ["de", "en", "fr"], True, "en"),
+    (TEXT_STRING_LIST[0], ["fr", "it"], True, "de"),
+    (TEXT_STRING_LIST[1], ["de", "nl"], True, "en"),
+    (TEXT_STRING_LIST[0], ["fr", "it"], False, None),
+]
+TEST_SET_LANG_LAZY_INIT = ENGINES_AVAILABLE
+TEST_SET_LANG_SCRIPT_FROM_TEXT = [
+    # text, languages of the script, expected most probable language
+    ("ภาษาไทยเป็นภาษาที่มีระดับเสียงของคำแน่นอน", ["th"], "th"),
+    ("한국어는 대한민국과 조선민주주의인민공화국의 공용어이다.", ["ko"], "ko"),
+    ("Η ελληνική γλώσσα είναι μία από τις ινδοευρωπαϊκές γλώσσες.", ["el"], "el"),
+    ("日本語は、主に日本国内や日本人同士の間で使用されている言語である。", ["ja"], "ja"),
+    ("Русский язык — один из восточнославянских языков.", ["bg", "mk", "ru", "uk"], "ru"),
+    (TEXT_STRING_LIST[0], nca_lang.SCRIPT_LANGS["latin"], "de"),
+    ("Hello мир", None, None),
+    ("1234", None, None),
+]
+TEST_SET_LANG_BLOCKS_INCREMENTAL_FROM_TEXT = TEXT_STRING_LIST + [
+    ' '.join(TEXT_STRING_LIST[1].split()[:25]),
+    ' '.join([TEXT_STRING_LIST[0]] * 3),
+    "Visit http://www.example.com/index.html or write to info@example.com. "
+    "THIS IS A CAPITALIZED SENTENCE. Đây là tiếng Việt có dấu.",
+    "Русский язык abc Москва " * 10,
+    "",
+]
+TEST_SET_LANG_BLOCKS_STREAMING_FROM_TEXT = [
+    (TEXT_STRING_LIST[1], {"en": 1.0}),
+    (' '.join([TEXT_STRING_LIST[0]] * 100), {"de": 1.0}),
+    (' '.join([TEXT_STRING_LIST[0]] * 50 + [TEXT_STRING_LIST[1]] * 50),
+     {"de": 0.5, "en": 0.5}),
+    ("", {"unk": 1.0}),
+]
+TEST_SET_LANG_BLOCKS_UNSPACED_FROM_TEXT = [
+    ("日本語は、主に日本国内や日本人同士の間で使用されている言語である。" * 20, "ja"),
+    ("中华人民共和国是位于东亚的社会主义国家，首都为北京。" * 20, "zh-cn"),
+    ("ภาษาไทยเป็นภาษาที่มีระดับเสียงของคำแน่นอนหรือวรรณยุกต์เช่นเดียวกับภาษาจีน" * 10, "th"),
+    (' '.join([TEXT_STRING_LIST[1]] * 10), "en"),
+]
+SITE_TEXT_DE = ' '.join([TEXT_STRING_LIST[0]] * 10)
+TEST_SET_LANG_SITE = [
+    # header, html, expected language, path, number of blocks
+    ("[]", '<html lang="de"><body>%s</body></html>' % SITE_TEXT_DE,
+     "de", nca_lang.SITE_PATH_META, nca_lang.SITE_SAMPLE_BLOCKS),
+    ('[{"h": "Content-Language", "v": "de"}]',
+     '<html><body>%s</body></html>' % SITE_TEXT_DE,
+     "de", nca_lang.SITE_PATH_META, nca_lang.SITE_SAMPLE_BLOCKS),
+    # the meta-information is not confirmed by the text
+    ("[]", '<html lang="en"><body>%s</body></html>' % SITE_TEXT_DE,
+     "de", nca_lang.SITE_PATH_BLOCKS,
+     nca_lang.SITE_SAMPLE_BLOCKS + nca_lang.TEXT_SAMPLES_N),
+    # the meta-information disagrees
+    ({"Content-Language": "fr"},
+     '<html lang="de"><body>%s</body></html>' % SITE_TEXT_DE,
+     "de", nca_lang.SITE_PATH_BLOCKS, nca_lang.TEXT_SAMPLES_N),
+    ("[]", '<html><body>%s</body></html>' % SITE_TEXT_DE,
+     "de", nca_lang.SITE_PATH_BLOCKS, nca_lang.TEXT_SAMPLES_N),
+    ("[]", '<html lang="de"><body></body></html>',
+     "de", nca_lang.SITE_PATH_META_ONLY, 0),
+    ("[]", '<html><body>1234</body></html>',
+     None, nca_lang.SITE_PATH_META_ONLY, 0),
+]
+TEST_SET_LANG_CONFIG = [
+    (_config, _engine)
+    for _config in [
+        None,
+        "fast",
+        "default",
+        "accurate",
+        nca_lang.DetectionConfig(n_trials=3, text_samples_n=4,
+                                 text_samples_length=5, prob_threshold=0.5),
+    ]
+    for _engine in ENGINES_AVAILABLE
+]
+
+TEST_SET_LANG_EVALUATION = nca_eval.FUNCTIONS
+
+# Runs in a new process: prints whether the profiles were loaded after the
+# import and after warmup
+LAZY_INIT_SCRIPT = """
+import sys, json
+import langdetect
+import nic_crawler_analysis.analysis.lang_detect as nca_lang
+loaded = [langdetect.detector_factory._factory is not None]
+nca_lang.warmup(sys.argv[1])
+loaded.append(langdetect.detector_factory._factory is not None)
+loaded.append(None in nca_lang._profile_matrices)
+print(json.dumps(loaded))
+"""
 
 TEST_GENERATORS = []
 
@@ -53,6 +199,117 @@ def test_gen_lang_blocks_from_text():
 TEST_GENERATORS.append(test_gen_lang_blocks_from_text)
 
 
+def test_gen_lang_numpy_from_text():
+    for parameters in TEST_SET_LANG_NUMPY_FROM_TEXT:
+        yield lang_numpy_from_text_test, parameters
+TEST_GENERATORS.append(test_gen_lang_numpy_from_text)
+
+
+def test_gen_lang_numpy_corpus():
+    for parameters in TEST_SET_LANG_NUMPY_CORPUS:
+        yield lang_numpy_corpus_test, parameters
+TEST_GENERATORS.append(test_gen_lang_numpy_corpus)
+
+
+def test_gen_lang_blocks_numpy_from_text():
+    for parameters in TEST_SET_LANG_BLOCKS_NUMPY_FROM_TEXT:
+        yield lang_blocks_from_text_test, parameters[0], parameters[1], "numpy"
+TEST_GENERATORS.append(test_gen_lang_blocks_numpy_from_text)
+
+
+def test_gen_lang_blocks_adaptive_from_text():
+    for parameters in TEST_SET_LANG_BLOCKS_ADAPTIVE_FROM_TEXT:
+        yield lang_blocks_adaptive_from_text_test, parameters[0], parameters[1], parameters[2]
+TEST_GENERATORS.append(test_gen_lang_blocks_adaptive_from_text)
+
+
+def test_gen_confidence_z():
+    for parameters in TEST_SET_CONFIDENCE_Z:
+        yield confidence_z_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_confidence_z)
+
+
+def test_gen_lang_adaptive_trials_from_text():
+    for parameters in TEST_SET_LANG_ADAPTIVE_TRIALS_FROM_TEXT:
+        yield lang_adaptive_trials_from_text_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_lang_adaptive_trials_from_text)
+
+
+def test_gen_lang_parallel_from_text():
+    for parameters in TEST_SET_LANG_PARALLEL_FROM_TEXT:
+        yield lang_parallel_from_text_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_lang_parallel_from_text)
+
+
+def test_gen_lang_invalid_seed():
+    for parameters in TEST_SET_LANG_INVALID_SEED:
+        yield lang_invalid_seed_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_lang_invalid_seed)
+
+
+def test_gen_lang_batch_from_text():
+    for parameters in TEST_SET_LANG_BATCH_FROM_TEXT:
+        yield lang_batch_from_text_test, parameters
+TEST_GENERATORS.append(test_gen_lang_batch_from_text)
+
+
+def test_gen_lang_candidates_from_text():
+    for parameters in TEST_SET_LANG_CANDIDATES_FROM_TEXT:
+        yield (lang_candidates_from_text_test, parameters[0], parameters[1],
+               parameters[2], parameters[3])
+TEST_GENERATORS.append(test_gen_lang_candidates_from_text)
+
+
+def test_gen_lang_lazy_init():
+    for parameters in TEST_SET_LANG_LAZY_INIT:
+        yield lang_lazy_init_test, parameters
+TEST_GENERATORS.append(test_gen_lang_lazy_init)
+
+
+def test_gen_lang_script_from_text():
+    for parameters in TEST_SET_LANG_SCRIPT_FROM_TEXT:
+        yield (lang_script_from_text_test, parameters[0], parameters[1],
+               parameters[2])
+TEST_GENERATORS.append(test_gen_lang_script_from_text)
+
+
+def test_gen_lang_blocks_incremental_from_text():
+    for parameters in TEST_SET_LANG_BLOCKS_INCREMENTAL_FROM_TEXT:
+        yield lang_blocks_incremental_from_text_test, parameters
+TEST_GENERATORS.append(test_gen_lang_blocks_incremental_from_text)
+
+
+def test_gen_lang_blocks_streaming_from_text():
+    for parameters in TEST_SET_LANG_BLOCKS_STREAMING_FROM_TEXT:
+        yield lang_blocks_streaming_from_text_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_lang_blocks_streaming_from_text)
+
+
+def test_gen_lang_blocks_unspaced_from_text():
+    for parameters in TEST_SET_LANG_BLOCKS_UNSPACED_FROM_TEXT:
+        yield lang_blocks_unspaced_from_text_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_lang_blocks_unspaced_from_text)
+
+
+def test_gen_lang_site():
+    for parameters in TEST_SET_LANG_SITE:
+        yield (lang_site_test, parameters[0], parameters[1], parameters[2],
+               parameters[3], parameters[4])
+TEST_GENERATORS.append(test_gen_lang_site)
+
+
+def test_gen_lang_config():
+    for parameters in TEST_SET_LANG_CONFIG:
+        yield lang_config_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_lang_config)
+
+
+def test_gen_lang_evaluation():
+    for parameters in TEST_SET_LANG_EVALUATION:
+        yield lang_evaluation_test, parameters
+TEST_GENERATORS.append(test_gen_lang_evaluation)
+
+
 ## Test functions
 @nottest
 def lang_from_text_test(text, expected_langs):
@@ -65,9 +322,70 @@ def lang_from_text_test(text, expected_langs):
 
 
 @nottest
-def lang_blocks_from_text_test(text,expected_langs):
-    results = nca_lang.detect_language_blocks(text)
+def lang_numpy_from_text_test(text):
+    results = nca_lang.detect_languages(text, engine="numpy")
+    expected = nca_lang.detect_languages(text, engine="langdetect")
+
+    assert_numpy_probs_close(results, expected)
+
+
+@nottest
+def assert_numpy_probs_close(results, expected):
+    # probabilities of the numpy engine compared to those of langdetect
+    results = results or {}
+    expected = expected or {}
+    unambiguous = (
+        len(results) == 1 and len(expected) == 1
+        and min(list(results.values()) + list(expected.values())) > 0.99
+    )
+    if unambiguous:
+        assert_equals(list(results.keys()), list(expected.keys()))
+    tolerance = (nca_lang_numpy.PROB_TOLERANCE_UNAMBIGUOUS if unambiguous
+                 else nca_lang_numpy.PROB_TOLERANCE)
+    for _lang in set(results.keys()) | set(expected.keys()):
+        assert_equals(
+            abs(results.get(_lang, 0.0) - expected.get(_lang, 0.0))
+            <= tolerance,
+            True
+        )
+
+
+@nottest
+def lang_numpy_corpus_test(seed):
+    # the most probable language of both engines is the same for every
+    # document of the evaluation corpus
+    for _lang, _text in nca_eval.load_corpus():
+        results = nca_lang.detect_languages(_text, engine="numpy", seed=seed)
+        expected = nca_lang.detect_languages(
+            _text, engine="langdetect", seed=seed
+        )
+        assert_numpy_probs_close(results, expected)
+        if expected:
+            assert_equals(max(results, key=results.get),
+                          max(expected, key=expected.get))
+        else:
+            assert_equals(results, expected)
+
+
+@nottest
+def lang_blocks_from_text_test(text, expected_langs, engine="langdetect"):
+    results = nca_lang.detect_language_blocks(text, engine=engine)
+
+    assert_equals(len(results), len(expected_langs))
+    for _lang, (_val_lower, _val_upper) in expected_langs.items():
+        assert_equals(_lang in results.keys(), True)
+        assert_equals(results[_lang] >= _val_lower, True)
+        assert_equals(results[_lang] <= _val_upper, True)
+
+
+@nottest
+def lang_blocks_adaptive_from_text_test(text, expected_langs, max_blocks):
+    results, blocks, n_blocks = nca_lang.detect_language_blocks(
+        text, adaptive=True, return_blocks=True, return_n_blocks=True
+    )
 
+    assert_equals(n_blocks <= max_blocks, True)
+    assert_equals(len(blocks), n_blocks)
     assert_equals(len(results), len(expected_langs))
     for _lang, (_val_lower, _val_upper) in expected_langs.items():
         assert_equals(_lang in results.keys(), True)
@@ -75,6 +393,359 @@ def lang_blocks_from_text_test(text,expected_langs):
         assert_equals(results[_lang] <= _val_upper, True)
 
 
+@nottest
+def confidence_z_test(confidence, expected_z):
+    assert_equals(abs(nca_lang._confidence_z(confidence) - expected_z) < 1e-12, True)
+    for _confidence in [0.0, 1.0, -0.5]:
+        assert_raises(ValueError, nca_lang._confidence_z, _confidence)
+
+
+@nottest
+def lang_adaptive_trials_from_text_test(text, expected_langs):
+    results, n_trials = nca_lang.detect_languages(
+        text, adaptive_trials=True, return_n_trials=True
+    )
+    results_repeated, n_trials_repeated = nca_lang.detect_languages(
+        text, adaptive_trials=True, return_n_trials=True
+    )
+
+    assert_equals(n_trials >= nca_lang.ADAPTIVE_MIN_TRIALS, True)
+    assert_equals(n_trials <= nca_lang.N_TRIALS, True)
+    assert_equals(results, results_repeated)
+    assert_equals(n_trials, n_trials_repeated)
+    assert_equals(len(results), len(expected_langs))
+    for _lang, _val in expected_langs.items():
+        assert_equals(_lang in results.keys(), True)
+        assert_equals(results[_lang] >= _val, True)
+
+
+@nottest
+def lang_parallel_from_text_test(engine, seed):
+    texts = TEXT_STRING_LIST * 4
+    global_seed = langdetect.DetectorFactory.seed
+
+    def _detect(text):
+        return (
+            nca_lang.detect_languages(text, engine=engine, seed=seed),
+            nca_lang.detect_language_blocks(text, engine=engine, seed=seed),
+        )
+
+    serial = [_detect(_text) for _text in texts]
+    pool = ThreadPool(4)
+    try:
+        parallel = pool.map(_detect, texts)
+        # randomized runs must not change the global seed of langdetect
+        pool.map(
+            lambda text: nca_lang.detect_languages(
+                text, engine=engine, randomize_seed=True
+            ),
+            texts
+        )
+    finally:
+        pool.close()
+
+    assert_equals(serial, parallel)
+    assert_equals(langdetect.DetectorFactory.seed, global_seed)
+
+
+@nottest
+def lang_invalid_seed_test(engine, seed):
+    text = TEXT_STRING_LIST[0]
+    assert_raises(ValueError, nca_lang.detect_languages, text, engine=engine,
+                  seed=seed)
+    assert_raises(ValueError, nca_lang.detect_language_blocks, text,
+                  engine=engine, seed=seed)
+    assert_raises(ValueError, nca_lang.detect_languages_batch, [text],
+                  engine=engine, seed=seed)
+    # the seed is not used with randomize_seed
+    assert_equals(
+        len(nca_lang.detect_languages(text, engine=engine, seed=seed,
+                                      randomize_seed=True)) > 0,
+        True
+    )
+
+
+@nottest
+def lang_batch_from_text_test(texts):
+    results = nca_lang.detect_languages_batch(texts)
+
+    assert_equals(len(results), len(texts))
+    for _text, _result in zip(texts, results):
+        assert_equals(_result, nca_lang.detect_languages(_text))
+
+
+@nottest
+def lang_candidates_from_text_test(text, candidates, fallback, expected_lang):
+    for _engine in ENGINES_AVAILABLE:
+        results = nca_lang.detect_languages(
+            text, engine=_engine, candidate_langs=candidates,
+            candidate_fallback=fallback
+        )
+        results_batch = nca_lang.detect_languages_batch(
+            [text], engine=_engine, candidate_langs=candidates,
+            candidate_fallback=fallback
+        )
+        assert_equals(results_batch, [results])
+
+        top_lang = max(results.items(), key=lambda x: x[1])[0]
+        if expected_lang is None:
+            # without fallback only candidates are returned
+            assert_equals(top_lang in candidates, True)
+        else:
+            assert_equals(top_lang, expected_lang)
+
+        blocks = nca_lang.detect_language_blocks(
+            text, engine=_engine, candidate_langs=candidates,
+            candidate_fallback=fallback
+        )
+        for _lang in blocks:
+            assert_equals(
+                _lang == "unk" or _lang in candidates or fallback, True
+            )
+
+    assert_raises(
+        ValueError, nca_lang.detect_languages, text, candidate_langs=["xx"]
+    )
+    assert_raises(
+        ValueError, nca_lang.detect_languages, text, candidate_langs=[]
+    )
+
+
+@nottest
+def lang_lazy_init_test(engine):
+    env = dict(os.environ)
+    env.pop(nca_lang.PROFILE_STORE_ENV, None)
+    output = subprocess.check_output(
+        [sys.executable, "-c", LAZY_INIT_SCRIPT, engine], env=env
+    )
+    loaded = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+    assert_equals(loaded, [False, True, engine == "numpy"])
+    assert_equals(nca_lang.lang_list, nca_lang.get_lang_list())
+
+
+@nottest
+def lang_script_from_text_test(text, expected_script_langs, expected_lang):
+    assert_equals(nca_lang.detect_script_languages(text),
+                  expected_script_langs)
+
+    for _engine in ENGINES_AVAILABLE:
+        results, n_trials = nca_lang.detect_languages(
+            text, engine=_engine, script_prefilter=True, return_n_trials=True
+        )
+        if expected_lang is None:
+            assert_equals(
+                results, nca_lang.detect_languages(text, engine=_engine)
+            )
+            continue
+
+        assert_equals(max(results.items(), key=lambda x: x[1])[0],
+                      expected_lang)
+        if len(expected_script_langs) == 1:
+            assert_equals((results, n_trials), ({expected_lang: 1.0}, 0))
+        assert_equals(
+            nca_lang.detect_languages_batch(
+                [text, text], engine=_engine, script_prefilter=True
+            ),
+            [results, results]
+        )
+        assert_equals(
+            nca_lang.detect_language_blocks(
+                text, engine=_engine, script_prefilter=True
+            ),
+            {expected_lang: 1.0}
+        )
+
+
+@nottest
+def lang_blocks_incremental_from_text_test(text):
+    for _kwargs in [
+            {},
+            {"adaptive_trials": True},
+            {"seed": nca_lang.SEED_FROM_TEXT},
+            {"candidate_langs": ["de", "en"]},
+    ]:
+        assert_equals(
+            nca_lang.detect_language_blocks(
+                text, engine="incremental", return_blocks=True, **_kwargs
+            ),
+            nca_lang.detect_language_blocks(
+                text, engine="langdetect", return_blocks=True, **_kwargs
+            )
+        )
+    assert_equals(nca_lang.detect_languages(text, engine="incremental"),
+                  nca_lang.detect_languages(text))
+
+
+@nottest
+def lang_blocks_streaming_from_text_test(text, expected_langs):
+    expected = nca_lang.detect_language_blocks(text, return_blocks=True)
+    assert_equals(
+        nca_lang.detect_language_blocks(text, return_blocks=True,
+                                         streaming=True),
+        expected
+    )
+
+    # chunks of 7 characters split most words
+    chunks = (text[_i:_i + 7] for _i in range(0, len(text), 7))
+    results, blocks = nca_lang.detect_language_blocks(
+        chunks, return_blocks=True, streaming=True
+    )
+    # the blocks may be at other positions than without streaming
+    assert_equals(sorted(results), sorted(expected_langs))
+    for _lang, _share in expected_langs.items():
+        assert_equals(abs(results[_lang] - _share) <= 0.1, True)
+    assert_equals(len(blocks) <= nca_lang.TEXT_SAMPLES_N, True)
+    words = text.split()
+    for _block in blocks:
+        assert_equals(
+            _block['text'],
+            ' '.join(words[_block['i_begin']:
+                           _block['i_begin'] + nca_lang.TEXT_SAMPLES_LENGTH])
+        )
+    if len(words) <= 2 * nca_lang.TEXT_SAMPLES_LENGTH:
+        assert_equals(blocks, expected[1])
+
+    assert_raises(ValueError, nca_lang.detect_language_blocks, [text])
+
+
+@nottest
+def lang_blocks_unspaced_from_text_test(text, expected_lang):
+    results, blocks = nca_lang.detect_language_blocks(text, return_blocks=True)
+    assert_equals(results, {expected_lang: 1.0})
+    assert_equals(len(blocks) >= nca_lang.TEXT_SAMPLES_N, True)
+
+    # pieces may start with a few characters of other scripts, e.g. "。"
+    max_length = (
+        nca_lang.TEXT_SAMPLES_LENGTH * 2 * nca_lang.UNSPACED_WORD_LENGTH
+    )
+    for _block in blocks:
+        assert_equals(len(_block['text']) <= max_length, True)
+    if not nca_lang._UNSPACED_RE.search(text):
+        words = text.split()
+        for _block in blocks:
+            assert_equals(
+                _block['text'],
+                ' '.join(words[_block['i_begin']:
+                               _block['i_begin']
+                               + nca_lang.TEXT_SAMPLES_LENGTH])
+            )
+
+    assert_equals(
+        nca_lang.detect_language_blocks(text, return_blocks=True,
+                                         streaming=True),
+        (results, blocks)
+    )
+
+
+@nottest
+def lang_site_test(header, html, expected_lang, expected_path,
+                   expected_n_blocks):
+    assert_equals(
+        nca_lang.detect_site_language(
+            header, html, return_path=True, return_n_blocks=True
+        ),
+        (expected_lang, expected_path, expected_n_blocks)
+    )
+    assert_equals(nca_lang.detect_site_language(header, html), expected_lang)
+    # the inputs extracted while parsing give the same result
+    assert_equals(
+        nca_lang.detect_site_language(
+            header, extract_all_from_html(html, streaming=True),
+            return_path=True, return_n_blocks=True
+        ),
+        (expected_lang, expected_path, expected_n_blocks)
+    )
+    # a text bounded to the words that are sampled gives the same language
+    assert_equals(
+        nca_lang.detect_site_language(header, html, bounded_text=True),
+        expected_lang
+    )
+    # the undecoded document gives the same result
+    assert_equals(
+        nca_lang.detect_site_language(
+            header, html.encode("utf-8"), return_path=True,
+            return_n_blocks=True
+        ),
+        (expected_lang, expected_path, expected_n_blocks)
+    )
+
+
+@nottest
+def lang_config_test(config, engine):
+    if config is None or nca_lang.CONFIG_PRESETS.get(config) is not None:
+        expected = nca_lang.CONFIG_PRESETS.get(config or "default")
+    else:
+        expected = config
+    text = ' '.join([TEXT_STRING_LIST[1]] * 10)
+
+    langs, n_trials = nca_lang.detect_languages(
+        text, engine=engine, config=config, return_n_trials=True
+    )
+    assert_equals(list(langs), ["en"])
+    assert_equals(n_trials, expected.n_trials)
+    assert_equals(
+        nca_lang.detect_languages_batch([text], engine=engine, config=config),
+        [langs]
+    )
+
+    results, blocks = nca_lang.detect_language_blocks(
+        text, engine=engine, config=config, return_blocks=True
+    )
+    assert_equals(results, {"en": 1.0})
+    assert_equals(len(blocks) < 2 * expected.text_samples_n, True)
+    for _block in blocks:
+        assert_equals(len(_block['text'].split()),
+                      expected.text_samples_length)
+        assert_equals(_block['n_trials'], expected.n_trials)
+
+    # results of other configs are cached separately
+    cache = LanguageCache()
+    nca_lang.detect_language_blocks(text, config="accurate", cache=cache)
+    assert_equals(
+        nca_lang.detect_language_blocks(
+            text, engine=engine, config=config, return_blocks=True,
+            cache=cache
+        ),
+        (results, blocks)
+    )
+
+    assert_raises(ValueError, nca_lang.detect_languages, text,
+                  config="unknown")
+    assert_raises(ValueError, nca_lang.DetectionConfig, n_trials=0)
+    assert_raises(ValueError, nca_lang.DetectionConfig, prob_threshold=1.0)
+
+
+@nottest
+def lang_evaluation_test(function):
+    corpus = nca_eval.load_corpus()
+    engine = "numpy" if nca_lang_numpy.NUMPY_AVAILABLE else "langdetect"
+    methods = nca_eval.get_methods([function], [engine], ["fast"])
+    assert_equals([_name for _name, _engine, _predict in methods],
+                  [function + "/" + engine + "/fast"])
+
+    result = nca_eval.evaluate(methods[0][2], corpus)
+    assert_equals(result["accuracy"] >= 0.9, True)
+    assert_equals(result["unk_rate"] < 0.2, True)
+    assert_equals(result["p50"] <= result["p99"], True)
+    assert_equals(
+        sum(_scores["support"] for _scores in result["languages"].values()),
+        len(corpus)
+    )
+    # the seed is fixed, so the predictions are reproducible
+    assert_equals(
+        nca_eval.evaluate(methods[0][2], corpus)["languages"],
+        result["languages"]
+    )
+
+    results = {
+        "slow": dict(accuracy=0.9, docs_per_sec=10.0),
+        "fast": dict(accuracy=0.8, docs_per_sec=100.0),
+        "dominated": dict(accuracy=0.8, docs_per_sec=10.0),
+    }
+    assert_equals(nca_eval.pareto_front(results), {"slow", "fast"})
+
+
 @nottest
 def test_all():
     nca_util.test_all(TEST_GENERATORS)
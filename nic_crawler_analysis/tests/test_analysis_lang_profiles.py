@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from future import standard_library
+standard_library.install_aliases()
+import os
+import shutil
+import tempfile
+import langdetect
+from nose.tools import assert_equals, nottest
+
+import nic_crawler_analysis.analysis.lang_detect as nca_lang
+from nic_crawler_analysis.analysis import lang_numpy as nca_lang_numpy
+from nic_crawler_analysis.analysis import lang_profiles as nca_lang_profiles
+
+from . import util as nca_util
+
+TEXT_STRING_LIST = [
+    "Ein Beispieltext mit dem wir uns anschauen, ob beim ausführne von unseren Funktionen das richtige herauskommt.",
+    "An example text to test for english language detection. If everything goes well we should get the result english " \
+    "when we're done.",
+    "日本語のテキストです。東京の天気について。",
+    "1234",
+]
+
+# Profile stores require numpy - the tests are skipped without it
+TEST_SET_STORE = [
+    # memory-mapped
+    True,
+    False,
+] if nca_lang_numpy.NUMPY_AVAILABLE else []
+
+TEST_SET_STORE_DETECT = TEXT_STRING_LIST if nca_lang_numpy.NUMPY_AVAILABLE else []
+
+TEST_GENERATORS = []
+
+
+## Test generators
+def test_gen_store():
+    for parameters in TEST_SET_STORE:
+        yield store_test, parameters
+TEST_GENERATORS.append(test_gen_store)
+
+
+def test_gen_store_detect():
+    for parameters in TEST_SET_STORE_DETECT:
+        yield store_detect_test, parameters
+TEST_GENERATORS.append(test_gen_store_detect)
+
+
+## Test functions
+@nottest
+def langdetect_factory():
+    factory = langdetect.DetectorFactory()
+    factory.load_profile(langdetect.detector_factory.PROFILES_DIRECTORY)
+    return factory
+
+
+@nottest
+def compiled_store(mmap=True):
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "profiles")
+        nca_lang_profiles.compile_profiles(path)
+        # compiling an existing store keeps it
+        nca_lang_profiles.compile_profiles(path)
+        return nca_lang_profiles.load_profiles(path, mmap=mmap)
+    finally:
+        shutil.rmtree(directory)
+
+
+@nottest
+def store_test(mmap):
+    matrix = compiled_store(mmap)
+    factory = langdetect_factory()
+
+    assert_equals(isinstance(matrix.probs, nca_lang_numpy.np.memmap), mmap)
+    assert_equals(matrix.langs, factory.langlist)
+    assert_equals(len(matrix.ngrams), len(factory.word_lang_prob_map))
+    for _ngram in list(factory.word_lang_prob_map)[::1000]:
+        _i = matrix.find([_ngram])[0]
+        assert_equals(matrix.probs[_i].tolist(),
+                      factory.word_lang_prob_map[_ngram])
+    assert_equals(matrix.find(["not an n-gram", "￿"]).tolist(), [-1, -1])
+
+
+@nottest
+def store_detect_test(text):
+    store_factory = nca_lang_profiles.ProfileFactory(compiled_store())
+    expected = []
+    results = []
+    for _factory, _results in [
+            (langdetect_factory(), expected),
+            (store_factory, results),
+    ]:
+        _detector = _factory.create()
+        nca_lang._reset_detector(_detector, nca_lang.DEFAULT_SEED)
+        _results.append(
+            nca_lang._detect_with_detector(_detector, text, False)
+        )
+    assert_equals(results, expected)
+
+
+@nottest
+def test_all():
+    nca_util.test_all(TEST_GENERATORS)
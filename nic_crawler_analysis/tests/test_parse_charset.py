@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from future import standard_library
+standard_library.install_aliases()
+from nose.tools import assert_equals, assert_raises, assert_true, nottest
+
+import codecs
+
+from nic_crawler_analysis.parse import charset as nca_charset
+from . import util as nca_util
+
+HTML_TEMPLATE = """<html><head>{meta}<title>Grüße</title></head><body><p>Grüße aus Österreich – „Beispiel“ € {padding}</p></body></html>"""
+
+TEST_SET_SNIFF_CHARSET = [
+    # data, content_type, expected charset, expected source
+    (codecs.BOM_UTF8 + HTML_TEMPLATE.format(meta="", padding="").encode("utf-8"),
+     "text/html; charset=iso-8859-1", "utf-8-sig", "bom"),
+    (codecs.BOM_UTF16_LE + HTML_TEMPLATE.format(meta="", padding="").encode("utf-16-le"),
+     None, "utf-16", "bom"),
+    (HTML_TEMPLATE.format(meta='<meta charset="utf-8">', padding="").encode("cp1252"),
+     "text/html; charset=windows-1252", "cp1252", "header"),
+    (HTML_TEMPLATE.format(meta='<meta charset="utf-8">', padding="").encode("utf-8"),
+     "text/html; Charset=\"UTF-8\"", "utf-8", "header"),
+    (HTML_TEMPLATE.format(meta='<meta charset="windows-1252">', padding="").encode("cp1252"),
+     "text/html", "cp1252", "meta"),
+    (HTML_TEMPLATE.format(meta='<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-15">', padding="").encode("iso-8859-15", "replace"),
+     None, "iso8859-15", "meta"),
+    # a UTF-16 meta charset can only have been read from an ASCII compatible document
+    (HTML_TEMPLATE.format(meta="<meta charset='utf-16'>", padding="").encode("utf-8"),
+     None, "utf-8", "meta"),
+    # an unknown label is skipped
+    (HTML_TEMPLATE.format(meta='<meta charset="unknown">', padding="").encode("utf-8"),
+     "text/html; charset=unknown", "utf-8", "utf-8"),
+    (HTML_TEMPLATE.format(meta="", padding="").encode("utf-8"),
+     None, "utf-8", "utf-8"),
+    # only the sample is tested, the rest may be cut in the middle of a character
+    (HTML_TEMPLATE.format(meta="", padding="ü" * nca_charset.DETECT_LENGTH).encode("utf-8")[:nca_charset.DETECT_LENGTH + 1],
+     None, "utf-8", "utf-8"),
+    (b"", None, "utf-8", "utf-8"),
+]
+
+TEST_SET_SNIFF_CHARSET_NOT_UTF8 = [
+    HTML_TEMPLATE.format(meta="", padding="").encode("cp1252"),
+    HTML_TEMPLATE.format(meta="", padding="").encode("iso-8859-1", "replace"),
+]
+
+TEST_SET_NORMALIZE_CHARSET = [
+    ("UTF8", "utf-8"),
+    (" utf-8 ", "utf-8"),
+    (b"latin1", "cp1252"),
+    ("ISO-8859-1", "cp1252"),
+    ("us-ascii", "cp1252"),
+    ("windows-1251", "cp1251"),
+    ("shift_jis", "shift_jis"),
+    ("unknown", None),
+    ("", None),
+]
+
+TEST_SET_DECODE_HTML = [
+    # data, content_type, chunk_length
+    (HTML_TEMPLATE.format(meta='<meta charset="utf-8">', padding="ü" * 100).encode("utf-8"), None, 7),
+    (HTML_TEMPLATE.format(meta="", padding="ü" * 100).encode("cp1252"), "text/html; charset=cp1252", 5),
+    (codecs.BOM_UTF16_BE + HTML_TEMPLATE.format(meta="", padding="").encode("utf-16-be"), None, 3),
+    (codecs.BOM_UTF8 + HTML_TEMPLATE.format(meta="", padding="").encode("utf-8"), None, 1),
+    (HTML_TEMPLATE.format(meta="", padding="").encode("utf-8") + b"\xff\xfe", "text/html; charset=utf-8", 4),
+    (b"", None, 2),
+]
+
+TEST_GENERATORS = []
+
+
+## Test generators
+def test_gen_sniff_charset():
+    for parameters in TEST_SET_SNIFF_CHARSET:
+        yield sniff_charset_test, parameters[0], parameters[1], parameters[2], parameters[3]
+TEST_GENERATORS.append(test_gen_sniff_charset)
+
+
+def test_gen_sniff_charset_not_utf8():
+    for parameters in TEST_SET_SNIFF_CHARSET_NOT_UTF8:
+        yield sniff_charset_not_utf8_test, parameters
+TEST_GENERATORS.append(test_gen_sniff_charset_not_utf8)
+
+
+def test_gen_normalize_charset():
+    for parameters in TEST_SET_NORMALIZE_CHARSET:
+        yield normalize_charset_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_normalize_charset)
+
+
+def test_gen_decode_html():
+    for parameters in TEST_SET_DECODE_HTML:
+        yield decode_html_test, parameters[0], parameters[1], parameters[2]
+TEST_GENERATORS.append(test_gen_decode_html)
+
+
+## Test functions
+@nottest
+def sniff_charset_test(data, content_type, expected_charset, expected_source):
+    assert_equals(
+        nca_charset.sniff_charset(data, content_type, return_source=True),
+        (expected_charset, expected_source)
+    )
+    assert_equals(nca_charset.sniff_charset(data, content_type), expected_charset)
+    assert_raises(ValueError, nca_charset.sniff_charset, data.decode("latin-1"))
+
+
+@nottest
+def sniff_charset_not_utf8_test(data):
+    charset, source = nca_charset.sniff_charset(data, return_source=True)
+    if nca_charset.CHARSET_DETECTOR_AVAILABLE:
+        assert_true(source in ["detector", "default"])
+    else:
+        assert_equals((charset, source), (nca_charset.DEFAULT_CHARSET, "default"))
+    assert_true(source in nca_charset.CHARSET_SOURCES)
+    # whatever was detected, the document can be decoded
+    assert_true(isinstance(nca_charset.decode_html(data), str))
+
+
+@nottest
+def normalize_charset_test(label, expected):
+    assert_equals(nca_charset.normalize_charset(label), expected)
+
+
+@nottest
+def decode_html_test(data, content_type, chunk_length):
+    charset = nca_charset.sniff_charset(data, content_type)
+    expected = data.decode(charset, "replace")
+    assert_equals(nca_charset.decode_html(data, content_type), expected)
+    assert_equals(nca_charset.decode_html(data, charset=charset), expected)
+    assert_equals(
+        "".join(nca_charset.iter_decode_html(
+            data, content_type, chunk_length=chunk_length
+        )),
+        expected
+    )
+    # chunks given by the caller are decoded with the charset sniffed from
+    # the first one
+    chunks = [data[:nca_charset.SNIFF_LENGTH]] + [
+        data[_i:_i + chunk_length]
+        for _i in range(nca_charset.SNIFF_LENGTH, len(data), chunk_length)
+    ]
+    assert_equals(
+        "".join(nca_charset.iter_decode_html(chunks, content_type)),
+        expected
+    )
+    if data:
+        assert_true("Grüße aus Österreich" in expected)
+
+
+@nottest
+def test_all():
+    nca_util.test_all(TEST_GENERATORS)
@@ -3,14 +3,17 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
-from builtins import zip
+from builtins import range, zip
 from future import standard_library
 
 standard_library.install_aliases()
+import re
 import nose
-from nose.tools import assert_equals, nottest, assert_dict_equal
+from nose.tools import assert_equals, assert_raises, assert_true, nottest, assert_dict_equal
 
 from nic_crawler_analysis.parse import html as nca_html
+from nic_crawler_analysis.parse import html_cache as nca_html_cache
+from nic_crawler_analysis.parse import charset as nca_charset
 from . import util as nca_util
 
 HTML_STRING_LIST = [
@@ -60,6 +63,201 @@ TEST_SET_EXTRACT_TEXT_FROM_HTML = zip(HTML_STRING_LIST, EXTRACT_TEXT_FROM_HTML_R
 TEST_SET_EXTRACT_JS_FROM_HTML = zip(HTML_STRING_LIST, EXTRACT_JS_FROM_HTML_RESULTS)
 TEST_SET_EXTRACT_NOSCRIPT_FROM_HTML = zip(HTML_STRING_LIST, EXTRACT_NOSCRIPT_FROM_HTML_RESULTS)
 
+# Documents with unusual structure for the single-pass extraction
+EXTRACT_ALL_HTML_STRING_LIST = HTML_STRING_LIST + [
+    """<html lang="en"><head><meta name="description" content="A shop, for tools!">
+<meta name="Keywords" content="tools; garden"><meta name="author" content="me"></head>
+<body><p>Some <!-- a comment --> text</p><script>var a = 1;</script><style>p {}</style>
+<meta http-equiv="content-language" content="de"><noscript>No <b>script</b></noscript></body></html>
+after the end""",
+    "<p>Only a fragment without html, head or body</p>",
+    "<html><head><title>No body</title><meta http-equiv='Content-Language' content='de, en'></head></html>",
+    "<html lang='xx'><body><div>One<body lang='en'>nested body</body></div><head><meta name='topic' "
+    "content='not in the head'></head>tail</body></html>",
+    "<head><meta name='description'></head><body>Text<![CDATA[cdata]]> with http://example.com/a links"
+    "</body><body>second body</body>",
+]
+
+TEST_SET_EXTRACT_ALL_FROM_HTML = EXTRACT_ALL_HTML_STRING_LIST
+
+# Well-formed documents on which all parser backends give the same results
+PARITY_HTML_STRING_LIST = HTML_STRING_LIST + [
+    """<!DOCTYPE html>
+<html lang="en-GB">
+<head>
+<meta charset="utf-8">
+<title>Garden &amp; Tools</title>
+<meta name="description" content="Garden furniture, tools &amp; plants">
+<meta name="keywords" content="garden, tools">
+<meta http-equiv="content-language" content="en">
+<style>body { color: #333; }</style>
+<script async src="/js/app.js"></script>
+</head>
+<body class="home">
+<!-- navigation -->
+<nav><ul><li><a href="/">Home</a></li><li><a href="/shop">Shop</a></li></ul></nav>
+<h1>Welcome to our shop</h1>
+<p>Orders placed before noon are shipped on the same day.<br>
+Free delivery from &euro;50 &ndash; <em>no</em> exceptions.</p>
+<img src="/img/logo.png" alt="Logo">
+<script type="text/javascript">
+  var items = ["a", "b"];
+</script>
+<noscript><img src="/pixel.gif"></noscript>
+<noscript>Please enable JavaScript.</noscript>
+<footer><p>&copy; 2020 Garden Shop, Wien</p></footer>
+</body>
+</html>
+""",
+    """<html><head><meta name="Description" content="Ein Verein in Österreich"></head>
+<body><div><h2>Neuigkeiten</h2><p>Hier finden Sie die neuesten Nachrichten und Termine.</p>
+<table><tr><td>Montag</td><td>18:00</td></tr></table>
+<script>track("x");</script><script src="https://cdn.example.com/lib-1.2.3.min.js"></script></div>
+</body></html>""",
+    """<!DOCTYPE html>
+<HTML LANG="fr"><HEAD><TITLE>Accueil</TITLE></HEAD>
+<BODY><P>Bienvenue dans notre hôtel familial au cœur des montagnes.</P>
+<NOSCRIPT>JavaScript est désactivé.</NOSCRIPT></BODY></HTML>""",
+]
+
+# Documents with character references that bs4 resolves differently from
+# html.unescape, and the text that html.parser trees have for them
+STREAMING_REFERENCES = [
+    ("<html><body><p>a &notanentity; b &amp;x &ampx &notit; AT&T R&D; &#65;&#x42; &#xZZ; &#0; &#150;</p></body></html>",
+     "a notanentity b x ampx notit AT T R D AB xZZ"),
+    ("<html><head><meta name='description' content='&notanentity; &copy x'></head>"
+     "<body>Grüße &unknown &nbspy &hellip; &#1114112;<script>var a = '&amp;';</script></body></html>",
+     "Grüße unknown nbspy"),
+]
+
+# Documents on which html.parser and the streaming extraction are compared
+STREAMING_HTML_STRING_LIST = EXTRACT_ALL_HTML_STRING_LIST + PARITY_HTML_STRING_LIST + [
+    "<ruby>漢<rt>kan</rt></ruby><body>a<pre>  </pre>\r\n<textarea>\r</textarea>b&amp;c &#x41; &nbsp;x"
+    "<template><![CDATA[cd]]>t</template></body>",
+    "<body><noscript><b>x</b></noscript><noscript><!-- c --></noscript><noscript><noscript>in</noscript>"
+    "</noscript><script class=' a  b'>s</script><br></br><div/>after<p>unclosed<p>more",
+    "<html><head><meta http-equiv='content-language'><meta http-equiv='Content-Language' content='de'>"
+    "</head><body>x</body></html>",
+] + [_html for _html, _text in STREAMING_REFERENCES]
+
+TEST_SET_EXTRACT_ALL_STREAMING = [
+    (_html, _chunk_length)
+    for _html in STREAMING_HTML_STRING_LIST
+    for _chunk_length in [None, 7]
+]
+
+# Documents whose meta-information is found by head-only parsing
+HEAD_ONLY_HTML_STRING_LIST = PARITY_HTML_STRING_LIST + [
+    "<html lang='de'>\n<head>\n<!-- <body> -->\n<script>var s = '<body>';</script>\n"
+    "<meta http-equiv='content-language' content='de'>\n<meta name='description' content='Beschreibung'>\n"
+    "</head>\n  <body class='x'>x</body>",
+    "<html lang='fr'><head><meta name='keywords' content='sans body'></head></html>",
+]
+
+TEST_SET_HEAD_ONLY = [
+    (_html, _parser)
+    for _html in HEAD_ONLY_HTML_STRING_LIST
+    for _parser in nca_html.get_available_parsers()
+]
+
+
+@nottest
+def encodable(text, encoding):
+    try:
+        text.encode(encoding)
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+# Documents given as bytes, with the Content-Type header of the response
+BYTES_HTML_STRING_LIST = HEAD_ONLY_HTML_STRING_LIST + [
+    "<html lang='de'><head><meta name='description' content='Grüße aus Österreich'></head>"
+    "<body><p>Schöne Grüße – „Beispiel“ für 5 € aus Österreich</p><script>var s = 'ü';</script></body></html>",
+]
+
+TEST_SET_BYTES_INPUT = [
+    (_html, _encoding, _content_type)
+    for _html in BYTES_HTML_STRING_LIST
+    for _encoding, _content_type in [
+        ("utf-8", None),
+        ("utf-8", "text/html; charset=utf-8"),
+        ("cp1252", "text/html; charset=windows-1252"),
+        ("utf-16", "text/html"),
+    ]
+    if encodable(_html, _encoding)
+]
+
+
+TEST_SET_PARSER_PARITY = [
+    (_html, _parser)
+    for _html in PARITY_HTML_STRING_LIST
+    for _parser in nca_html.get_available_parsers()
+    if _parser != "html.parser"
+]
+
+TEST_SET_EXTRACT_TEXT_BOUNDED = [
+    # html, max_words, n_segments, words expected in the bounded text
+    (HTML_STRING_LIST[0], 100, 20, []),
+    ("<html><body><p>eins zwei</p> <p>drei vier</p></body></html>", 2, 2, ["eins", "drei"]),
+    ("<html><body>%s%s</body></html>" % (
+        "<p>Der erste Teil des Textes.</p>" * 250, "<p>Hier folgt the second half.</p>" * 250
+    ), 400, 20, ["erste", "second"]),
+    ("<html><body></body></html>", 10, 2, []),
+    ("<html><head></head></html>", 10, 2, []),
+    # words split over several strings are counted once and not cut
+    ("<html><body><p>a<b>b</b><i>c</i> d</p></body></html>", 2, 1, ["abc", "d"]),
+    ("<html><body><p>x<b>y</b>z w v</p></body></html>", 1, 1, ["xyz"]),
+    # text within the budget is returned unchanged
+    ("<html><body><p>eins\rzwei\u2003\u2003drei  vier</p><pre>f\u00fcnf\r\n\tsechs</pre></body></html>",
+     10, 2, ["drei", "sechs"]),
+]
+
+TEST_SET_FILTER_TEXT = [
+    "",
+    "   ",
+    "Hallo & So",
+    "  [1] \"Zitat\" - 'noch eins', 12.3%; a+b=c (x/y) #tag @user_name <b> | ",
+    "»Français« – ©®… “quoted” • ← → „x“ ▶ 5°C �\x96\xa0\tend",
+    "Zeile\r\nZeile\u2003Wort\x0bWort \r ",
+    "\r  \r",
+    "\\back\\slash\\",
+    "日本語の文章です。1２３",
+    "„Zitat“ – und dann: русский текст.",
+]
+
+TEST_SET_TEXT_FILTER = [
+    # chars, text, expected
+    (",", "a,,b , c", "a b c"),
+    (",", "a  b", "a b"),
+    ("", " a  b ", "a b"),
+    ("xy", "axybyyc", "a b c"),
+]
+
+TEST_SET_STRIP_URLS = [
+    # text, expected in fast mode
+    ("siehe https://www.example.at/termine?id=3&x=(1) oder www.nic.at",
+     "siehe   oder  "),
+    ("Adresse: Wien, Termin 10:30", "Adresse: Wien, Termin 10:30"),
+    ("Mail an mailto:office@example.at, ftp://x.example.at/a.txt und WWW.NIC.AT.",
+     "Mail an     und  "),
+    ("awww.example.at und ://ohne Schema", "awww.example.at und ://ohne Schema"),
+    ("www. http://", "www.  "),
+    ("www.a.at/r?u=https://b.at/c Ende", "  Ende"),
+    ("ÖBB: https://www.öbb.at/fahrplan", "ÖBB:  "),
+    ("", ""),
+]
+
+TEST_SET_EXTRACT_TEXT_STRIP_URLS = [
+    # html, pre_strip_urls, expected text
+    ("<html><body><p>Besuchen Sie https://www.example.at/kalender - Termin: 10:30</p></body></html>",
+     True, "Besuchen Sie Termin"),
+    ("<html><body><p>Besuchen Sie https://www.example.at/kalender - Termin: 10:30</p></body></html>",
+     "fast", "Besuchen Sie Termin"),
+    ("<html><body><p>Besuchen Sie https://www.example.at/kalender - Termin: 10:30</p></body></html>",
+     False, "Besuchen Sie https www example at kalender Termin"),
+]
+
 TEST_GENERATORS = []
 
 
@@ -72,6 +270,37 @@ def test_gen_extract_text_from_html():
 TEST_GENERATORS.append(test_gen_extract_text_from_html)
 
 
+def test_gen_filter_text():
+    for parameters in TEST_SET_FILTER_TEXT:
+        yield filter_text_test, parameters
+TEST_GENERATORS.append(test_gen_filter_text)
+
+
+def test_gen_text_filter():
+    for parameters in TEST_SET_TEXT_FILTER:
+        yield text_filter_test, parameters[0], parameters[1], parameters[2]
+TEST_GENERATORS.append(test_gen_text_filter)
+
+
+def test_gen_strip_urls():
+    for parameters in TEST_SET_STRIP_URLS:
+        yield strip_urls_test, parameters[0], parameters[1]
+TEST_GENERATORS.append(test_gen_strip_urls)
+
+
+def test_gen_extract_text_strip_urls():
+    for parameters in TEST_SET_EXTRACT_TEXT_STRIP_URLS:
+        yield extract_text_strip_urls_test, parameters[0], parameters[1], parameters[2]
+TEST_GENERATORS.append(test_gen_extract_text_strip_urls)
+
+
+def test_gen_extract_text_bounded():
+    for parameters in TEST_SET_EXTRACT_TEXT_BOUNDED:
+        yield (extract_text_bounded_test, parameters[0], parameters[1], parameters[2],
+               parameters[3])
+TEST_GENERATORS.append(test_gen_extract_text_bounded)
+
+
 def test_gen_extract_js_from_html():
     for parameters in TEST_SET_EXTRACT_JS_FROM_HTML:
         yield extract_js_from_html_test, parameters[0], parameters[1]
@@ -87,6 +316,55 @@ def test_gen_extract_noscript_from_html():
 
 TEST_GENERATORS.append(test_gen_extract_js_from_html())
 
+
+def test_gen_extract_all_from_html():
+    for parameters in TEST_SET_EXTRACT_ALL_FROM_HTML:
+        yield extract_all_from_html_test, parameters
+
+
+TEST_GENERATORS.append(test_gen_extract_all_from_html)
+
+
+def test_gen_parser_parity():
+    for parameters in TEST_SET_PARSER_PARITY:
+        yield parser_parity_test, parameters[0], parameters[1]
+
+
+TEST_GENERATORS.append(test_gen_parser_parity)
+
+
+def test_gen_head_only():
+    for parameters in TEST_SET_HEAD_ONLY:
+        yield head_only_test, parameters[0], parameters[1]
+
+
+TEST_GENERATORS.append(test_gen_head_only)
+
+
+def test_gen_extract_all_streaming():
+    for parameters in TEST_SET_EXTRACT_ALL_STREAMING:
+        yield extract_all_streaming_test, parameters[0], parameters[1]
+
+
+TEST_GENERATORS.append(test_gen_extract_all_streaming)
+
+
+def test_gen_streaming_references():
+    for parameters in STREAMING_REFERENCES:
+        yield streaming_references_test, parameters[0], parameters[1]
+
+
+TEST_GENERATORS.append(test_gen_streaming_references)
+
+
+def test_gen_bytes_input():
+    for parameters in TEST_SET_BYTES_INPUT:
+        yield bytes_input_test, parameters[0], parameters[1], parameters[2]
+
+
+TEST_GENERATORS.append(test_gen_bytes_input)
+
+
 ## Test functions
 @nottest
 def extract_text_from_html_test(html, expected_text):
@@ -94,6 +372,78 @@ def extract_text_from_html_test(html, expected_text):
     assert_equals(text, expected_text)
 
 
+@nottest
+def filter_text_test(text):
+    # same result as the regular expression filter_text used before
+    expected = re.sub(
+        '[\n \[\]"\'.,:!?/+\-–\\\\*#()%&=_§€$@<>;|'
+        '©0123456789»«®…”“•�°←→„▶\x96\xa0\t]+',
+        ' ',
+        text
+    ).strip()
+    assert_equals(nca_html.filter_text(text), expected)
+
+
+@nottest
+def text_filter_test(chars, text, expected):
+    assert_equals(nca_html.TextFilter(chars)(text), expected)
+
+
+@nottest
+def strip_urls_test(text, expected):
+    assert_equals(nca_html.strip_urls(text), expected)
+    if nca_html.RFC_REGEX_AVAILABLE:
+        assert_equals(
+            nca_html.strip_urls(text, "rfc3987"),
+            nca_html.rfc3987.get_compiled_pattern(rule='URI').sub(" ", text)
+        )
+    else:
+        assert_raises(ValueError, nca_html.strip_urls, text, "rfc3987")
+    assert_raises(ValueError, nca_html.strip_urls, text, "unknown")
+
+
+@nottest
+def extract_text_strip_urls_test(html, pre_strip_urls, expected):
+    assert_equals(
+        nca_html.extract_text_from_html(html, pre_strip_urls=pre_strip_urls),
+        expected
+    )
+    assert_equals(
+        nca_html.extract_all_from_html(
+            html, pre_strip_urls=pre_strip_urls
+        )["text"],
+        expected
+    )
+    assert_equals(
+        nca_html.extract_all_from_html(
+            html, pre_strip_urls=pre_strip_urls, streaming=True
+        )["text"],
+        expected
+    )
+
+
+@nottest
+def extract_text_bounded_test(html, max_words, n_segments, expected_words):
+    text = nca_html.extract_text_from_html(html)
+    bounded = nca_html.extract_text_from_html(
+        html, max_words=max_words, n_segments=n_segments
+    )
+    if text is None or len(text.split()) <= max_words:
+        assert_equals(bounded, text)
+    else:
+        words = bounded.split()
+        assert_true(len(words) <= max_words)
+        assert_equals(words[0], text.split()[0])
+        for _word in words:
+            assert_true(_word in text.split())
+    for _word in expected_words:
+        assert_true(_word in bounded.split())
+
+    assert_raises(ValueError, nca_html.extract_text_from_html, html, max_words=0)
+    assert_raises(ValueError, nca_html.extract_text_from_html, html,
+                  max_words=max_words, n_segments=0)
+
+
 @nottest
 def extract_noscript_from_html_test(html, expected_texts):
     texts = nca_html.extract_noscript_from_html(html)
@@ -111,6 +461,169 @@ def extract_js_from_html_test(html, expected_js):
         assert_dict_equal(attrs_, ref_attrs)
         assert_equals(text, ref_text)
 
+@nottest
+def extract_all_from_html_test(html):
+    bs = nca_html.parse_html(html)
+    expected = dict(
+        text=nca_html.extract_text_from_html(bs),
+        description=nca_html.get_site_description(bs),
+        html_lang=nca_html.extract_html_lang_tag(bs),
+        http_equiv_lang=nca_html.extract_http_equiv_lang_tag(bs),
+        js=nca_html.extract_js_from_html(bs),
+        noscript=nca_html.extract_noscript_from_html(bs),
+    )
+    assert_equals(nca_html.extract_all_from_html(bs), expected)
+    assert_equals(nca_html.extract_all_from_html(html), expected)
+    assert_equals(
+        nca_html.extract_all_from_html(bs, accepted_langs=["de"])["html_lang"],
+        nca_html.extract_html_lang_tag(bs, accepted_langs=["de"])
+    )
+
+
+@nottest
+def extract_with_all_extractors(bs):
+    return dict(
+        text=nca_html.extract_text_from_html(bs),
+        description=nca_html.get_site_description(bs),
+        html_lang=nca_html.extract_html_lang_tag(bs),
+        http_equiv_lang=nca_html.extract_http_equiv_lang_tag(bs),
+        js=nca_html.extract_js_from_html(bs),
+        noscript=nca_html.extract_noscript_from_html(bs),
+        all=nca_html.extract_all_from_html(bs),
+    )
+
+
+@nottest
+def parser_parity_test(html, parser):
+    expected = extract_with_all_extractors(
+        nca_html.parse_html(html, parser="html.parser")
+    )
+    bs = nca_html.parse_html(html, parser=parser)
+    assert_equals(bs.builder.NAME, parser)
+    assert_equals(extract_with_all_extractors(bs), expected)
+
+    assert_equals(nca_html.parse_html(html).builder.NAME, "html.parser")
+    assert_equals(nca_html.parse_html(html, parser="auto").builder.NAME, nca_html.AUTO_PARSER)
+    assert_raises(ValueError, nca_html.parse_html, html, parser="unknown")
+
+
+@nottest
+def head_only_test(html, parser):
+    bs = nca_html.parse_html(html, parser=parser)
+    head_bs = nca_html.parse_html(html, parser=parser, head_only=True)
+    # html5lib adds an empty <body>
+    assert_equals(head_bs.body is None or not head_bs.body.contents, True)
+    for _extract in [
+            nca_html.get_site_description,
+            nca_html.extract_html_lang_tag,
+            nca_html.extract_http_equiv_lang_tag,
+    ]:
+        assert_equals(_extract(head_bs), _extract(bs))
+        assert_equals(_extract(html), _extract(bs))
+
+
+@nottest
+def extract_all_streaming_test(html, chunk_length):
+    expected = nca_html.extract_all_from_html(
+        nca_html.parse_html(html, parser="html.parser")
+    )
+    if chunk_length is None:
+        input_ = html
+    else:
+        input_ = (html[_i:_i + chunk_length]
+                  for _i in range(0, len(html), chunk_length))
+    assert_equals(
+        nca_html.extract_all_from_html(input_, streaming=True), expected
+    )
+
+    bs = nca_html.parse_html(html)
+    assert_raises(ValueError, nca_html.extract_all_from_html, bs,
+                  streaming=True)
+
+
+@nottest
+def streaming_references_test(html, expected_text):
+    expected = nca_html.extract_all_from_html(
+        nca_html.parse_html(html, parser="html.parser")
+    )
+    assert_equals(expected["text"], expected_text)
+    for _chunk_length in [1, 2, 3]:
+        chunks = (html[_i:_i + _chunk_length]
+                  for _i in range(0, len(html), _chunk_length))
+        assert_equals(
+            nca_html.extract_all_from_html(chunks, streaming=True), expected
+        )
+
+
+@nottest
+def bytes_input_test(html, encoding, content_type):
+    data = html.encode(encoding)
+    expected = extract_with_all_extractors(nca_html.parse_html(html))
+    bs = nca_html.parse_html(data, content_type=content_type)
+    assert_equals(extract_with_all_extractors(bs), expected)
+    # the extractors take bytes and the header as well - without the header
+    # only if the encoding is not guessed by a detector
+    header_needed = (
+        nca_charset.sniff_charset(data) != nca_charset.sniff_charset(data, content_type)
+    )
+    assert_equals(
+        nca_html.extract_all_from_html(data, content_type=content_type),
+        expected["all"]
+    )
+    for _name, _extract in [
+            ("text", nca_html.extract_text_from_html),
+            ("description", nca_html.get_site_description),
+            ("html_lang", nca_html.extract_html_lang_tag),
+            ("http_equiv_lang", nca_html.extract_http_equiv_lang_tag),
+            ("js", nca_html.extract_js_from_html),
+            ("noscript", nca_html.extract_noscript_from_html),
+    ]:
+        assert_equals(_extract(data, content_type=content_type), expected[_name])
+        if not header_needed:
+            assert_equals(_extract(data), expected[_name])
+    assert_equals(
+        nca_html.extract_text_from_html(
+            data, content_type=content_type, max_words=1000
+        ),
+        expected["text"]
+    )
+
+    head_bs = nca_html.parse_html(data, content_type=content_type, head_only=True)
+    for _extract in [
+            nca_html.get_site_description,
+            nca_html.extract_html_lang_tag,
+            nca_html.extract_http_equiv_lang_tag,
+    ]:
+        assert_equals(_extract(head_bs), _extract(bs))
+
+    expected_streaming = nca_html.extract_all_from_html(html, streaming=True)
+    assert_equals(
+        nca_html.extract_all_from_html(
+            data, streaming=True, content_type=content_type
+        ),
+        expected_streaming
+    )
+    chunks = (data[_i:_i + 4096] for _i in range(0, len(data), 4096))
+    assert_equals(
+        nca_html.extract_all_from_html(
+            chunks, streaming=True, content_type=content_type
+        ),
+        expected_streaming
+    )
+
+    # bytes and str of a document are cached separately
+    cache = nca_html_cache.DocumentCache()
+    nca_html.parse_html(data, content_type=content_type, document_cache=cache)
+    nca_html.parse_html(html, document_cache=cache)
+    assert_equals(cache.info()["misses"], 2)
+    assert_true(
+        nca_html.parse_html(
+            data, content_type=content_type, document_cache=cache
+        ) is not None
+    )
+    assert_equals(cache.info()["hits"], 1)
+
+
 @nottest
 def dict_string_pair_to_key(dict_string):
     _d, _s = dict_string
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from future import standard_library
+standard_library.install_aliases()
+from nose.tools import assert_equals, assert_true, nottest
+
+import nic_crawler_analysis.parse.html as nca_html
+from nic_crawler_analysis.parse import html_cache as nca_html_cache
+import nic_crawler_analysis.analysis.lang_detect as nca_lang
+
+from . import util as nca_util
+
+HTML_STRING_LIST = [
+    """<html lang="de"><head><meta http-equiv="content-language" content="de"><meta name="description" content="Beschreibung"><title>Titel</title></head><body><p>Ein Beispieltext mit dem wir uns anschauen, ob beim ausführen von unseren Funktionen das richtige herauskommt.</p><script>var a = 1;</script><noscript>Bitte JavaScript aktivieren</noscript></body></html>""",
+    """<html><head><title>Example</title></head><body><p>An example text to test for english language detection. If everything goes well we should get the result english when we're done.</p></body></html>""",
+]
+
+TEST_SET_LRU = [
+    # max_size, keys put, keys looked up, expected found
+    (2, ["a", "b", "c"], ["a", "b", "c"], [False, True, True]),
+    (2, ["a", "b", "a", "c"], ["a", "b", "c"], [True, False, True]),
+    (0, ["a"], ["a"], [False]),
+]
+
+# Extractors of parse.html that take a str, each called once per document
+EXTRACTORS = [
+    nca_html.extract_text_from_html,
+    nca_html.extract_js_from_html,
+    nca_html.extract_noscript_from_html,
+    nca_html.get_site_description,
+    nca_html.extract_html_lang_tag,
+    nca_html.extract_http_equiv_lang_tag,
+]
+
+TEST_GENERATORS = []
+
+
+## Test generators
+def test_gen_lru():
+    for parameters in TEST_SET_LRU:
+        yield lru_test, parameters[0], parameters[1], parameters[2], parameters[3]
+TEST_GENERATORS.append(test_gen_lru)
+
+
+def test_gen_extractors_cached():
+    for parameters in HTML_STRING_LIST:
+        yield extractors_cached_test, parameters
+TEST_GENERATORS.append(test_gen_extractors_cached)
+
+
+def test_gen_head_only_cached():
+    for parameters in HTML_STRING_LIST:
+        yield head_only_cached_test, parameters
+TEST_GENERATORS.append(test_gen_head_only_cached)
+
+
+def test_gen_lang_site_cached():
+    for parameters in HTML_STRING_LIST:
+        yield lang_site_cached_test, parameters
+TEST_GENERATORS.append(test_gen_lang_site_cached)
+
+
+## Test functions
+@nottest
+def lru_test(max_size, keys_put, keys_get, expected_found):
+    cache = nca_html_cache.DocumentCache(max_size=max_size)
+    for _key in keys_put:
+        if _key in keys_put[:keys_put.index(_key)]:
+            cache.get(_key)
+        else:
+            cache.put(_key, _key.upper())
+    cache.hits = cache.misses = 0
+
+    for _key, _found in zip(keys_get, expected_found):
+        found, value = cache.get(_key)
+        assert_equals(found, _found)
+        if found:
+            assert_equals(value, _key.upper())
+    assert_equals(cache.info()["hits"], sum(expected_found))
+    assert_equals(cache.info()["misses"], len(expected_found) - sum(expected_found))
+    assert_true(cache.info()["size"] <= max_size)
+
+
+@nottest
+def extractors_cached_test(html_string):
+    expected = [_extractor(html_string) for _extractor in EXTRACTORS]
+    cache = nca_html_cache.DocumentCache()
+    # the whole document is parsed once, the head-only lookups use its tree
+    results = [
+        _extractor(html_string, document_cache=cache)
+        for _extractor in EXTRACTORS
+    ]
+    assert_equals(results, expected)
+    assert_equals(cache.info()["misses"], 1)
+    assert_equals(cache.info()["hits"], len(EXTRACTORS) - 1)
+
+    extracted = nca_html.extract_all_from_html(html_string)
+    assert_equals(
+        nca_html.extract_all_from_html(html_string, document_cache=cache),
+        extracted
+    )
+    assert_equals(cache.info()["hits"], len(EXTRACTORS))
+
+    cache.clear()
+    assert_equals(cache.info(), {"hits": 0, "misses": 0, "size": 0})
+
+
+@nottest
+def head_only_cached_test(html_string):
+    cache = nca_html_cache.DocumentCache()
+    head = nca_html.parse_html(html_string, head_only=True, document_cache=cache)
+    assert_true(nca_html.parse_html(html_string, head_only=True, document_cache=cache) is head)
+    assert_equals(cache.info()["hits"], 1)
+
+    # a head-only tree is not returned for the whole document
+    whole = nca_html.parse_html(html_string, document_cache=cache)
+    assert_true(whole is not head)
+    assert_equals(cache.info()["misses"], 2)
+
+    # a tree of the whole document is preferred for head-only lookups
+    assert_true(nca_html.parse_html(html_string, head_only=True, document_cache=cache) is whole)
+
+    # documents parsed with different backends are cached separately
+    nca_html.parse_html(html_string, parser="auto", document_cache=cache)
+    if nca_html.AUTO_PARSER != nca_html.DEFAULT_PARSER:
+        assert_equals(cache.info()["misses"], 3)
+
+
+@nottest
+def lang_site_cached_test(html_string):
+    expected = nca_lang.detect_site_language("{}", html_string)
+    cache = nca_html_cache.DocumentCache()
+    assert_equals(
+        nca_lang.detect_site_language("{}", html_string, document_cache=cache),
+        expected
+    )
+    nca_lang.get_site_meta_language("{}", html_string, document_cache=cache)
+    nca_html.extract_text_from_html(html_string, document_cache=cache)
+    assert_equals(cache.info()["misses"], 1)
+    assert_equals(cache.info()["hits"], 2)
+
+
+@nottest
+def test_all():
+    nca_util.test_all(TEST_GENERATORS)
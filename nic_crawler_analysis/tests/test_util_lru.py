@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from future import standard_library
+standard_library.install_aliases()
+from nose.tools import assert_equals, assert_raises, nottest
+
+from nic_crawler_analysis.util.lru import LRUDict
+from nic_crawler_analysis.analysis.lang_cache import LanguageCache
+from nic_crawler_analysis.parse.html_cache import DocumentCache
+
+from . import util as nca_util
+
+TEST_SET_LRU_DICT = [
+    # max_size, operations ("put"/"get", key), expected keys kept
+    (2, [("put", "a"), ("put", "b"), ("put", "c")], ["b", "c"]),
+    (2, [("put", "a"), ("put", "b"), ("get", "a"), ("put", "c")], ["a", "c"]),
+    (2, [("put", "a"), ("put", "b"), ("put", "a"), ("put", "c")], ["a", "c"]),
+    (2, [("put", "a"), ("get", "x"), ("put", "b")], ["a", "b"]),
+    (0, [("put", "a"), ("get", "a")], []),
+]
+
+TEST_GENERATORS = []
+
+
+## Test generators
+def test_gen_lru_dict():
+    for parameters in TEST_SET_LRU_DICT:
+        yield lru_dict_test, parameters[0], parameters[1], parameters[2]
+TEST_GENERATORS.append(test_gen_lru_dict)
+
+
+## Test functions
+@nottest
+def lru_dict_test(max_size, operations, expected_keys):
+    lru = LRUDict(max_size)
+    for _operation, _key in operations:
+        if _operation == "put":
+            lru.put(_key, _key.upper())
+        else:
+            lru.get(_key)
+    assert_equals(len(lru), len(expected_keys))
+    for _key in expected_keys:
+        assert_equals(lru.get(_key), _key.upper())
+    assert_equals(lru.get("unknown"), None)
+
+    lru.clear()
+    assert_equals(len(lru), 0)
+    for _cache in [LRUDict, LanguageCache, DocumentCache]:
+        assert_raises(ValueError, _cache, -1)
+
+
+@nottest
+def test_all():
+    nca_util.test_all(TEST_GENERATORS)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded mapping with least-recently-used eviction
+
+Shared by the in-memory tiers of
+:class:`~nic_crawler_analysis.analysis.lang_cache.LanguageCache` and
+:class:`~nic_crawler_analysis.parse.html_cache.DocumentCache`.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from future import standard_library
+
+from collections import OrderedDict
+
+standard_library.install_aliases()
+
+
+class LRUDict(object):
+    """
+    Mapping that keeps at most max_size entries
+
+    Lookups and stores make an entry the most recently used one. When the
+    mapping is full, the least recently used entry is removed. The mapping is
+    not thread safe - the caches that use it hold their own lock.
+
+    Parameters
+    ----------
+    max_size : int
+        maximal number of entries kept - 0 keeps none
+    """
+
+    def __init__(self, max_size):
+        if max_size < 0:
+            raise ValueError("max_size must not be negative - got %s"
+                             % max_size)
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Look up a key
+
+        Parameters
+        ----------
+        key : hashable
+            the key
+
+        Returns
+        -------
+        value : object
+            the stored value or None if key is not stored
+        """
+        # entries are popped and reinserted to move them to the end
+        # (OrderedDict.move_to_end is not available in python 2.7)
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self._entries[key] = value
+        return value
+
+    def put(self, key, value):
+        """
+        Store a value - None can not be stored
+
+        Parameters
+        ----------
+        key : hashable
+            the key
+        value : object
+            the value
+        """
+        if self.max_size == 0:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries"""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -5,6 +5,9 @@ setup(
     name='nic_crawler_analysis',
     version='0.1',
     packages=find_packages(),
+    package_data={
+        'nic_crawler_analysis.tests': ['data/*.jsonl']
+    },
     url='',
     license='',
     author='Clemens Moritz',
@@ -20,6 +23,9 @@ setup(
         'beautifulsoup4',
         'tldextract'
     ],
+    extras_require={
+        'numpy': ['numpy>=1.17']
+    },
     scripts=[
         'nic_crawler_analysis/scripts/nca_analyze_html'
     ]